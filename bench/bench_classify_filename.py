@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+bench_classify_filename.py
+Microbenchmark and differential check for asa_aggregator.classify_filename,
+the single compiled suffix matcher Stage 3 classifies filenames with,
+against the cascade of endswith() checks it replaced.
+
+The benchmark times both over the names of a synthetic cohort (per
+sample: amplicon files, summary, CNV bed, metadata JSON, log and a BAM).
+The differential check runs both over random names assembled from the
+suffix vocabulary — sample names, _amplicon{N} parts with and without
+leading zeros, infixes and near-miss suffixes — and reports any name
+they disagree on. Amplicon matches are compared as discovery registers
+them with the sample name unknown (_register_amplicon_file): a sample
+name that is empty or itself contains "_amplicon" registers nothing.
+
+Usage:
+    python bench/bench_classify_filename.py [--samples 20000] [--names 300000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from asa_aggregator import (  # noqa: E402
+    AMPLICON_FILE_DISCOVERY_SUFFIXES, CNV_BED_SUFFIXES, CS_RMDUP_INFIX,
+    LEGACY_CNV_BED_SUFFIX, MISC_AA_SUFFIXES, SUMMARY_SUFFIXES,
+    classify_filename, rchop,
+)
+
+
+# ---------------------------------------------------------------------------
+# The cascade classify_filename replaced (Stage 3 before it)
+# ---------------------------------------------------------------------------
+
+def _parse_amplicon_num(fname, sname):
+    stem = fname
+    if stem.startswith(sname + "_amplicon"):
+        stem = stem[len(sname) + len("_amplicon"):]
+    elif "_amplicon" in stem:
+        stem = stem.split("_amplicon", 1)[1]
+    else:
+        return None
+    num_str = ""
+    for ch in stem:
+        if ch.isdigit():
+            num_str += ch
+        else:
+            break
+    try:
+        return int(num_str)
+    except ValueError:
+        return None
+
+
+def cascade_classify(fname):
+    for suffix in MISC_AA_SUFFIXES:
+        if fname.endswith(suffix):
+            return "misc", suffix, rchop(fname, suffix), None
+    if fname.endswith("_amplicon_summary.txt"):
+        return "summary", "_amplicon_summary.txt", rchop(fname, "_amplicon_summary.txt"), None
+    if fname.endswith("_summary.txt"):
+        return "summary", "_summary.txt", rchop(fname, "_summary.txt"), None
+    for suffix, key in AMPLICON_FILE_DISCOVERY_SUFFIXES:
+        if not fname.endswith(suffix):
+            continue
+        amp_idx = fname.find("_amplicon")
+        if amp_idx <= 0:
+            return None
+        candidate = fname[:amp_idx]
+        num = _parse_amplicon_num(fname, candidate)
+        if num is not None and fname == f"{candidate}_amplicon{num}{suffix}":
+            return "amplicon", key, candidate, num
+        return None
+    if fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX):
+        if fname.endswith(LEGACY_CNV_BED_SUFFIX):
+            suffix = LEGACY_CNV_BED_SUFFIX
+        else:
+            suffix = "_CNV_CALLS.bed"
+        prefix = rchop(fname, suffix)
+        if prefix.endswith(CS_RMDUP_INFIX):
+            return "cnv_bed", CS_RMDUP_INFIX + suffix, prefix[:-len(CS_RMDUP_INFIX)], None
+        return "cnv_bed", suffix, prefix, None
+    return None
+
+
+def registered(match):
+    """A classify_filename result as discovery acts on it with sname unknown."""
+    if match is not None and match[0] == "amplicon":
+        sname = match[2]
+        if not sname or "_amplicon" in sname:
+            return None
+    return match
+
+
+# ---------------------------------------------------------------------------
+# Names
+# ---------------------------------------------------------------------------
+
+def cohort_names(n_samples):
+    names = []
+    for i in range(n_samples):
+        sname = f"SAMPLE{i:06d}"
+        for num in (1, 2, 3):
+            for suffix, _ in AMPLICON_FILE_DISCOVERY_SUFFIXES[:6]:
+                names.append(f"{sname}_amplicon{num}{suffix}")
+        names += [f"{sname}_summary.txt", f"{sname}_CNV_CALLS.bed",
+                  f"{sname}_run_metadata.json", f"{sname}.log", f"{sname}.cs.rmdup.bam"]
+    return names
+
+
+SAMPLE_PARTS = ("S1", "GBM39", "K562_rep2", "", "S_amplicon", "X_amplicon2",
+                "ERR3345421.cs.rmdup", "a.b", "_")
+NUM_PARTS = ("", "1", "2", "12", "01", "007", "x")
+INFIX_PARTS = ("", "", "", "_whole_graph_BFB", "_amplicon", ".cs.rmdup", "_graph", "_cycles")
+SUFFIX_PARTS = (tuple(MISC_AA_SUFFIXES) + SUMMARY_SUFFIXES + CNV_BED_SUFFIXES
+                + tuple(sfx for sfx, _ in AMPLICON_FILE_DISCOVERY_SUFFIXES)
+                + (".txt", ".bed", ".log", ".json", "_CNV_CALLS.bed.gz", "_summary.txt.bak",
+                   "summary.txt", "_CNV_CALLS_unfiltered_gains", "png", ""))
+
+
+def random_names(n, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n):
+        name = rng.choice(SAMPLE_PARTS)
+        if rng.random() < 0.6:
+            name += "_amplicon" + rng.choice(NUM_PARTS)
+        name += rng.choice(INFIX_PARTS) + rng.choice(SUFFIX_PARTS)
+        names.append(name)
+    return names
+
+
+# ---------------------------------------------------------------------------
+
+def ns_per_name(fn, names, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for name in names:
+            fn(name)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(names) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--samples", type=int, default=20000,
+                        help="Samples in the synthetic cohort (default: 20000)")
+    parser.add_argument("--names", type=int, default=300000,
+                        help="Random names in the differential check (default: 300000)")
+    args = parser.parse_args()
+
+    names = cohort_names(args.samples)
+    print(f"Microbenchmark: {len(names)} names from {args.samples} samples, best of 5")
+    print(f"  cascade            {ns_per_name(cascade_classify, names):6.0f} ns/name")
+    print(f"  classify_filename  {ns_per_name(classify_filename, names):6.0f} ns/name")
+
+    names = random_names(args.names)
+    mismatches = [(n, old, new) for n in names
+                  for old, new in [(cascade_classify(n), registered(classify_filename(n)))]
+                  if old != new]
+    print(f"Differential: {len(names)} random names, "
+          f"{len(set(names))} distinct, {len(mismatches)} disagreement(s)")
+    for name, old, new in mismatches[:10]:
+        print(f"  {name!r}: cascade {old}, classify_filename {new}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+bench_sample_records.py
+Memory and build-time benchmark for the Stage 3 sample registry
+(SampleRecord / AmpliconFiles).
+
+Builds a synthetic registry — N samples x M amplicons x every
+AMPLICON_FILE_EXT_MAP kind, plus 4 scalar paths per sample — the way
+discovery does, and reports the size it retains (tracemalloc), the time
+to build it and the time for a full amplicon_files.items() walk. The
+same registry is also built as the plain __dict__ records and dict-of-
+dicts amplicon_files SampleRecord used to be, for comparison.
+
+Usage:
+    python bench/bench_sample_records.py [--samples 20000] [--amplicons 30]
+                                         [--build_samples 5000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from asa_aggregator import AMPLICON_FILE_EXT_MAP, AmpliconPathPool, SampleRecord  # noqa: E402
+
+COHORT_ROOT = "/work/proj_AmpliconAggregator/extracted_from_zips"
+SCALAR_FIELDS = ("cnv_calls_bed", "run_metadata_json", "aa_summary_file", "pipeline_log")
+
+
+class DictRecord:
+    """SampleRecord as it was: a __dict__ per record, amplicon_files a dict of dicts."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        for field in SampleRecord.__slots__:
+            if field != "name":
+                setattr(self, field, None)
+        self.reconstruction_tool = "AmpliconArchitect"
+        self.amplicon_files = {}
+
+
+def _sample_paths(i: int, n_amplicons: int):
+    """
+    (sname, scalar paths, [(num, key, path)]) for synthetic sample i — fresh
+    strings each call, as discovery's os.path.join gives, so the registry
+    is measured holding whatever it keeps of them.
+    """
+    sname = f"SAMPLE{i:06d}"
+    sample_dir = f"{COHORT_ROOT}/cohort{i // 500}/{sname}"
+    aa_dir = f"{sample_dir}/{sname}_AA_results"
+    scalars = {
+        "cnv_calls_bed": f"{sample_dir}/{sname}_cnvkit_output/{sname}_CNV_CALLS.bed",
+        "run_metadata_json": f"{sample_dir}/{sname}_run_metadata.json",
+        "aa_summary_file": f"{aa_dir}/{sname}_summary.txt",
+        "pipeline_log": f"{sample_dir}/{sname}.log",
+    }
+    files = [(num, key, f"{aa_dir}/{sname}_amplicon{num}{ext}")
+             for num in range(1, n_amplicons + 1)
+             for key, ext in AMPLICON_FILE_EXT_MAP.items()]
+    return sname, scalars, files
+
+
+def build_compact(n_samples: int, n_amplicons: int):
+    pool = AmpliconPathPool()
+    registry = {}
+    for i in range(n_samples):
+        sname, scalars, files = _sample_paths(i, n_amplicons)
+        rec = registry[sname] = SampleRecord(sname, amplicon_paths=pool)
+        for field, path in scalars.items():
+            setattr(rec, field, path)
+        for num, key, path in files:
+            rec.amplicon_files.add(num, key, path)
+    return registry
+
+
+def build_dict(n_samples: int, n_amplicons: int):
+    registry = {}
+    for i in range(n_samples):
+        sname, scalars, files = _sample_paths(i, n_amplicons)
+        rec = registry[sname] = DictRecord(sname)
+        for field, path in scalars.items():
+            setattr(rec, field, path)
+        for num, key, path in files:
+            rec.amplicon_files.setdefault(num, {}).setdefault(key, path)
+    return registry
+
+
+def retained_mb(build, n_samples: int, n_amplicons: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    registry = build(n_samples, n_amplicons)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del registry
+    return size / (1024 * 1024)
+
+
+def build_seconds(build, n_samples: int, n_amplicons: int, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        build(n_samples, n_amplicons)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def walk_seconds(registry) -> float:
+    t0 = time.perf_counter()
+    n = 0
+    for rec in registry.values():
+        for _, files in rec.amplicon_files.items():
+            n += len(files)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--samples", type=int, default=20000,
+                        help="Samples in the memory benchmark (default: 20000)")
+    parser.add_argument("--amplicons", type=int, default=30,
+                        help="Amplicons per sample (default: 30)")
+    parser.add_argument("--build_samples", type=int, default=5000,
+                        help="Samples in the build-time benchmark (default: 5000)")
+    args = parser.parse_args()
+
+    n_files = args.samples * args.amplicons * len(AMPLICON_FILE_EXT_MAP)
+    print(f"Registry: {args.samples} samples x {args.amplicons} amplicons x "
+          f"{len(AMPLICON_FILE_EXT_MAP)} files ({n_files} paths), "
+          f"+{len(SCALAR_FIELDS)} scalar paths each")
+    for label, build in (("dict records", build_dict), ("SampleRecord", build_compact)):
+        print(f"  Retained, {label:<14} : "
+              f"{retained_mb(build, args.samples, args.amplicons):8.1f} MB")
+
+    print(f"Build time, {args.build_samples} samples (best of 3; includes "
+          f"making the paths):")
+    for label, build in (("dict records", build_dict), ("SampleRecord", build_compact)):
+        print(f"  {label:<24} : "
+              f"{build_seconds(build, args.build_samples, args.amplicons):8.2f} s")
+
+    registry = build_compact(args.samples, args.amplicons)
+    print(f"Full amplicon_files.items() walk, {n_files} paths: "
+          f"{walk_seconds(registry):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
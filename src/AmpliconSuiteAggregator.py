@@ -16,7 +16,8 @@ import sys
 import os
 
 from asa_stages import Aggregator
-from asa_aggregator import __version__
+from asa_aggregator import __version__, DEFAULT_GZIP_LEVEL, INGEST_MODES
+from asa_cache import CACHE_KEY_MODES
 
 
 def get_paths_from_filelist(filelist_fp: str) -> list[str]:
@@ -104,7 +105,110 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         default=False,
         help="Skip removal of temporary working directories on completion. "
-             "Useful for debugging.",
+             "Useful for debugging. Files copied verbatim into the output are "
+             "archived straight from the extraction dir, so results/ keeps only "
+             "the generated ones.",
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        metavar="N",
+        type=int,
+        default=1,
+        help="Number of worker processes used to extract input and nested archives "
+             "in parallel, and of threads used to build the per-sample output dirs. "
+             "Archives are handed out largest-first. (default: 1)",
+    )
+
+    parser.add_argument(
+        "--compress_jobs",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Number of threads used for the output's compression: cnvkit tarballs, "
+             "compressed logs and the bfbarchitect archive, run largest-first, and "
+             "the final archive, compressed in blocks. (default: --jobs)",
+    )
+
+    parser.add_argument(
+        "--gzip_level",
+        metavar="N",
+        type=int,
+        default=DEFAULT_GZIP_LEVEL,
+        help="gzip compression level (0-9) of the output archive and everything "
+             f"compressed inside it. Lower is faster, higher is smaller. (default: {DEFAULT_GZIP_LEVEL})",
+    )
+
+    parser.add_argument(
+        "--prune_extraction",
+        action="store_true",
+        default=False,
+        help="Skip files the output never includes (.bam, .fastq, .cram, etc.) while "
+             "extracting inputs, instead of writing them to disk and dropping them later.",
+    )
+
+    parser.add_argument(
+        "--ingest_mode",
+        choices=INGEST_MODES,
+        default="copy",
+        help="How directory inputs are brought into the working tree: copy them, "
+             "hardlink or reflink (copy-on-write clone) each file, or auto (reflink, "
+             "then hardlink). Falls back to copying per file when a link isn't "
+             "possible, e.g. across filesystems. Input files are never modified. "
+             "(default: copy)",
+    )
+
+    parser.add_argument(
+        "--extraction_cache",
+        metavar="DIR",
+        default=None,
+        help="Keep each input archive's extracted tree in DIR and reuse it on later "
+             "runs with the same archive. Safe to share between concurrent runs.",
+    )
+
+    parser.add_argument(
+        "--extraction_cache_size",
+        metavar="GB",
+        type=float,
+        default=100.0,
+        help="Size cap for --extraction_cache; least recently used entries are "
+             "evicted beyond it. (default: 100)",
+    )
+
+    parser.add_argument(
+        "--extraction_cache_key",
+        choices=CACHE_KEY_MODES,
+        default="sha256",
+        help="Identify cached archives by a sha256 of their content, or by "
+             "size/mtime/inode (stat — no read, but copies of an archive don't "
+             "match). (default: sha256)",
+    )
+
+    parser.add_argument(
+        "--lazy_extraction",
+        action="store_true",
+        default=False,
+        help="Run discovery against the input archives' member listings instead of "
+             "extracting them, then write out only the files the output needs.",
+    )
+
+    parser.add_argument(
+        "--reuse_discovery",
+        action="store_true",
+        default=False,
+        help="Save discovery results to discovery_manifest.json in the working "
+             "directory. On later runs, if the inputs are unchanged (size and mtime), "
+             "load them instead of re-scanning the extracted tree — e.g. when only "
+             "the name map changes.",
+    )
+
+    parser.add_argument(
+        "--spill_features",
+        action="store_true",
+        default=False,
+        help="Keep parsed result_table rows in an SQLite database in the working "
+             "directory (feature_rows.sqlite) instead of memory, and sort "
+             "aggregated_results.csv on disk. For cohorts too large to aggregate in RAM.",
     )
 
     # --- Version ---
@@ -120,6 +224,12 @@ def build_parser() -> argparse.ArgumentParser:
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.compress_jobs is not None and args.compress_jobs < 1:
+        parser.error("--compress_jobs must be at least 1")
+    if not 0 <= args.gzip_level <= 9:
+        parser.error("--gzip_level must be between 0 and 9")
 
     # Resolve input paths
     if args.filelist:
@@ -136,6 +246,17 @@ def main() -> None:
         print(f"  {p}")
     print(f"Output archive: {args.output_name}.tar.gz")
     print(f"No-cleanup    : {args.no_cleanup}")
+    print(f"Jobs          : {args.jobs}")
+    print(f"Compress jobs : {args.compress_jobs or args.jobs}")
+    print(f"Gzip level    : {args.gzip_level}")
+    print(f"Prune extract : {args.prune_extraction}")
+    print(f"Lazy extract  : {args.lazy_extraction}")
+    print(f"Ingest mode   : {args.ingest_mode}")
+    print(f"Reuse discov. : {args.reuse_discovery}")
+    print(f"Spill features: {args.spill_features}")
+    if args.extraction_cache:
+        print(f"Extract cache : {args.extraction_cache} "
+              f"(max {args.extraction_cache_size:g} GB, key {args.extraction_cache_key})")
     if args.name_map:
         print(f"Name map      : {args.name_map}")
     print()
@@ -145,6 +266,17 @@ def main() -> None:
         project_name=args.output_name,
         name_map_file=args.name_map,
         no_cleanup=args.no_cleanup,
+        jobs=args.jobs,
+        prune_extraction=args.prune_extraction,
+        lazy_extraction=args.lazy_extraction,
+        ingest_mode=args.ingest_mode,
+        extraction_cache=args.extraction_cache,
+        extraction_cache_size=args.extraction_cache_size,
+        extraction_cache_key=args.extraction_cache_key,
+        reuse_discovery=args.reuse_discovery,
+        spill_features=args.spill_features,
+        compress_jobs=args.compress_jobs,
+        gzip_level=args.gzip_level,
     )
 
     if not aggregator.completed:
@@ -18,16 +18,31 @@ import json
 import os
 import re
 import shutil
+import stat
 import sys
 import tarfile
+import tempfile
+import threading
 import zipfile
+from array import array
 from collections import defaultdict
-from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import IO, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; reflinks are Linux-only anyway
+    fcntl = None
+
+try:
+    import grp
+    import pwd
+except ImportError:  # Windows: tar members get no owner names, as with tar.add()
+    grp = pwd = None
+
 __version__ = "8.0.0"
 
 # ---------------------------------------------------------------------------
@@ -60,6 +75,19 @@ AA_DIR_INCLUDE_SUFFIXES: Tuple[str, ...] = (
 # below, not by a size threshold.
 RECONSTRUCT_LOG_SUFFIX = "_reconstruct.log"
 
+# gzip's default, and the level every output archive and .gz was written
+# at before --gzip_level.
+DEFAULT_GZIP_LEVEL = 9
+
+# How directory inputs are placed into the extraction dir (--ingest_mode).
+# Every mode other than "copy" falls back to a real copy per file when the
+# cheaper method isn't available (different filesystem, no reflink support).
+INGEST_MODES: Tuple[str, ...] = ("copy", "hardlink", "reflink", "auto")
+
+# Linux FICLONE ioctl, _IOW(0x94, 9, int): make dst share src's data extents,
+# copy-on-write (btrfs, XFS with reflink=1, bcachefs, ...).
+FICLONE = 0x40049409
+
 # Recognised archive extensions (in priority order for nested extraction)
 ARCHIVE_EXTENSIONS: Tuple[str, ...] = (".tar.gz", ".tar", ".zip")
 
@@ -107,6 +135,14 @@ AS_PIPELINE_VERSION_RE = re.compile(r"Amp\w*Suite-pipeline version\s+(\S+)")
 # AC's own banner has no "version" keyword, e.g. "AmpliconClassifier 2.0.0".
 AC_VERSION_RE = re.compile(r"AmpliconClassifier\s+(\S+)")
 
+# scan_tool_versions() reads a log in pieces: a head window first (banners
+# are printed at startup), then larger chunks until every wanted banner is
+# found. The overlap carried between pieces covers a banner split across
+# a piece boundary.
+LOG_SCAN_HEAD = 64 * 1024
+LOG_SCAN_CHUNK = 1024 * 1024
+LOG_SCAN_OVERLAP = 4096
+
 # Per-amplicon file kind -> canonical filename suffix. This is the naming
 # convention every per-amplicon file is normalized to on output (Stage 5
 # copy, Stage 6 resolve) — one source of truth for both.
@@ -138,6 +174,61 @@ AMPLICON_FILE_DISCOVERY_SUFFIXES: List[Tuple[str, str]] = [
     (".png",        "png"),
 ]
 
+# Summary-file and CNV BED suffixes recognised at discovery time. CoRAL's
+# older "_amplicon_summary.txt" shares the "_summary.txt" tail; the longer
+# suffix always wins (see classify_filename()).
+SUMMARY_SUFFIXES: Tuple[str, ...] = ("_amplicon_summary.txt", "_summary.txt")
+CNV_BED_SUFFIXES: Tuple[str, ...] = ("_CNV_CALLS.bed", LEGACY_CNV_BED_SUFFIX)
+# Left between a read ID and the CNV BED suffix by the pipeline's alignment
+# step, e.g. ERR3345421.cs.rmdup_CNV_CALLS.bed
+CS_RMDUP_INFIX = ".cs.rmdup"
+
+
+def _suffix_trie_pattern(rev_suffixes) -> str:
+    """
+    Regex alternation over reversed suffixes, factored into a trie so the
+    engine walks each character once instead of trying every suffix in
+    turn. Optional tails are greedy: the longest suffix wins.
+    """
+    trie: Dict[str, Dict] = {}
+    for word in rev_suffixes:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Dict]) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _compile_filename_classifier():
+    # Every suffix above, reversed, in one pattern: matched against the
+    # reversed filename it is anchored at the suffix, so a lookup costs the
+    # suffix length rather than one endswith() per known suffix.
+    kinds: Dict[str, Tuple[str, str]] = {}
+    for sfx in MISC_AA_SUFFIXES:
+        kinds[sfx[::-1]] = ("misc", sfx)
+    for sfx in SUMMARY_SUFFIXES:
+        kinds[sfx[::-1]] = ("summary", sfx)
+    for sfx in CNV_BED_SUFFIXES:
+        for full in (sfx, CS_RMDUP_INFIX + sfx):
+            kinds[full[::-1]] = ("cnv_bed", full)
+    amplicon_keys = {sfx[::-1]: key for sfx, key in AMPLICON_FILE_DISCOVERY_SUFFIXES}
+    pattern = re.compile(
+        f"(?P<sfx>{_suffix_trie_pattern(kinds)})"
+        f"|(?P<amp>{_suffix_trie_pattern(amplicon_keys)})(?P<num>[0-9]+)"
+        f"{re.escape('_amplicon'[::-1])}")
+    return pattern, kinds, amplicon_keys
+
+
+_FILENAME_RE, _FILENAME_KINDS, _AMPLICON_KEYS = _compile_filename_classifier()
+
 # AC output files/dirs to merge into consolidated_classification/
 # Each entry: suffix, has_header (True/False/None=optional file), is_dir,
 # and optionally prefix_output (default True) — set False for AC outputs
@@ -249,64 +340,201 @@ RESULTS_DIR = "results"
 # Data structures
 # ---------------------------------------------------------------------------
 
-@dataclass
+_AMPLICON_KINDS: Tuple[str, ...] = tuple(AMPLICON_FILE_EXT_MAP)
+_AMPLICON_EXTS: Tuple[str, ...] = tuple(AMPLICON_FILE_EXT_MAP.values())
+_AMPLICON_KIND_INDEX: Dict[str, int] = {k: i for i, k in enumerate(_AMPLICON_KINDS)}
+
+
+class AmpliconPathPool:
+    """
+    The strings a sample registry's AmpliconFiles stores share: each
+    distinct directory prefix is kept once and referred to by index, and
+    per-amplicon paths whose leaf isn't the canonical one are kept whole.
+    One per Aggregator, so it goes when the registry does. Safe to add to
+    from several threads.
+    """
+
+    __slots__ = ("dirs", "odd", "_dir_ids", "_lock")
+
+    def __init__(self) -> None:
+        self.dirs: List[str] = []
+        self.odd: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def dir_id(self, dirpath: str) -> int:
+        i = self._dir_ids.get(dirpath)
+        if i is None:
+            with self._lock:
+                i = self._dir_ids.get(dirpath)
+                if i is None:
+                    self.dirs.append(dirpath)
+                    i = self._dir_ids[dirpath] = len(self.dirs) - 1
+        return i
+
+    def odd_id(self, path: str) -> int:
+        with self._lock:
+            self.odd.append(path)
+            return len(self.odd) - 1
+
+
+class AmpliconFiles:
+    """
+    A sample's per-amplicon files, read as
+      { amplicon_num (int) -> { 'pdf': path, 'png': path, 'cycles': path,
+                                'graph': path, 'cycles_png': path, 'cycles_pdf': path } }
+    (items()/values()/keys()/get()/[]/in/len, in insertion order), but
+    stored as one fixed-width row of AMPLICON_FILE_EXT_MAP kinds per
+    amplicon in an array('q'). A path whose leaf is the canonical
+    {sname}_amplicon{N}{ext} — nearly all of them — costs one directory
+    index into pool; any other path is kept whole in pool.
+
+    Slot encoding: -1 empty, 2*dir_id canonical leaf, 2*odd_id+1 whole path.
+    """
+
+    __slots__ = ("_sname", "_pool", "_rows", "_slots")
+
+    def __init__(self, sname: str, pool: AmpliconPathPool) -> None:
+        self._sname = sname
+        self._pool = pool
+        self._rows: Dict[int, int] = {}  # amplicon num -> row, in insertion order
+        self._slots = array("q")
+
+    def add(self, num: int, key: str, path: str) -> None:
+        """Record path as amplicon num's key file, unless one is already set."""
+        row = self._rows.get(num)
+        if row is None:
+            row = self._rows[num] = len(self._rows)
+            self._slots.extend((-1,) * len(_AMPLICON_KINDS))
+        slot = row * len(_AMPLICON_KINDS) + _AMPLICON_KIND_INDEX[key]
+        if self._slots[slot] != -1:
+            return
+        dirpath, sep, leaf = path.rpartition(os.sep)
+        if sep and leaf == f"{self._sname}_amplicon{num}{AMPLICON_FILE_EXT_MAP[key]}":
+            self._slots[slot] = 2 * self._pool.dir_id(dirpath)
+        else:
+            self._slots[slot] = 2 * self._pool.odd_id(path) + 1
+
+    def _row(self, num: int, row: int) -> Dict[str, str]:
+        leaf_stem = f"{os.sep}{self._sname}_amplicon{num}"
+        start = row * len(_AMPLICON_KINDS)
+        files: Dict[str, str] = {}
+        for key, ext, v in zip(_AMPLICON_KINDS, _AMPLICON_EXTS,
+                               self._slots[start:start + len(_AMPLICON_KINDS)]):
+            if v == -1:
+                continue
+            if v & 1:
+                files[key] = self._pool.odd[v >> 1]
+            else:
+                files[key] = self._pool.dirs[v >> 1] + leaf_stem + ext
+        return files
+
+    def keys(self) -> List[int]:
+        return list(self._rows)
+
+    def values(self) -> Iterator[Dict[str, str]]:
+        return (self._row(n, r) for n, r in self._rows.items())
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, str]]]:
+        return ((n, self._row(n, r)) for n, r in self._rows.items())
+
+    def get(self, num: int, default=None):
+        row = self._rows.get(num)
+        return default if row is None else self._row(num, row)
+
+    def __getitem__(self, num: int) -> Dict[str, str]:
+        files = self.get(num)
+        if files is None:
+            raise KeyError(num)
+        return files
+
+    def __contains__(self, num: object) -> bool:
+        return num in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
 class SampleRecord:
     """
     All discovered filesystem resources associated with a single sample.
     Populated during Stage 3 (Discovery). Consumed in Stages 5 & 6.
+
+    Slotted: a 20k-sample registry is mostly these records, and a per-
+    instance __dict__ roughly doubles each one.
     """
-    name: str
-
-    # Directories (absolute paths in the extraction tree)
-    aa_results_dir: Optional[str] = None       # [name]_AA_results/  (or synthesised)
-    cnvkit_dir: Optional[str] = None           # [name]_cnvkit_output/ or _outputs/
-
-    # Individual files (absolute paths)
-    cnv_calls_bed: Optional[str] = None        # [name]_CNV_CALLS.bed  (canonical copy)
-    cnv_calls_unfiltered_gains_bed: Optional[str] = None  # [name]_CNV_CALLS_unfiltered_gains.bed
-    run_metadata_json: Optional[str] = None
-    sample_metadata_json: Optional[str] = None
-    aa_cnv_seeds_bed: Optional[str] = None
-    finish_flag: Optional[str] = None
-    timing_log: Optional[str] = None
-    pipeline_log: Optional[str] = None         # top-level [name].log
-
-    # Tool versions. Primary source is the sample's own result_table.tsv row
-    # ("AS-p version"/"AA version"/"AC version" columns, written by AC's
-    # make_results_table.py from run_metadata.json) when populated; falls
-    # back to log content scraping otherwise (see extract_tool_versions() and
-    # Aggregator._extract_log_versions()/_scan_classification_log_version()).
-    # The result_table columns are reliably populated only when AC was run
-    # as part of a single combined AmpliconSuite-pipeline.py --run_AC
-    # invocation — the common "reclassify an existing AA cohort" workflow
-    # leaves them "NA", which is exactly what the log-scrape fallback covers.
-    aa_version: Optional[str] = None
-    amplicon_suite_pipeline_version: Optional[str] = None
-    ac_version: Optional[str] = None
-
-    # AA/CoRAL per-amplicon files discovered inside aa_results_dir
-    # { amplicon_num (int) -> { 'pdf': path, 'png': path, 'cycles': path,
-    #                           'graph': path, 'cycles_png': path, 'cycles_pdf': path } }
-    amplicon_files: Dict = field(default_factory=dict)
-
-    # Summary file inside aa_results_dir
-    aa_summary_file: Optional[str] = None
-
-    # Classification dir where this sample's AC output originated (set in
-    # Stage 4 from the result_table.tsv's own location; also where
-    # _scan_classification_log_version() looks for AC's own log)
-    ac_source_dir: Optional[str] = None
-
-    # Reconstruction tool that produced this sample's graph/cycles files.
-    # Defaults to AmpliconArchitect; upgraded to "CoRAL" during discovery
-    # when a content-based CoRAL signal is found (see
-    # Aggregator._detect_reconstruction_tool in asa_stages.py).
-    reconstruction_tool: str = "AmpliconArchitect"
-
-    # Output-tree destination paths — set by Stage 5, consumed by Stage 6
-    aa_dir_dest:    Optional[str] = None  # results/samples/[s]/[s]_reconstruction_results/ (uncompressed dir)
-    cnvkit_tarball: Optional[str] = None  # results/samples/[s]/[s]_cnvkit_output.tar.gz
-    cnv_bed_dest:   Optional[str] = None  # results/samples/[s]/[s]_CNV_CALLS.bed (uncompressed)
+
+    __slots__ = (
+        "name", "aa_results_dir", "cnvkit_dir",
+        "cnv_calls_bed", "cnv_calls_unfiltered_gains_bed", "run_metadata_json",
+        "sample_metadata_json", "aa_cnv_seeds_bed", "finish_flag", "timing_log",
+        "pipeline_log", "aa_version", "amplicon_suite_pipeline_version",
+        "ac_version", "amplicon_files", "aa_summary_file", "ac_source_dir",
+        "reconstruction_tool", "aa_dir_dest", "cnvkit_tarball", "cnv_bed_dest",
+    )
+
+    def __init__(self, name: str,
+                 amplicon_paths: Optional[AmpliconPathPool] = None) -> None:
+        self.name = name
+
+        # Directories (absolute paths in the extraction tree)
+        self.aa_results_dir: Optional[str] = None  # [name]_AA_results/  (or synthesised)
+        self.cnvkit_dir: Optional[str] = None      # [name]_cnvkit_output/ or _outputs/
+
+        # Individual files (absolute paths)
+        self.cnv_calls_bed: Optional[str] = None   # [name]_CNV_CALLS.bed  (canonical copy)
+        self.cnv_calls_unfiltered_gains_bed: Optional[str] = None  # [name]_CNV_CALLS_unfiltered_gains.bed
+        self.run_metadata_json: Optional[str] = None
+        self.sample_metadata_json: Optional[str] = None
+        self.aa_cnv_seeds_bed: Optional[str] = None
+        self.finish_flag: Optional[str] = None
+        self.timing_log: Optional[str] = None
+        self.pipeline_log: Optional[str] = None    # top-level [name].log
+
+        # Tool versions. Primary source is the sample's own result_table.tsv row
+        # ("AS-p version"/"AA version"/"AC version" columns, written by AC's
+        # make_results_table.py from run_metadata.json) when populated; falls
+        # back to log content scraping otherwise (see extract_tool_versions() and
+        # Aggregator._extract_log_versions()/_scan_classification_log_version()).
+        # The result_table columns are reliably populated only when AC was run
+        # as part of a single combined AmpliconSuite-pipeline.py --run_AC
+        # invocation — the common "reclassify an existing AA cohort" workflow
+        # leaves them "NA", which is exactly what the log-scrape fallback covers.
+        self.aa_version: Optional[str] = None
+        self.amplicon_suite_pipeline_version: Optional[str] = None
+        self.ac_version: Optional[str] = None
+
+        # AA/CoRAL per-amplicon files discovered inside aa_results_dir
+        # { amplicon_num (int) -> { 'pdf': path, 'png': path, 'cycles': path,
+        #                           'graph': path, 'cycles_png': path, 'cycles_pdf': path } }
+        # Its strings live in amplicon_paths, the registry's shared pool
+        # (a private one if not given).
+        self.amplicon_files = AmpliconFiles(name, amplicon_paths or AmpliconPathPool())
+
+        # Summary file inside aa_results_dir
+        self.aa_summary_file: Optional[str] = None
+
+        # Classification dir where this sample's AC output originated (set in
+        # Stage 4 from the result_table.tsv's own location; also where
+        # _scan_classification_log_version() looks for AC's own log)
+        self.ac_source_dir: Optional[str] = None
+
+        # Reconstruction tool that produced this sample's graph/cycles files.
+        # Defaults to AmpliconArchitect; upgraded to "CoRAL" during discovery
+        # when a content-based CoRAL signal is found (see
+        # Aggregator._sniff_reconstruction_tools in asa_stages.py).
+        self.reconstruction_tool: str = "AmpliconArchitect"
+
+        # Output-tree destination paths — set by Stage 5, consumed by Stage 6
+        self.aa_dir_dest: Optional[str] = None     # results/samples/[s]/[s]_reconstruction_results/ (uncompressed dir)
+        self.cnvkit_tarball: Optional[str] = None  # results/samples/[s]/[s]_cnvkit_output.tar.gz
+        self.cnv_bed_dest: Optional[str] = None    # results/samples/[s]/[s]_CNV_CALLS.bed (uncompressed)
+
+    def __repr__(self) -> str:
+        return f"SampleRecord(name={self.name!r})"
 
 
 # ---------------------------------------------------------------------------
@@ -320,6 +548,35 @@ def rchop(s: str, suffix: str) -> str:
     return s
 
 
+def classify_filename(fname: str) -> Optional[Tuple[str, str, str, Optional[int]]]:
+    """
+    Recognise a discovery-relevant filename in one call. Returns
+    (kind, key, sname, amplicon_num), or None if fname is none of:
+
+      "misc"      key = its MISC_AA_SUFFIXES entry
+      "summary"   key = its SUMMARY_SUFFIXES entry
+      "cnv_bed"   key = its CNV_BED_SUFFIXES entry, with the .cs.rmdup
+                  infix prepended when present (sname excludes it)
+      "amplicon"  key = its AMPLICON_FILE_DISCOVERY_SUFFIXES key; only the
+                  exact {sname}_amplicon{N}{suffix} shape, N written without
+                  leading zeros
+
+    sname is everything before the matched suffix (before _amplicon{N} for
+    amplicon files) and may be empty — callers decide what to trust.
+    """
+    m = _FILENAME_RE.match(fname[::-1])
+    if m is None:
+        return None
+    stem = fname[:len(fname) - m.end()]
+    if m.lastgroup == "sfx":
+        kind, key = _FILENAME_KINDS[m[0]]
+        return kind, key, stem, None
+    num = m["num"][::-1]
+    if len(num) > 1 and num[0] == "0":
+        return None
+    return "amplicon", _AMPLICON_KEYS[m["amp"]], stem, int(num)
+
+
 def not_provided(value: object) -> bool:
     """Return True if a value represents a missing/not-provided path."""
     if value is None:
@@ -388,6 +645,40 @@ def extract_tool_versions(text: str) -> Tuple[Optional[str], Optional[str], Opti
             ac_m.group(1) if ac_m else None)
 
 
+def scan_tool_versions(fh: IO[str], want: Tuple[bool, bool, bool] = (True, True, True)
+                       ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Streaming extract_tool_versions() over an open text log: same first-
+    match results, but the log is never held in memory whole and reading
+    stops as soon as every banner flagged in want (aa, pipeline, ac) has
+    been found. Unwanted banners come back as None.
+    """
+    patterns = (AA_VERSION_RE, AS_PIPELINE_VERSION_RE, AC_VERSION_RE)
+    found: List[Optional[str]] = [None, None, None]
+    pending = [i for i in range(3) if want[i]]
+    buf = fh.read(LOG_SCAN_HEAD) if pending else ""
+    eof = len(buf) < LOG_SCAN_HEAD
+    while pending:
+        keep = max(0, len(buf) - LOG_SCAN_OVERLAP)
+        for i in list(pending):
+            m = patterns[i].search(buf)
+            if m is None:
+                continue
+            # A match running into the end of the buffer may continue in
+            # the next piece — hold on to it until it's complete.
+            if eof or m.end() < len(buf):
+                found[i] = m.group(1)
+                pending.remove(i)
+            else:
+                keep = min(keep, m.start())
+        if eof or not pending:
+            break
+        chunk = fh.read(LOG_SCAN_CHUNK)
+        eof = len(chunk) < LOG_SCAN_CHUNK
+        buf = buf[keep:] + chunk
+    return found[0], found[1], found[2]
+
+
 def is_aa_summary_content(first_line: str) -> bool:
     """Check whether a summary file's first line matches AA's convention."""
     return first_line.startswith("#Amplicons")
@@ -406,9 +697,11 @@ def is_coral_summary_content(lines: List[str]) -> bool:
     return False
 
 
-def is_valid_aa_results_dir(dirpath: str) -> bool:
+def is_valid_aa_results_dir(dirpath: str, fs=None) -> bool:
     """
     Validate that a directory is a genuine AA or CoRAL results directory.
+    fs, if given, is an os-style view to query instead of the real
+    filesystem (Stage 3 passes its asa_vfs.DiscoveryFS).
 
     Rules:
       - Must contain exactly one *_summary.txt file (this also matches
@@ -421,7 +714,7 @@ def is_valid_aa_results_dir(dirpath: str) -> bool:
     if os.path.basename(dirpath) == "files":
         return False
     try:
-        entries = os.listdir(dirpath)
+        entries = fs.listdir(dirpath) if fs else os.listdir(dirpath)
     except OSError:
         return False
 
@@ -433,24 +726,28 @@ def is_valid_aa_results_dir(dirpath: str) -> bool:
 
     summary_path = os.path.join(dirpath, summaries[0])
     try:
-        with open(summary_path) as fh:
-            lines = [fh.readline() for _ in range(5)]
+        if fs is not None:
+            lines = fs.head(summary_path, 5)
+        else:
+            with open(summary_path) as fh:
+                lines = [fh.readline() for _ in range(5)]
         return is_aa_summary_content(lines[0]) or is_coral_summary_content(lines)
     except OSError as e:
         print(f"Warning: could not read {summary_path}: {e}")
         return False
 
 
-def is_classification_dir(dirpath: str) -> Tuple[bool, Optional[str], Optional[str]]:
+def is_classification_dir(dirpath: str, fs=None) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Check whether a directory contains AC classification output.
+    fs is as for is_valid_aa_results_dir.
 
     Returns (is_classification_dir, profiles_file_path, result_table_path).
     Prints a warning if a profiles file is found without a matching result table.
     Profiles and result_table must share the same prefix.
     """
     try:
-        entries = set(os.listdir(dirpath))
+        entries = set(fs.listdir(dirpath) if fs else os.listdir(dirpath))
     except OSError:
         return False, None, None
 
@@ -471,9 +768,72 @@ def is_classification_dir(dirpath: str) -> Tuple[bool, Optional[str], Optional[s
     return False, None, None
 
 
+# Compressed tar members are built in memory up to this size, then in a
+# temp file: a tar header carries the member's size, so it can't be written
+# before the compression finishes.
+GZIP_MEMBER_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def _owner_names(uid: int, gid: int) -> Tuple[str, str]:
+    uname = gname = ""
+    if pwd is not None:
+        try:
+            uname = pwd.getpwuid(uid)[0]
+        except KeyError:
+            pass
+        try:
+            gname = grp.getgrgid(gid)[0]
+        except KeyError:
+            pass
+    return uname, gname
+
+
+def _member_info(st: os.stat_result, arcname: str) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(arcname)
+    info.mode = stat.S_IMODE(st.st_mode)
+    info.uid, info.gid = st.st_uid, st.st_gid
+    info.uname, info.gname = _owner_names(st.st_uid, st.st_gid)
+    info.size = st.st_size
+    info.mtime = st.st_mtime
+    return info
+
+
+def add_file_member(tar: tarfile.TarFile, path: str, arcname: str) -> None:
+    """
+    Add the file at path to tar as a regular member named arcname, with
+    the header tar.add() would write for a private copy of it. tar.add()
+    itself stores a second path to an already-archived inode as a hardlink
+    member, and extraction-tree files may share inodes (--ingest_mode,
+    --extraction_cache) where the copies they stand in for never did.
+    """
+    with open(path, "rb") as fh:
+        tar.addfile(_member_info(os.fstat(fh.fileno()), arcname), fh)
+
+
+def add_gzip_member(tar: tarfile.TarFile, path: str, arcname: str,
+                    level: int = DEFAULT_GZIP_LEVEL) -> None:
+    """
+    Add the file at path to tar gzip-compressed, as arcname (which should
+    end in .gz) — the member gzip_file_in_place() followed by tar.add()
+    would have produced, without writing anything next to path.
+    """
+    with open(path, "rb") as f_in, \
+            tempfile.SpooledTemporaryFile(max_size=GZIP_MEMBER_SPOOL_BYTES) as buf:
+        with gzip.GzipFile(filename=os.path.basename(arcname), mode="wb",
+                           compresslevel=level, fileobj=buf) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        info = _member_info(os.fstat(f_in.fileno()), arcname)
+        info.size = buf.tell()
+        buf.seek(0)
+        tar.addfile(info, buf)
+
+
 def make_tarball(source_dir: str, dest_tar_path: str,
                  exclusions: Tuple[str, ...] = EXCLUSION_SUFFIXES,
-                 root_name: Optional[str] = None) -> None:
+                 root_name: Optional[str] = None,
+                 gzip_suffix: Optional[str] = None,
+                 level: int = DEFAULT_GZIP_LEVEL) -> None:
     """
     Create a .tar.gz archive of source_dir at dest_tar_path.
     Files matching any suffix in exclusions are omitted.
@@ -485,18 +845,41 @@ def make_tarball(source_dir: str, dest_tar_path: str,
     CoRAL cnvkit dir is named bare 'cnvkit_output/', but the emitted
     archive must always be rooted at '[sname]_cnvkit_output/' so that a
     reaggregation of our own output round-trips identically.
+
+    With gzip_suffix, files directly inside source_dir ending in it are
+    stored compressed, as [name].gz (replacing any [name].gz already there)
+    — the archive gzip_files_in_dir(source_dir, gzip_suffix) would have
+    led to, but source_dir is left untouched. exclusions are matched
+    against the stored name, so a file whose .gz would be dropped is
+    skipped without being compressed.
+
+    level is the gzip level of the archive and of those members.
     """
     root = root_name or os.path.basename(source_dir.rstrip("/"))
-    with tarfile.open(dest_tar_path, "w:gz") as tar:
+    gz_suffix = gzip_suffix + ".gz" if gzip_suffix else None
+    with tarfile.open(dest_tar_path, "w:gz", compresslevel=level) as tar:
         for root_dir, dirs, files in os.walk(source_dir):
             dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__MACOSX"]
+            compress = set()
+            if gzip_suffix and root_dir == source_dir:
+                compress = {f for f in files if f.endswith(gzip_suffix)
+                            and os.path.isfile(os.path.join(root_dir, f))}
             for fname in files:
-                if fname.startswith(".") or any(fname.endswith(excl) for excl in exclusions):
+                if fname in compress:
+                    name = fname + ".gz"
+                elif gz_suffix and fname.endswith(gz_suffix) and fname[:-3] in compress:
+                    continue
+                else:
+                    name = fname
+                if name.startswith(".") or any(name.endswith(excl) for excl in exclusions):
                     continue
                 fpath = os.path.join(root_dir, fname)
                 arcname = os.path.join(
-                    root, os.path.relpath(fpath, source_dir))
-                tar.add(fpath, arcname=arcname)
+                    root, os.path.relpath(os.path.join(root_dir, name), source_dir))
+                if fname in compress:
+                    add_gzip_member(tar, fpath, arcname, level)
+                else:
+                    add_file_member(tar, fpath, arcname)
 
 
 def convert_cnvkit_cns_to_bed(cns_path: str, dest_path: str, min_cn: float = 0.0) -> None:
@@ -511,6 +894,10 @@ def convert_cnvkit_cns_to_bed(cns_path: str, dest_path: str, min_cn: float = 0.0
     Only a plain .cns is passed here: .call.cns is a poor source of CNV
     calls, and .bintest.cns is bin-level test output, not segments.
     """
+    # Never write through an existing dest_path: with --ingest_mode hardlink
+    # it may share its inode with the user's own input file.
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
     with open(cns_path) as infile, open(dest_path, "w") as outfile:
         next(infile)  # header
         for line in infile:
@@ -535,6 +922,48 @@ def safe_copy_file(src: str, dest: str) -> bool:
         return False
 
 
+def reflink_file(src: str, dest: str) -> None:
+    """
+    Clone src to dest with the FICLONE ioctl, then copy its metadata like
+    shutil.copy2. Raises OSError where reflinks are unsupported.
+    """
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    try:
+        with open(src, "rb") as f_in, open(dest, "wb") as f_out:
+            fcntl.ioctl(f_out.fileno(), FICLONE, f_in.fileno())
+    except OSError:
+        if os.path.lexists(dest):
+            os.remove(dest)
+        raise
+    shutil.copystat(src, dest)
+
+
+def ingest_file(src: str, dest: str, mode: str = "copy") -> str:
+    """
+    Place src at dest according to an --ingest_mode (see INGEST_MODES) and
+    return how it was done: "reflink", "hardlink" or "copy". auto prefers a
+    reflink (a true private copy) over a hardlink (a shared inode — safe
+    only because nothing ever writes *through* an extraction-tree file; see
+    gzip_file_in_place). Either falls back to shutil.copy2, e.g. when src
+    and dest are on different filesystems.
+    """
+    if mode in ("reflink", "auto"):
+        try:
+            reflink_file(src, dest)
+            return "reflink"
+        except OSError:
+            pass
+    if mode in ("hardlink", "auto"):
+        try:
+            os.link(src, dest)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dest)
+    return "copy"
+
+
 def safe_copytree(src: str, dest: str,
                   exclusions: Tuple[str, ...] = (),
                   inclusions: Tuple[str, ...] = ()) -> bool:
@@ -567,11 +996,14 @@ def safe_copytree(src: str, dest: str,
         return False
 
 
-def gzip_file_in_place(fpath: str) -> bool:
+def gzip_file(src: str, gz_path: str, level: int = DEFAULT_GZIP_LEVEL) -> bool:
     """
-    Gzip a single file in place: write <fpath>.gz, then remove the original
-    (an existing .gz is overwritten, mirroring `gzip -f`). Returns True on
-    success, False on failure.
+    Write a gzip-compressed copy of src to gz_path, replacing any existing
+    file there. Returns True on success, False on failure.
+
+    Copy-on-write: the .gz is written to a temp file and renamed into
+    place, never written through — gz_path may be a hardlink to the user's
+    input (--ingest_mode).
 
     Uses the stdlib gzip module rather than shelling out to the gzip(1)
     binary so behaviour is identical wherever the package runs — including
@@ -579,10 +1011,34 @@ def gzip_file_in_place(fpath: str) -> bool:
     with FileNotFoundError and, if that is swallowed, silently skips the
     compression entirely.
     """
-    gz_path = fpath + ".gz"
+    tmp_path = f"{gz_path}.{os.getpid()}.tmp"
     try:
-        with open(fpath, "rb") as f_in, gzip.open(gz_path, "wb") as f_out:
+        with open(src, "rb") as f_in, open(tmp_path, "wb") as raw, \
+                gzip.GzipFile(filename=gz_path, mode="wb", compresslevel=level,
+                              fileobj=raw) as f_out:
             shutil.copyfileobj(f_in, f_out)
+        os.replace(tmp_path, gz_path)
+        return True
+    except OSError as e:
+        print(f"Warning: could not compress {src}: {e}")
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def gzip_file_in_place(fpath: str, level: int = DEFAULT_GZIP_LEVEL) -> bool:
+    """
+    Gzip a single file in place: write <fpath>.gz, then remove the original
+    (an existing .gz is overwritten, mirroring `gzip -f`). Returns True on
+    success, False on failure.
+
+    The original is unlinked, never truncated: files in the extraction tree
+    may be hardlinks to the user's input (--ingest_mode), and writing
+    through one would alter that input.
+    """
+    if not gzip_file(fpath, fpath + ".gz", level):
+        return False
+    try:
         os.remove(fpath)
         return True
     except OSError as e:
@@ -590,7 +1046,7 @@ def gzip_file_in_place(fpath: str) -> bool:
         return False
 
 
-def gzip_files_in_dir(dirpath: str, suffix: str) -> None:
+def gzip_files_in_dir(dirpath: str, suffix: str, level: int = DEFAULT_GZIP_LEVEL) -> None:
     """
     Gzip every file directly inside dirpath whose name ends with suffix
     (non-recursive, in place). Files already ending in suffix + '.gz' are
@@ -605,18 +1061,24 @@ def gzip_files_in_dir(dirpath: str, suffix: str) -> None:
             continue
         fpath = os.path.join(dirpath, fname)
         if os.path.isfile(fpath):
-            gzip_file_in_place(fpath)
+            gzip_file_in_place(fpath, level)
 
 
-def compress_reconstruct_logs(dest_dir: str) -> None:
+def compress_reconstruct_logs(dest_dir: str, fs=None, level: int = DEFAULT_GZIP_LEVEL) -> None:
     """
     Gzip-compress any CoRAL *_reconstruct.log file sitting directly inside
     dest_dir, in place (the original is removed after a successful
     compression, the .gz is kept). A prior pass's output already ends in
     .log.gz and won't match RECONSTRUCT_LOG_SUFFIX, so this is naturally
     idempotent on reaggregation without needing to track what it already did.
+
+    fs: optional asa_output.OutputTree dest_dir belongs to, whose recorded
+    copies are compressed from their sources.
     """
-    gzip_files_in_dir(dest_dir, RECONSTRUCT_LOG_SUFFIX)
+    if fs is not None:
+        fs.gzip_files(dest_dir, RECONSTRUCT_LOG_SUFFIX, level)
+    else:
+        gzip_files_in_dir(dest_dir, RECONSTRUCT_LOG_SUFFIX, level)
 
 
 def relative_to_results(abs_path: str, results_dir: str) -> str:
@@ -0,0 +1,267 @@
+"""
+asa_cache.py
+Persistent, content-addressed cache of Stage 2 extraction trees
+(--extraction_cache).
+
+Re-aggregating the same inputs — a new name map, a few extra samples, one
+reclassified cohort — used to re-extract every archive from scratch. An
+ExtractionCache keeps the finished, filtered tree of each top-level input
+archive (nested archives already expanded, --prune_extraction applied) and
+hands it back on the next run via reflinks/hardlinks (asa_aggregator
+.ingest_file), so a hit costs a directory walk rather than an inflate.
+
+Layout under the cache dir:
+  entries/<key>/tree/       the extracted tree, as Stage 2 left it but with
+                            any unwrapped wrapper dir put back (see
+                            clone_extraction), so one entry serves every
+                            name the archive turns up under
+  entries/<key>/meta.json   size, source name, wrapper dir, format version
+  entries/<key>/last_used   empty marker; its mtime drives LRU eviction
+  tmp/                      entries being built, renamed into entries/ whole
+  .lock                     flock: shared while reading/publishing, exclusive
+                            to evict — so concurrent runs never see a
+                            half-written entry or lose one mid-copy
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from asa_aggregator import __version__, fcntl, ingest_file
+
+# Bump when the shape of a cached tree changes (extraction rules, filters).
+CACHE_FORMAT = 2
+
+CACHE_KEY_MODES = ("sha256", "stat")
+
+
+def clone_tree(src: str, dest: str) -> int:
+    """
+    Recreate the tree at src under dest (which may already exist, empty)
+    using reflinks/hardlinks where possible. Returns the file count.
+    """
+    n = [0]
+
+    def _place(s: str, d: str) -> str:
+        ingest_file(s, d, "auto")
+        n[0] += 1
+        return d
+
+    shutil.copytree(src, dest, copy_function=_place, dirs_exist_ok=True, symlinks=True)
+    return n[0]
+
+
+def clone_extraction(src: str, src_stem: Optional[str], wrapper: Optional[str],
+                     dest: str, dest_stem: Optional[str]) -> int:
+    """
+    clone_tree() for a Stage 2 extraction tree, redoing its wrapper unwrap.
+    wrapper is the sole top-level dir the archive extracted to (None if
+    there was none), which Aggregator._unwrap_redundant_dir hoists away when
+    it is named for the archive's stem. src came from an archive stemmed
+    src_stem; dest gets the tree the same bytes stemmed dest_stem would
+    have given. A stem of None is never unwrapped.
+    """
+    src_unwrapped = wrapper is not None and wrapper == src_stem
+    dest_unwrapped = wrapper is not None and wrapper == dest_stem
+    if src_unwrapped and not dest_unwrapped:
+        dest = os.path.join(dest, wrapper)
+    elif dest_unwrapped and not src_unwrapped:
+        src = os.path.join(src, wrapper)
+    return clone_tree(src, dest)
+
+
+def file_digest(path: str) -> str:
+    """sha256 of the file at path's content."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tree_size(top: str) -> int:
+    total = 0
+    for root, _, files in os.walk(top):
+        for fname in files:
+            try:
+                total += os.lstat(os.path.join(root, fname)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ExtractionCache:
+    """
+    One cache directory, opened for the duration of Stage 2. All methods
+    degrade to a warning and a cache miss on I/O errors — the cache must
+    never be the reason an aggregation fails.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, key_mode: str = "sha256"):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.key_mode = key_mode
+        self.entries_dir = os.path.join(self.cache_dir, "entries")
+        self.tmp_dir = os.path.join(self.cache_dir, "tmp")
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._lock_fh = open(os.path.join(self.cache_dir, ".lock"), "a+")
+        self._used: Set[str] = set()
+        self._lock(shared=True)
+
+    # -- locking ---------------------------------------------------------
+
+    def _lock(self, shared: bool, blocking: bool = True) -> bool:
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._lock_fh.fileno(), flags)
+            return True
+        except OSError:
+            return False
+
+    def close(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_fh.fileno(), fcntl.LOCK_UN)
+        self._lock_fh.close()
+
+    # -- keys ------------------------------------------------------------
+
+    def key_for(self, archive_path: str, prune: bool,
+                digest: Optional[str] = None) -> str:
+        """
+        Cache key for extracting archive_path: its content (digest, if the
+        caller already has it) or in stat mode its identity, plus prune,
+        since a pruned tree is missing files. The archive's name is not part
+        of it — entries are stored before the wrapper unwrap its stem
+        decides, and fetch() redoes that per copy.
+        """
+        if self.key_mode == "stat":
+            st = os.stat(archive_path)
+            ident = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+        else:
+            ident = digest or file_digest(archive_path)
+        return hashlib.sha256(f"{ident}|prune={int(prune)}|fmt={CACHE_FORMAT}|"
+                              f"{__version__}".encode()).hexdigest()
+
+    # -- lookup / publish ------------------------------------------------
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.entries_dir, key)
+
+    def fetch(self, key: str, dest: str,
+              stem: Optional[str]) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Populate dest from a cached tree, unwrapped as an archive stemmed
+        stem would be. (file count, wrapper dir) on a hit, None on a miss.
+        """
+        entry = self._entry(key)
+        tree = os.path.join(entry, "tree")
+        if not os.path.isdir(tree):
+            return None
+        try:
+            with open(os.path.join(entry, "meta.json")) as fh:
+                wrapper = json.load(fh).get("wrapper")
+            n = clone_extraction(tree, None, wrapper, dest, stem)
+            self._touch(entry)
+        except (OSError, ValueError, shutil.Error) as e:
+            print(f"  Warning: could not read extraction cache entry {key[:12]}: {e}")
+            shutil.rmtree(dest, ignore_errors=True)
+            os.makedirs(dest, exist_ok=True)
+            return None
+        self._used.add(key)
+        return n, wrapper
+
+    def store(self, key: str, src: str, source_name: str,
+              stem: Optional[str], wrapper: Optional[str]) -> bool:
+        """
+        Publish the finished tree at src, extracted from an archive stemmed
+        stem with wrapper dir wrapper, under key (no-op if present).
+        """
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            self._touch(entry)
+            self._used.add(key)
+            return False
+        tmp = os.path.join(self.tmp_dir, f"{key}.{os.getpid()}")
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            clone_extraction(src, stem, wrapper, os.path.join(tmp, "tree"), None)
+            meta = {"format": CACHE_FORMAT, "version": __version__,
+                    "source": source_name, "wrapper": wrapper,
+                    "size": tree_size(os.path.join(tmp, "tree")),
+                    "created": time.time()}
+            with open(os.path.join(tmp, "meta.json"), "w") as fh:
+                json.dump(meta, fh)
+            open(os.path.join(tmp, "last_used"), "w").close()
+            os.rename(tmp, entry)
+        except OSError as e:
+            # Includes losing the rename race to a concurrent run that
+            # published the same key first — its entry is just as good.
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(entry):
+                print(f"  Warning: could not store extraction cache entry for "
+                      f"{source_name}: {e}")
+            return False
+        self._used.add(key)
+        return True
+
+    def _touch(self, entry: str) -> None:
+        try:
+            os.utime(os.path.join(entry, "last_used"))
+        except OSError:
+            pass
+
+    # -- eviction --------------------------------------------------------
+
+    def evict(self) -> None:
+        """
+        Drop least-recently-used entries until the cache fits max_bytes,
+        never one this run used. Needs the exclusive lock; if another run
+        is still reading the cache, eviction is skipped until a later run.
+        """
+        if not self._lock(shared=False, blocking=False):
+            print("  Extraction cache busy (in use by another run); eviction deferred.")
+            return
+        try:
+            sizes: Dict[str, int] = {}
+            last_used: Dict[str, float] = {}
+            for key in os.listdir(self.entries_dir):
+                entry = self._entry(key)
+                try:
+                    with open(os.path.join(entry, "meta.json")) as fh:
+                        sizes[key] = int(json.load(fh).get("size", 0))
+                    last_used[key] = os.path.getmtime(os.path.join(entry, "last_used"))
+                except (OSError, ValueError):
+                    sizes[key], last_used[key] = 0, 0.0
+            total = sum(sizes.values())
+            evicted = freed = 0
+            for key in sorted(last_used, key=last_used.get):
+                if total <= self.max_bytes:
+                    break
+                if key in self._used:
+                    continue
+                doomed = os.path.join(self.tmp_dir, f"{key}.evict.{os.getpid()}")
+                try:
+                    os.rename(self._entry(key), doomed)
+                except OSError:
+                    continue
+                shutil.rmtree(doomed, ignore_errors=True)
+                total -= sizes[key]
+                freed += sizes[key]
+                evicted += 1
+            if evicted:
+                print(f"  Extraction cache: evicted {evicted} tree(s), "
+                      f"{freed / (1024 * 1024):.2f} MB freed "
+                      f"({total / (1024 * 1024):.2f} MB in use)")
+        finally:
+            self._lock(shared=True)
@@ -0,0 +1,210 @@
+"""
+asa_compress.py
+Shared compression for Stage 5 and the final archive (--compress_jobs,
+--gzip_level).
+
+Stage 5 used to compress as it went: each sample's cnvkit tarball and
+CoRAL reconstruct logs inline in its sample dir build, then the
+bfbarchitect archive, one after another. Instead those call sites queue
+their work on a CompressionPool, sized by its input, and the pool runs the
+whole batch on its threads (zlib releases the GIL) once Stage 5 has
+queued everything, largest job first — so one big reconstruct log or
+bfbarchitect dir starts at once rather than being what everything else
+waits on at the end. Each job's console lines are held back and handed
+out in submission order, so the log reads the same at any thread count.
+
+The final archive is a single gzip stream, which no amount of job-level
+parallelism splits. With more than one thread it is written through a
+GzipBlockWriter, which deflates it in blocks on the pool's threads the
+way pigz does: each block primed with the previous block's last 32 KiB
+and ended on a byte boundary, so the blocks join into one ordinary gzip
+member. With one thread every stream is written by the gzip module
+exactly as before.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+from asa_aggregator import DEFAULT_GZIP_LEVEL
+
+# GzipBlockWriter block size, and how many blocks may be in flight per thread.
+GZIP_BLOCK_BYTES = 1024 * 1024
+GZIP_BLOCKS_PER_THREAD = 4
+
+# Back-reference window carried from one block into the next.
+_DEFLATE_WINDOW = 32 * 1024
+
+
+class ThreadOutput(io.TextIOBase):
+    """
+    A sys.stdout stand-in for thread pools: contextlib.redirect_stdout is
+    process-wide, so this diverts the writes of a thread inside capture()
+    to that thread's own buffer and passes every other write through.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        return (self._stream if buf is None else buf).write(s)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    @contextlib.contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        self._local.buf = io.StringIO()
+        try:
+            yield self._local.buf
+        finally:
+            self._local.buf = None
+
+
+class CompressionPool:
+    """
+    Queued gzip/tar jobs, run as a batch largest-first on `workers`
+    threads, at gzip level `level` (which the jobs themselves read).
+    """
+
+    def __init__(self, workers: int = 1, level: int = DEFAULT_GZIP_LEVEL):
+        self.workers = max(1, workers)
+        self.level = level
+        # (key, size, fn, args), in submission order
+        self._jobs: List[Tuple[object, int, Callable, tuple]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def queued_bytes(self) -> int:
+        return sum(job[1] for job in self._jobs)
+
+    def submit(self, key: object, size: int, fn: Callable, *args) -> None:
+        """Queue fn(*args) under key; size (input bytes) decides when it starts."""
+        self._jobs.append((key, size, fn, args))
+
+    def run(self) -> Iterator[Tuple[object, object, str, Optional[str]]]:
+        """
+        Run every queued job and yield (key, result, output, error) for
+        each, in submission order: output is the job's console lines,
+        error a message if it raised. Jobs start largest first; with one
+        worker they simply run in order, printing as they go.
+        """
+        jobs, self._jobs = self._jobs, []
+        if self.workers <= 1 or len(jobs) <= 1:
+            for key, _, fn, args in jobs:
+                try:
+                    yield key, fn(*args), "", None
+                except Exception as e:
+                    yield key, None, "", str(e)
+            return
+
+        out = ThreadOutput(sys.stdout)
+
+        def _run(fn: Callable, args: tuple) -> Tuple[object, str, Optional[str]]:
+            with out.capture() as buf:
+                try:
+                    result, error = fn(*args), None
+                except Exception as e:
+                    result, error = None, str(e)
+            return result, buf.getvalue(), error
+
+        order = sorted(range(len(jobs)), key=lambda i: -jobs[i][1])
+        with contextlib.redirect_stdout(out):
+            pool = self.executor()
+            futures = {i: pool.submit(_run, jobs[i][2], jobs[i][3]) for i in order}
+            for i, (key, *_) in enumerate(jobs):
+                yield (key, *futures.pop(i).result())
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _deflate_block(data: bytes, zdict: bytes, level: int, last: bool) -> bytes:
+    if zdict:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return comp.compress(data) + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class GzipBlockWriter(io.RawIOBase):
+    """
+    Write-only file object that gzips everything written to it into
+    fileobj as one gzip member (with the header gzip.GzipFile would give
+    `filename`), deflating GZIP_BLOCK_BYTES blocks on pool's threads.
+    Closing it finishes the member; fileobj is left open.
+    """
+
+    def __init__(self, fileobj, pool: CompressionPool, filename: str = ""):
+        self._fileobj = fileobj
+        self._executor = pool.executor()
+        self._level = pool.level
+        self._max_pending = pool.workers * GZIP_BLOCKS_PER_THREAD
+        self._pending: Deque[Future] = deque()
+        self._buf = bytearray()
+        self._window = b""
+        self._crc = 0
+        self._size = 0
+        self._write_header(os.path.basename(filename))
+
+    def _write_header(self, filename: str) -> None:
+        if filename.endswith(".gz"):
+            filename = filename[:-3]
+        fname = filename.encode("latin-1", "replace")
+        xfl = b"\002" if self._level == 9 else b"\004" if self._level == 1 else b"\000"
+        self._fileobj.write(b"\037\213\010" + (b"\010" if fname else b"\000")
+                            + struct.pack("<L", int(time.time())) + xfl + b"\377"
+                            + (fname + b"\000" if fname else b""))
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buf += data
+        while len(self._buf) >= GZIP_BLOCK_BYTES:
+            block = bytes(self._buf[:GZIP_BLOCK_BYTES])
+            del self._buf[:GZIP_BLOCK_BYTES]
+            self._submit(block, last=False)
+        return len(data)
+
+    def _submit(self, block: bytes, last: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        self._pending.append(self._executor.submit(
+            _deflate_block, block, self._window, self._level, last))
+        self._window = (self._window + block)[-_DEFLATE_WINDOW:]
+        while len(self._pending) > (0 if last else self._max_pending):
+            self._fileobj.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._submit(bytes(self._buf), last=True)
+            self._buf.clear()
+            self._fileobj.write(struct.pack("<LL", self._crc, self._size & 0xFFFFFFFF))
+        finally:
+            super().close()
@@ -0,0 +1,520 @@
+"""
+asa_feature_store.py
+Columnar storage for result_table feature rows (Stages 4-6).
+
+A pooled cohort's result tables run to hundreds of thousands of feature
+rows, and held as run.json row dicts — 32 keys each — they cost a few KB
+a row, almost all of it the same handful of reference, classification,
+tissue and version strings repeated on every row. Here every row is a
+slot in a set of typed columns instead:
+
+  - string columns hold int32 codes into one interned value table shared
+    by every column, list item and result table
+  - "AA amplicon number" and the four numeric columns hold the int64 /
+    float64 values Stage 6 coerces them to, read as NumPy arrays; a value
+    that doesn't coerce keeps its original string in a per-column side
+    table, exactly as the coercion would have left it
+  - list columns (LIST_COLUMNS) hold offsets into an array of item codes
+    — the gene symbols, in the same shared value table — already parsed
+    by parse_list_field
+
+A FeatureChunk is one result table, in file order, with its own value
+table, built in a single pass over the table's rows; it is what a Stage 4
+parse worker ships back. FeatureStore.extend() appends a chunk with each
+sample's rows made contiguous, so a sample's rows are a range of slots.
+
+Stage 6 writes the values it resolves (paths, tool versions) back into
+their string columns with assign(), gives each row its CSV sort key with
+set_sort_key(), and reads rows back a batch at a time with rows() and
+sorted_rows().
+
+SQLiteFeatureStore (--spill_features) has the same interface but keeps
+the rows in an SQLite database on disk instead, for cohorts whose rows
+don't fit in memory even in columns: each chunk is inserted as it
+arrives, and the CSV order comes from an index over the sort keys rather
+than an in-memory sort. Only one result table's chunk is ever resident.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from array import array
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from asa_aggregator import LIST_COLUMNS, NOT_PROVIDED, RUN_JSON_COLUMNS, parse_list_field
+
+# run.json / CSV rows are decoded, and spilled rows inserted and updated,
+# this many at a time.
+BATCH_ROWS = 8192
+
+# SQLiteFeatureStore's database, in the work dir.
+FEATURE_SPILL_DB = "feature_rows.sqlite"
+
+INT_COLUMNS: Tuple[str, ...] = ("AA amplicon number",)
+FLOAT_COLUMNS: Tuple[str, ...] = (
+    "Complexity score", "Captured interval length",
+    "Feature median copy number", "Feature maximum copy number",
+)
+# Everything else in a run.json row is a plain string.
+STRING_COLUMNS: Tuple[str, ...] = tuple(
+    col for col in RUN_JSON_COLUMNS
+    if col not in INT_COLUMNS and col not in FLOAT_COLUMNS and col not in LIST_COLUMNS
+)
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _coerce_int(value: str) -> object:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return value
+
+
+def _coerce_float(value: str) -> object:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return value
+
+
+def _view(arr: array, dtype) -> np.ndarray:
+    """arr as a NumPy array, without copying."""
+    return np.frombuffer(arr, dtype=dtype) if len(arr) else np.empty(0, dtype)
+
+
+def _gather_runs(items: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """items[starts[0]:starts[0]+lengths[0]] + items[starts[1]:...] + ..., vectorised."""
+    ends = np.cumsum(lengths)
+    # Output position k belongs to the run whose new start is ends - lengths,
+    # and reads item k - (that new start) + (the run's old start).
+    shift = np.repeat(starts - (ends - lengths), lengths)
+    return items[np.arange(len(shift)) + shift]
+
+
+def _group_order(chunk: "FeatureChunk") -> np.ndarray:
+    """chunk's rows with each sample's made contiguous, in order of first appearance."""
+    return np.fromiter((r for rows, _ in chunk.groups.values() for r in rows),
+                       dtype=np.intp, count=chunk.n_rows)
+
+
+def _slot_ranges(chunk: "FeatureChunk", base: int
+                 ) -> "OrderedDict[str, Tuple[range, Dict[str, str]]]":
+    """{ sample name -> (its slots, its extra values) } for chunk appended at base."""
+    slots: "OrderedDict[str, Tuple[range, Dict[str, str]]]" = OrderedDict()
+    for sname, (rows, extra) in chunk.groups.items():
+        slots[sname] = (range(base, base + len(rows)), extra)
+        base += len(rows)
+    return slots
+
+
+class _Values:
+    """An interned value table: each distinct value stored once, by code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self._codes: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: Hashable) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Columns:
+    """The typed column arrays FeatureChunk and FeatureStore share."""
+
+    def __init__(self):
+        self.n_rows = 0
+        self.strings: Dict[str, array] = {col: array("i") for col in STRING_COLUMNS}
+        self.ints: Dict[str, array] = {col: array("q") for col in INT_COLUMNS}
+        self.floats: Dict[str, array] = {col: array("d") for col in FLOAT_COLUMNS}
+        self.list_offsets: Dict[str, array] = {col: array("q", [0]) for col in LIST_COLUMNS}
+        self.list_items: Dict[str, array] = {col: array("i") for col in LIST_COLUMNS}
+        # column -> {row: value} for values an int/float column can't hold
+        self.odd: Dict[str, Dict[int, object]] = {col: {} for col in INT_COLUMNS + FLOAT_COLUMNS}
+
+    values: List[Hashable]  # the value table string and list item codes index
+
+    def column(self, col: str, rows: np.ndarray) -> list:
+        """col's values at rows, as run.json rows hold them."""
+        values = self.values
+        if col in self.strings:
+            return [values[c] for c in _view(self.strings[col], np.int32)[rows].tolist()]
+        if col in self.list_offsets:
+            offsets = _view(self.list_offsets[col], np.int64)
+            items = self.list_items[col]
+            return [[values[c] for c in items[start:end]]
+                    for start, end in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+        if col in self.ints:
+            out = _view(self.ints[col], np.int64)[rows].tolist()
+        else:
+            out = _view(self.floats[col], np.float64)[rows].tolist()
+        odd = self.odd[col]
+        if odd:
+            for i, row in enumerate(rows.tolist()):
+                if row in odd:
+                    out[i] = odd[row]
+        return out
+
+    def columns(self, slots: Sequence[int], cols: Sequence[str]) -> Iterator[tuple]:
+        """(value of each of cols) for each of slots, in order."""
+        for start in range(0, len(slots), BATCH_ROWS):
+            rows = np.asarray(slots[start:start + BATCH_ROWS], dtype=np.intp)
+            yield from zip(*[self.column(col, rows) for col in cols])
+
+    def rows(self, slots: Sequence[int]) -> Iterator[dict]:
+        """The run.json row at each of slots: RUN_JSON_COLUMNS in order."""
+        for values in self.columns(slots, RUN_JSON_COLUMNS):
+            yield dict(zip(RUN_JSON_COLUMNS, values))
+
+
+class FeatureChunk(_Columns):
+    """
+    One result table's feature rows. groups maps each sample name, in order
+    of first appearance, to (its rows, {extra column: first row's value}).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.values: List[Hashable] = []
+        self.groups: "OrderedDict[str, Tuple[List[int], Dict[str, str]]]" = OrderedDict()
+
+    @classmethod
+    def from_rows(cls, columns: List[str], rows: Iterator[List[str]],
+                  extra: Tuple[str, ...] = ()) -> "FeatureChunk":
+        """
+        Build from a table's (columns, rows). Empty or absent fields read
+        as NOT_PROVIDED; "Sample name" must be one of the columns.
+
+        Every field is first coded as the string it is; the int, float and
+        list conversions then run once per distinct string, not per row.
+        """
+        where = {name: i for i, name in enumerate(columns)}
+        extra_picks = [(col, where[col]) for col in extra if col in where]
+        sname_at = where["Sample name"]
+
+        chunk = cls()
+        table = _Values()
+        table.code("")  # code 0; becomes NOT_PROVIDED below
+        codes, values = table._codes, table.values
+        raw = {col: array("i") for col in RUN_JSON_COLUMNS if col in where}
+        picks = [(raw[col].append, where[col]) for col in raw]
+        groups = chunk.groups
+        n = 0
+        for row in rows:
+            sname = row[sname_at] or NOT_PROVIDED
+            group = groups.get(sname)
+            if group is None:
+                group = groups[sname] = ([], {col: row[i] or NOT_PROVIDED
+                                              for col, i in extra_picks})
+            group[0].append(n)
+            for append, i in picks:
+                v = row[i]
+                c = codes.get(v)
+                if c is None:
+                    c = codes[v] = len(values)
+                    values.append(v)
+                append(c)
+            n += 1
+        chunk.n_rows = n
+
+        def _codes(col: str) -> np.ndarray:
+            return _view(raw[col], np.int32) if col in raw else np.zeros(n, np.int32)
+
+        for col in STRING_COLUMNS:
+            chunk.strings[col] = raw.get(col, array("i", bytes(4 * n)))
+        for col, arr_type, dtype, coerce in (
+                [(col, "q", np.int64, _coerce_int) for col in INT_COLUMNS]
+                + [(col, "d", np.float64, _coerce_float) for col in FLOAT_COLUMNS]):
+            col_codes = _codes(col)
+            converted = np.zeros(len(values), dtype)
+            ok = np.zeros(len(values), bool)
+            odd_by_code = {}
+            for u in np.unique(col_codes).tolist():
+                v = coerce(values[u] or NOT_PROVIDED)
+                if type(v) is str or (type(v) is int and not _INT64_MIN <= v <= _INT64_MAX):
+                    odd_by_code[u] = v
+                else:
+                    converted[u], ok[u] = v, True
+            target = chunk.ints if arr_type == "q" else chunk.floats
+            target[col] = array(arr_type, converted[col_codes].tobytes())
+            chunk.odd[col] = {row: odd_by_code[int(col_codes[row])]
+                              for row in np.flatnonzero(~ok[col_codes]).tolist()}
+        for col in LIST_COLUMNS:
+            col_codes = _codes(col)
+            distinct = np.unique(col_codes).tolist()
+            lengths = np.zeros(len(values), np.int64)
+            starts = np.zeros(len(values), np.int64)
+            parsed = array("i")
+            for u in distinct:
+                starts[u] = len(parsed)
+                parsed.extend(map(table.code, parse_list_field(values[u] or NOT_PROVIDED)))
+                lengths[u] = len(parsed) - starts[u]
+            row_lengths = lengths[col_codes]
+            items = _gather_runs(_view(parsed, np.int32), starts[col_codes], row_lengths)
+            chunk.list_items[col] = array("i", items.tobytes())
+            chunk.list_offsets[col].frombytes(np.cumsum(row_lengths).tobytes())
+        chunk.values = values
+        values[0] = NOT_PROVIDED
+        return chunk
+
+
+class FeatureStore(_Columns):
+    """Every parsed feature row of a cohort, addressed by slot number."""
+
+    def __init__(self):
+        super().__init__()
+        self._table = _Values()
+        self._table.code(NOT_PROVIDED)
+        self._sort_keys: List[Tuple[tuple, int]] = []
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def values(self) -> List[Hashable]:
+        return self._table.values
+
+    def extend(self, chunk: FeatureChunk
+               ) -> "OrderedDict[str, Tuple[range, Dict[str, str]]]":
+        """
+        Append chunk's rows, each sample's made contiguous (in order of
+        first appearance, rows in file order), and return
+        { sample name -> (its slots, its extra values) }.
+        """
+        order = _group_order(chunk)
+        in_order = bool(np.all(order[1:] > order[:-1])) if len(order) > 1 else True
+        base = self.n_rows
+        remap = np.fromiter(map(self._table.code, chunk.values), dtype=np.int32,
+                            count=len(chunk.values))
+
+        def _take(arr: array, dtype) -> np.ndarray:
+            values = _view(arr, dtype)
+            return values if in_order else values[order]
+
+        for col, arr in chunk.strings.items():
+            self.strings[col].frombytes(remap[_take(arr, np.int32)].tobytes())
+        for col, arr in chunk.ints.items():
+            self.ints[col].frombytes(_take(arr, np.int64).tobytes())
+        for col, arr in chunk.floats.items():
+            self.floats[col].frombytes(_take(arr, np.float64).tobytes())
+        if any(chunk.odd.values()):
+            slot_of = np.empty(chunk.n_rows, dtype=np.intp)
+            slot_of[order] = np.arange(chunk.n_rows)
+            for col, odd in chunk.odd.items():
+                for row, value in odd.items():
+                    self.odd[col][base + int(slot_of[row])] = value
+
+        for col, arr in chunk.list_offsets.items():
+            items = _view(chunk.list_items[col], np.int32)
+            offsets = _view(arr, np.int64)
+            if in_order:
+                lengths = np.diff(offsets)
+            else:
+                starts = offsets[:-1][order]
+                lengths = offsets[1:][order] - starts
+                items = _gather_runs(items, starts, lengths)
+            item_base = len(self.list_items[col])
+            self.list_items[col].frombytes(remap[items].tobytes())
+            self.list_offsets[col].frombytes((np.cumsum(lengths) + item_base).tobytes())
+        self.n_rows += chunk.n_rows
+        return _slot_ranges(chunk, base)
+
+    def assign(self, slot: int, values: Dict[str, object]) -> None:
+        """Overwrite string columns at slot (None is kept as None)."""
+        for col, v in values.items():
+            self.strings[col][slot] = self._table.code(v)
+
+    def set_sort_key(self, slot: int, key: tuple) -> None:
+        """Place slot in sorted_rows() by key, which must be unique."""
+        self._sort_keys.append((key, slot))
+
+    def sorted_rows(self) -> Iterator[dict]:
+        """Rows of every slot given a sort key, in key order."""
+        self._sort_keys.sort()
+        order = [slot for _, slot in self._sort_keys]
+        self._sort_keys = []
+        return self.rows(order)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteFeatureStore:
+    """
+    FeatureStore's interface over an SQLite database at path (replaced if
+    it exists). Values keep their types: a column holds TEXT, INTEGER or
+    REAL as the run.json value is, lists as JSON text, and the two things
+    SQLite can't hold — NaN and integers beyond 64 bits — as their
+    strings, which coerce back exactly because a value only stays a
+    string in a numeric column when it doesn't coerce.
+    """
+
+    # The CSV sort key: (sample, amplicon number, feature ID, sequence).
+    SORT_COLUMNS: Tuple[str, ...] = ("sort_sample", "sort_amp", "sort_fid", "sort_seq")
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.exists(path):
+            os.remove(path)
+        self._db = sqlite3.connect(path)
+        # Scratch data: nothing to recover after a crash.
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        names = ", ".join(_sql_name(col) for col in RUN_JSON_COLUMNS + self.SORT_COLUMNS)
+        self._db.execute(f"CREATE TABLE features (slot INTEGER PRIMARY KEY, {names})")
+        self._insert = (f"INSERT INTO features VALUES "
+                        f"(?{', ?' * len(RUN_JSON_COLUMNS)}{', NULL' * len(self.SORT_COLUMNS)})")
+        self.n_rows = 0
+        # (columns) -> [(values..., slot)] awaiting an UPDATE
+        self._pending: Dict[Tuple[str, ...], List[tuple]] = {}
+        self._n_pending = 0
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def extend(self, chunk: FeatureChunk
+               ) -> "OrderedDict[str, Tuple[range, Dict[str, str]]]":
+        """As FeatureStore.extend(); the rows go to disk a batch at a time."""
+        order = _group_order(chunk)
+        base = self.n_rows
+        for start in range(0, chunk.n_rows, BATCH_ROWS):
+            rows = order[start:start + BATCH_ROWS]
+            cols = [_encode_column(col, chunk.column(col, rows)) for col in RUN_JSON_COLUMNS]
+            self._db.executemany(self._insert, zip(range(base + start, base + start + len(rows)),
+                                                   *cols))
+        self._db.commit()
+        self.n_rows += chunk.n_rows
+        return _slot_ranges(chunk, base)
+
+    def assign(self, slot: int, values: Dict[str, object]) -> None:
+        """As FeatureStore.assign(); written out a batch at a time."""
+        self._pending.setdefault(tuple(values), []).append((*values.values(), slot))
+        self._n_pending += 1
+        if self._n_pending >= BATCH_ROWS:
+            self._flush()
+
+    def set_sort_key(self, slot: int, key: tuple) -> None:
+        """As FeatureStore.set_sort_key(); key is a SORT_COLUMNS tuple."""
+        sample, amp, fid, seq = key
+        if not _INT64_MIN <= amp <= _INT64_MAX:
+            amp = float(amp)  # SQLite orders INTEGER and REAL together
+        self.assign(slot, dict(zip(self.SORT_COLUMNS, (sample, amp, fid, seq))))
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        for cols, params in self._pending.items():
+            sets = ", ".join(f"{_sql_name(col)} = ?" for col in cols)
+            self._db.executemany(f"UPDATE features SET {sets} WHERE slot = ?", params)
+        self._db.commit()
+        self._pending.clear()
+        self._n_pending = 0
+
+    def columns(self, slots: Sequence[int], cols: Sequence[str]) -> Iterator[tuple]:
+        """As FeatureStore.columns(), read a run of consecutive slots at a time."""
+        decoders = _decoders(cols)
+        select = (f"SELECT {', '.join(map(_sql_name, cols))} FROM features "
+                  f"WHERE slot >= ? AND slot < ? ORDER BY slot")
+        for run_start, run_stop in _slot_runs(slots):
+            for start in range(run_start, run_stop, BATCH_ROWS):
+                self._flush()
+                batch = self._db.execute(select, (start, min(start + BATCH_ROWS, run_stop)))
+                for values in batch.fetchall():
+                    yield _decode(values, decoders)
+
+    def rows(self, slots: Sequence[int]) -> Iterator[dict]:
+        """As FeatureStore.rows()."""
+        for values in self.columns(slots, RUN_JSON_COLUMNS):
+            yield dict(zip(RUN_JSON_COLUMNS, values))
+
+    def sorted_rows(self) -> Iterator[dict]:
+        """As FeatureStore.sorted_rows(), streamed off an index on the sort key."""
+        self._flush()
+        self._db.execute(f"CREATE INDEX features_sort ON features "
+                         f"({', '.join(self.SORT_COLUMNS)})")
+        decoders = _decoders(RUN_JSON_COLUMNS)
+        cursor = self._db.execute(
+            f"SELECT {', '.join(map(_sql_name, RUN_JSON_COLUMNS))} FROM features "
+            f"WHERE sort_seq IS NOT NULL ORDER BY {', '.join(self.SORT_COLUMNS)}")
+        while True:
+            batch = cursor.fetchmany(BATCH_ROWS)
+            if not batch:
+                return
+            for values in batch:
+                yield dict(zip(RUN_JSON_COLUMNS, _decode(values, decoders)))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _slot_runs(slots: Sequence[int]) -> Iterator[Tuple[int, int]]:
+    """slots as (start, stop) runs of consecutive slot numbers."""
+    if isinstance(slots, range) and slots.step == 1:
+        if slots:
+            yield slots.start, slots.stop
+        return
+    start = stop = None
+    for slot in slots:
+        if slot != stop:
+            if start is not None:
+                yield start, stop
+            start = slot
+        stop = slot + 1
+    if start is not None:
+        yield start, stop
+
+
+def _sql_name(col: str) -> str:
+    return f'"{col}"'
+
+
+def _encode_column(col: str, values: list) -> list:
+    """A column's run.json values as SQLiteFeatureStore stores them."""
+    if col in LIST_COLUMNS:
+        return [json.dumps(v) for v in values]
+    if col in INT_COLUMNS:
+        return [str(v) if type(v) is int and not _INT64_MIN <= v <= _INT64_MAX else v
+                for v in values]
+    if col in FLOAT_COLUMNS:
+        return [v if v == v else "nan" for v in values]
+    return values
+
+
+def _decode_int(value: object) -> object:
+    # Only the values _encode_column turned into strings come back as one.
+    return _coerce_int(value) if type(value) is str else value
+
+
+def _decode_float(value: object) -> object:
+    return _coerce_float(value) if type(value) is str else value
+
+
+_DECODERS = {col: json.loads for col in LIST_COLUMNS}
+_DECODERS.update({col: _decode_int for col in INT_COLUMNS})
+_DECODERS.update({col: _decode_float for col in FLOAT_COLUMNS})
+
+
+def _decoders(cols: Sequence[str]) -> List[Tuple[int, object]]:
+    """(position, decoder) of each of cols stored in another form than its value."""
+    return [(i, _DECODERS[col]) for i, col in enumerate(cols) if col in _DECODERS]
+
+
+def _decode(values: tuple, decoders: List[Tuple[int, object]]) -> list:
+    values = list(values)
+    for i, decode in decoders:
+        values[i] = decode(values[i])
+    return values
@@ -0,0 +1,167 @@
+"""
+asa_manifest.py
+Persisted Stage 3 discovery results (--reuse_discovery).
+
+Discovery over a large cohort re-lists every directory and re-reads every
+summary header, graph/cycles file and log on each run, although the answer
+only changes when the inputs do. With --reuse_discovery its outcome — the
+sample registry (reconstruction tool and scraped versions included),
+classification/AUX/files dirs, floating CNV beds and the CNV beds it
+generated — is written to DISCOVERY_MANIFEST in the work dir, and a later
+run with unchanged inputs loads it instead of walking the tree.
+
+A manifest is trusted only when all of these still match:
+  - MANIFEST_FORMAT and the aggregator __version__
+  - the discovery-relevant options (--prune_extraction, --lazy_extraction)
+  - every input path's size and mtime; for directory inputs, the size and
+    mtime of every file beneath it
+  - the size of every file the manifest points at, in the tree Stage 2
+    just rebuilt (extracted files don't keep their mtimes across runs)
+
+Paths are stored relative to the extraction dir, so the manifest survives
+the work dir being moved along with it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import List, Optional, Tuple
+
+from asa_aggregator import __version__, AmpliconPathPool, SampleRecord
+
+# Bump when the manifest layout or any discovery rule changes.
+MANIFEST_FORMAT = 1
+
+DISCOVERY_MANIFEST = "discovery_manifest.json"
+
+# SampleRecord fields Stage 3 sets that hold extraction-tree paths, and
+# those that hold plain values. Stage 4-6 fields are never persisted.
+RECORD_PATH_FIELDS: Tuple[str, ...] = (
+    "aa_results_dir", "cnvkit_dir", "cnv_calls_bed", "cnv_calls_unfiltered_gains_bed",
+    "run_metadata_json", "sample_metadata_json", "aa_cnv_seeds_bed", "finish_flag",
+    "timing_log", "pipeline_log", "aa_summary_file",
+)
+RECORD_VALUE_FIELDS: Tuple[str, ...] = (
+    "aa_version", "amplicon_suite_pipeline_version", "ac_version", "reconstruction_tool",
+)
+RECORD_DIR_FIELDS: Tuple[str, ...] = ("aa_results_dir", "cnvkit_dir")
+
+
+def input_fingerprint(input_paths: List[str], prune: bool, lazy: bool) -> dict:
+    """
+    Stat-only fingerprint of the inputs: (path, size, mtime) for archives,
+    and a digest over every file's (relpath, size, mtime) for directories.
+    """
+    inputs = []
+    for path in input_paths:
+        abs_path = os.path.abspath(path)
+        if os.path.isdir(abs_path):
+            h = hashlib.sha256()
+            n_files = 0
+            for root, dirs, files in os.walk(abs_path):
+                dirs.sort()
+                for fname in sorted(files):
+                    fpath = os.path.join(root, fname)
+                    try:
+                        st = os.stat(fpath)
+                    except OSError:
+                        continue
+                    rel = os.path.relpath(fpath, abs_path)
+                    h.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+                    n_files += 1
+            inputs.append([abs_path, "dir", n_files, h.hexdigest()])
+        else:
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                inputs.append([abs_path, "missing", 0, 0])
+                continue
+            inputs.append([abs_path, "file", st.st_size, st.st_mtime_ns])
+    return {"inputs": inputs, "prune_extraction": prune, "lazy_extraction": lazy}
+
+
+class ManifestPaths:
+    """Converts extraction-tree paths to and from their manifest form."""
+
+    def __init__(self, extract_dir: str):
+        self.prefix = extract_dir.rstrip(os.sep) + os.sep
+
+    def rel(self, path: Optional[str]) -> Optional[str]:
+        if path is None:
+            return None
+        if not path.startswith(self.prefix):
+            raise ValueError(f"path outside the extraction dir: {path}")
+        return path[len(self.prefix):]
+
+    def abs(self, rel: Optional[str]) -> Optional[str]:
+        return None if rel is None else self.prefix + rel
+
+
+def record_to_dict(rec: SampleRecord, paths: ManifestPaths) -> dict:
+    entry: dict = {"name": rec.name}
+    for field in RECORD_PATH_FIELDS:
+        entry[field] = paths.rel(getattr(rec, field))
+    for field in RECORD_VALUE_FIELDS:
+        entry[field] = getattr(rec, field)
+    entry["amplicon_files"] = [[num, key, paths.rel(fpath)]
+                               for num, files in rec.amplicon_files.items()
+                               for key, fpath in files.items()]
+    return entry
+
+
+def record_from_dict(entry: dict, paths: ManifestPaths,
+                     amplicon_paths: Optional[AmpliconPathPool] = None) -> SampleRecord:
+    rec = SampleRecord(name=entry["name"], amplicon_paths=amplicon_paths)
+    for field in RECORD_PATH_FIELDS:
+        setattr(rec, field, paths.abs(entry.get(field)))
+    for field in RECORD_VALUE_FIELDS:
+        if entry.get(field) is not None:
+            setattr(rec, field, entry[field])
+    for num, key, rel in entry.get("amplicon_files", ()):
+        rec.amplicon_files.add(num, key, paths.abs(rel))
+    return rec
+
+
+def read_manifest(path: str) -> Optional[dict]:
+    """The manifest at path, or None if absent, unreadable or another format."""
+    try:
+        with open(path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+def write_manifest(path: str, manifest: dict) -> None:
+    """Write atomically, so a killed run never leaves half a manifest."""
+    manifest = dict(manifest, format=MANIFEST_FORMAT, version=__version__)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def stale_reason(manifest: dict, fingerprint: dict) -> Optional[str]:
+    """Why manifest can't be reused against fingerprint, or None if it can."""
+    if manifest.get("version") != __version__:
+        return f"written by version {manifest.get('version')}"
+    old = manifest.get("fingerprint", {})
+    for opt in ("prune_extraction", "lazy_extraction"):
+        if old.get(opt) != fingerprint[opt]:
+            return f"--{opt} differs"
+    old_inputs = old.get("inputs", [])
+    if [i[0] for i in old_inputs] != [i[0] for i in fingerprint["inputs"]]:
+        return "input paths differ"
+    for old_i, new_i in zip(old_inputs, fingerprint["inputs"]):
+        if old_i != new_i:
+            return f"input changed: {new_i[0]}"
+    return None
+
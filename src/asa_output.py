@@ -0,0 +1,245 @@
+"""
+asa_output.py
+The results/ tree Stage 5 builds, as the final archive will hold it.
+
+Most of results/ is verbatim copies of extraction-tree files —
+reconstruction results, CNV beds, metadata, AC's per-amplicon files, AUX
+dirs — which used to be copied in only to be read straight back out by the
+final tarball, so every output byte was written twice. An OutputTree
+records each of those as a (results path -> source path) entry instead;
+only generated content (merged TSVs, tarballs, compressed logs, run.json
+and the CSV) is written under results/, whose directory skeleton is real.
+Stage 5's canonicalising renames, the deep rename and Stage 6's path
+resolution query the union with os-style calls (listdir/isfile/rename/
+walk), at exactly the paths the copies would have had, and write_tarball()
+streams the archive in one pass, reading each recorded file from its
+source.
+
+Recorded sources are read when the archive is written, so the extraction
+tree must stay put until then — it is only removed by _cleanup, after it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import shutil
+import tarfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from asa_aggregator import (
+    DEFAULT_GZIP_LEVEL, EXCLUSION_SUFFIXES, add_file_member, gzip_file, gzip_file_in_place,
+)
+from asa_compress import CompressionPool, GzipBlockWriter
+
+
+class OutputTree:
+    """
+    results/ as real files plus recorded copies. Paths are absolute paths
+    under root; a recorded copy shadows any real file at the same path.
+    Safe to record into from Stage 5's threads.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        # results dir -> {file name: source path}, in recording order
+        self._sources: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _split(path: str) -> Tuple[str, str]:
+        return os.path.split(os.path.normpath(path))
+
+    def source(self, path: str) -> Optional[str]:
+        """The source a recorded copy at path is read from, or None."""
+        parent, name = self._split(path)
+        return self._sources.get(parent, {}).get(name)
+
+    def _discard(self, path: str) -> Optional[str]:
+        parent, name = self._split(path)
+        entries = self._sources.get(parent)
+        return entries.pop(name, None) if entries else None
+
+    # -- recording ----------------------------------------------------------
+
+    def add_file(self, src: str, dest: str) -> None:
+        """Record src as copied to dest, creating dest's parent dirs."""
+        parent, name = self._split(dest)
+        os.makedirs(parent, exist_ok=True)
+        with self._lock:
+            self._sources.setdefault(parent, {})[name] = src
+
+    def add_tree(self, src: str, dest: str,
+                 exclusions: Tuple[str, ...] = (),
+                 inclusions: Tuple[str, ...] = ()) -> bool:
+        """
+        Record the tree at src as copied to dest, with safe_copytree()'s
+        rules: hidden names are skipped; with inclusions, only files ending
+        in one of them are kept (every dir is descended into), otherwise
+        files and dirs ending in an exclusion are dropped. Returns False,
+        after a warning, if part of src could not be read.
+        """
+        errors: List[OSError] = []
+        for root, dirs, files in os.walk(src, onerror=errors.append, followlinks=True):
+            dirs[:] = [d for d in dirs if not d.startswith(".")
+                       and (inclusions or not d.endswith(exclusions))]
+            out_dir = os.path.normpath(os.path.join(dest, os.path.relpath(root, src)))
+            os.makedirs(out_dir, exist_ok=True)
+            recorded = {}
+            for fname in files:
+                if fname.startswith("."):
+                    continue
+                if inclusions:
+                    if not fname.endswith(inclusions):
+                        continue
+                elif fname.endswith(exclusions):
+                    continue
+                fpath = os.path.join(root, fname)
+                if os.path.isfile(fpath):
+                    recorded[fname] = fpath
+            if recorded:
+                with self._lock:
+                    self._sources.setdefault(out_dir, {}).update(recorded)
+        if errors:
+            print(f"Warning: could not copy tree {src} -> {dest}: {errors[0]}")
+            return False
+        return True
+
+    # -- os-style queries -----------------------------------------------------
+
+    def isfile(self, path: str) -> bool:
+        return self.source(path) is not None or os.path.isfile(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def exists(self, path: str) -> bool:
+        return self.source(path) is not None or os.path.exists(path)
+
+    def getsize(self, path: str) -> int:
+        return os.path.getsize(self.source(path) or path)
+
+    def listdir(self, path: str) -> List[str]:
+        names = os.listdir(path)
+        recorded = self._sources.get(os.path.normpath(path))
+        if recorded:
+            present = set(names)
+            names.extend(n for n in recorded if n not in present)
+        return names
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """os.walk over the union; prune dirs in place as with os.walk."""
+        for root, dirs, files in os.walk(top):
+            recorded = self._sources.get(os.path.normpath(root))
+            if recorded:
+                files = [f for f in files if f not in recorded] + list(recorded)
+            yield root, dirs, files
+
+    def unique_dest(self, parent: str, name: str) -> str:
+        """parent/name, or the first free parent/name_2, name_3..."""
+        candidate = os.path.join(parent, name)
+        counter = 2
+        while self.exists(candidate):
+            candidate = os.path.join(parent, f"{name}_{counter}")
+            counter += 1
+        return candidate
+
+    def tree_size(self, top: str) -> int:
+        total = 0
+        for root, _, files in self.walk(top):
+            for fname in files:
+                try:
+                    total += self.getsize(os.path.join(root, fname))
+                except OSError:
+                    pass
+        return total
+
+    # -- changes --------------------------------------------------------------
+
+    def rename(self, old: str, new: str) -> None:
+        """os.rename() for a file or dir, recorded or real."""
+        old, new = os.path.normpath(old), os.path.normpath(new)
+        with self._lock:
+            src = self._discard(old)
+            if src is not None:
+                parent, name = self._split(new)
+                self._sources.setdefault(parent, {})[name] = src
+                return
+            os.rename(old, new)
+            self._discard(new)
+            prefix = old + os.sep
+            for d in [d for d in self._sources if d == old or d.startswith(prefix)]:
+                self._sources[new + d[len(old):]] = self._sources.pop(d)
+
+    def rmtree(self, path: str) -> None:
+        """shutil.rmtree(path, ignore_errors=True), recorded copies included."""
+        path = os.path.normpath(path)
+        shutil.rmtree(path, ignore_errors=True)
+        prefix = path + os.sep
+        with self._lock:
+            for d in [d for d in self._sources if d == path or d.startswith(prefix)]:
+                del self._sources[d]
+
+    def gzip_files(self, dirpath: str, suffix: str, level: int = DEFAULT_GZIP_LEVEL) -> None:
+        """
+        gzip_files_in_dir() over the union: a recorded file is compressed
+        from its source into a real <name>.gz and its record dropped.
+        """
+        try:
+            entries = self.listdir(dirpath)
+        except OSError:
+            return
+        for fname in entries:
+            if not fname.endswith(suffix) or fname.endswith(suffix + ".gz"):
+                continue
+            fpath = os.path.join(dirpath, fname)
+            src = self.source(fpath)
+            if src is None:
+                if os.path.isfile(fpath):
+                    gzip_file_in_place(fpath, level)
+            elif gzip_file(src, fpath + ".gz", level):
+                with self._lock:
+                    self._discard(fpath)
+                    self._discard(fpath + ".gz")
+
+    # -- output ---------------------------------------------------------------
+
+    def write_tarball(self, dest_tar_path: str,
+                      exclusions: Tuple[str, ...] = EXCLUSION_SUFFIXES,
+                      pool: Optional[CompressionPool] = None) -> Tuple[int, int]:
+        """
+        make_tarball(root, dest_tar_path) over the union, reading recorded
+        copies from their sources. A source that can no longer be read is
+        left out with a warning. Returns (members written, of which recorded).
+
+        pool sets the gzip level and, with more than one worker, compresses
+        the archive in blocks on its threads (GzipBlockWriter).
+        """
+        root_name = os.path.basename(self.root)
+        n_members = n_recorded = 0
+        level = pool.level if pool else DEFAULT_GZIP_LEVEL
+        with contextlib.ExitStack() as stack:
+            if pool is None or pool.workers <= 1:
+                tar = stack.enter_context(
+                    tarfile.open(dest_tar_path, "w:gz", compresslevel=level))
+            else:
+                raw = stack.enter_context(open(dest_tar_path, "wb"))
+                gz = stack.enter_context(GzipBlockWriter(raw, pool, dest_tar_path))
+                tar = stack.enter_context(tarfile.open(fileobj=gz, mode="w|"))
+            for root_dir, dirs, files in self.walk(self.root):
+                dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__MACOSX"]
+                for fname in files:
+                    if fname.startswith(".") or fname.endswith(exclusions):
+                        continue
+                    fpath = os.path.join(root_dir, fname)
+                    src = self.source(fpath)
+                    arcname = os.path.join(root_name, os.path.relpath(fpath, self.root))
+                    try:
+                        add_file_member(tar, src or fpath, arcname)
+                    except OSError as e:
+                        print(f"  Warning: could not archive {src or fpath}: {e}")
+                        continue
+                    n_members += 1
+                    n_recorded += src is not None
+        return n_members, n_recorded
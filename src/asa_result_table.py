@@ -0,0 +1,253 @@
+"""
+asa_result_table.py
+Parse-once access to AmpliconClassifier *_result_table.tsv files (Stage 4).
+
+Three Stage 4 steps read the same table: generation resolution wants its
+"Sample name" column, AC version sniffing its header and "AC version"
+column, and the row parser the whole thing — four reads of every table
+when a cohort was classified more than once. A ResultTable is one parse,
+held compactly — each column factorized into integer codes over its
+distinct values, since a pooled table repeats the same reference,
+classification, tissue and version strings on every row — and decoded
+back to values only for the column a caller asks for.
+
+ResultTableCache holds parsed tables under a byte budget, least recently
+used first out. A table too large for the budget on its own is parsed,
+handed back and never retained, so memory stays bounded however large a
+pooled table gets — it is simply parsed again by its next caller, as
+before. The row parser's read is a table's last, so it takes the table
+out of the cache rather than leaving it resident.
+
+The row parser never builds a DataFrame: it takes rows one at a time —
+decoded from a cached ResultTable, or streamed off disk by
+stream_result_table, which reproduces read_csv's handling of these files
+— straight into columnar storage (asa_feature_store.FeatureChunk).
+"""
+
+from __future__ import annotations
+
+import csv
+import itertools
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# What read_csv turns into NaN by default (its STR_NA_VALUES). Tables are
+# parsed with keep_default_na=False, so callers that relied on the default
+# NA handling filter on this instead.
+PANDAS_NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+})
+
+# Tables up to this size are parsed by stream_result_table rather than
+# read_csv, whose fixed cost (a few ms) dwarfs the parse of a one-sample
+# table — and a cohort classified per sample has hundreds of those.
+SMALL_TABLE_BYTES = 256 * 1024
+
+
+def read_result_table(path: str) -> pd.DataFrame:
+    """
+    The one way large result tables are parsed: every value a string in an
+    object column, nothing converted to NaN except fields missing from a
+    short row.
+    """
+    return pd.read_csv(path, sep="\t", dtype=object, keep_default_na=False)
+
+
+def _is_blank_row(row: List[str]) -> bool:
+    # read_csv skips empty and whitespace-only lines — but a line of bare
+    # delimiters is a row of empty fields.
+    return not row or (len(row) == 1 and not row[0].strip())
+
+
+def _mangle_header(header: List[str]) -> List[str]:
+    """read_csv's column names: blanks become "Unnamed: i", repeats "X.1", "X.2"..."""
+    columns: List[str] = []
+    seen: Set[str] = set()
+    for i, name in enumerate(header):
+        name = name or f"Unnamed: {i}"
+        candidate, n = name, 0
+        while candidate in seen:
+            n += 1
+            candidate = f"{name}.{n}"
+        seen.add(candidate)
+        columns.append(candidate)
+    return columns
+
+
+def stream_result_table(path: str) -> Tuple[List[str], Iterator[List[str]]]:
+    """
+    (columns, rows) of the table at path, read row by row with the same
+    results as read_result_table(): short rows padded with "", a first
+    data row one field longer than the header turning the first field of
+    every row into a (dropped) index, and a longer row an error. The file
+    stays open until rows is exhausted.
+    """
+    fh = open(path, newline="", encoding="utf-8-sig")
+    try:
+        reader = csv.reader(fh, delimiter="\t")
+        header = next((r for r in reader if not _is_blank_row(r)), None)
+        if header is None:
+            raise ValueError("No columns to parse from file")
+        columns = _mangle_header(header)
+        first = next((r for r in reader if not _is_blank_row(r)), None)
+    except BaseException:
+        fh.close()
+        raise
+    return columns, _stream_rows(fh, reader, first, len(columns))
+
+
+def _stream_rows(fh, reader, first: List[str], width: int) -> Iterator[List[str]]:
+    with fh:
+        if first is None:
+            return
+        skip = 1 if len(first) == width + 1 else 0
+        pad = [""] * width
+        for row in itertools.chain([first], reader):
+            if _is_blank_row(row):
+                continue
+            if len(row) > width + skip:
+                raise ValueError(f"Expected {width + skip} fields in line "
+                                 f"{reader.line_num}, saw {len(row)}")
+            if skip:
+                row = row[1:]
+            if len(row) < width:
+                row = row + pad[len(row):]
+            yield row
+
+
+class ResultTable:
+    """A parsed result table, stored as per-column (codes, distinct values)."""
+
+    __slots__ = ("path", "columns", "nbytes", "_codes", "_values")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._codes: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        try:
+            small = os.path.getsize(path) <= SMALL_TABLE_BYTES
+        except OSError:
+            small = False  # let read_csv raise its own error
+        if small:
+            self.columns, factorized = self._factorize_small(path)
+        else:
+            df = read_result_table(path)
+            self.columns = list(df.columns)
+            factorized = (pd.factorize(df[name].to_numpy()) for name in self.columns)
+        nbytes = 0
+        for name, (codes, uniques) in zip(self.columns, factorized):
+            # Missing fields factorize to -1, which take() reads as the
+            # last entry: a trailing NaN.
+            values = np.empty(len(uniques) + 1, dtype=object)
+            values[:-1] = uniques
+            values[-1] = np.nan
+            codes = codes.astype(np.min_scalar_type(-len(values)))
+            self._codes[name] = codes
+            self._values[name] = values
+            # Budget accounting only: price the strings off a sample.
+            sample = uniques[:256]
+            if len(sample):
+                nbytes += len(uniques) * sum(map(sys.getsizeof, sample)) // len(sample)
+            nbytes += codes.nbytes + values.nbytes
+        self.nbytes = nbytes
+
+    @staticmethod
+    def _factorize_small(path: str) -> Tuple[List[str], List[Tuple[np.ndarray, list]]]:
+        """(columns, per-column (codes, uniques)) as pd.factorize would give them."""
+        columns, rows = stream_result_table(path)
+        index: List[Dict[str, int]] = [{} for _ in columns]
+        codes: List[List[int]] = [[] for _ in columns]
+        for row in rows:
+            for seen, col_codes, v in zip(index, codes, row):
+                code = seen.get(v)
+                if code is None:
+                    code = seen[v] = len(seen)
+                col_codes.append(code)
+        return columns, [(np.array(c, dtype=np.intp), list(seen))
+                         for seen, c in zip(index, codes)]
+
+    def __len__(self) -> int:
+        return len(self._codes[self.columns[0]]) if self.columns else 0
+
+    def column(self, name: str) -> list:
+        """A column's values in row order. KeyError if there is no such column."""
+        if name not in self._codes:
+            raise KeyError(f"column {name!r} not in {self.path}")
+        return self._values[name].take(self._codes[name]).tolist()
+
+    def present_values(self, name: str) -> Set[str]:
+        """
+        A column's distinct values, less anything read_csv's default NA
+        handling would have dropped.
+        """
+        if name not in self._values:
+            raise KeyError(f"column {name!r} not in {self.path}")
+        return {v for v in self._values[name][:-1] if v not in PANDAS_NA_STRINGS}
+
+    def rows(self, chunk: int = 4096) -> Iterator[List[str]]:
+        """Rows as lists of values, decoded a chunk at a time."""
+        for start in range(0, len(self), chunk):
+            cols = [self._values[name].take(self._codes[name][start:start + chunk])
+                    for name in self.columns]
+            for row in zip(*cols):
+                yield list(row)
+
+
+class ResultTableCache:
+    """Byte-bounded LRU of ResultTables, keyed by path."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._tables: "OrderedDict[str, ResultTable]" = OrderedDict()
+        self._bytes = 0
+        self.parses = 0
+        self.hits = 0
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._tables
+
+    def get(self, path: str) -> ResultTable:
+        """The parsed table at path; read errors propagate as read_csv's do."""
+        table = self._tables.get(path)
+        if table is not None:
+            self._tables.move_to_end(path)
+            self.hits += 1
+            return table
+        table = ResultTable(path)
+        self.put(table)
+        return table
+
+    def put(self, table: ResultTable) -> None:
+        """Hold a table parsed elsewhere (e.g. on a process pool), as get() would."""
+        self.parses += 1
+        if table.nbytes > self.max_bytes or table.path in self._tables:
+            return
+        self._tables[table.path] = table
+        self._bytes += table.nbytes
+        while self._bytes > self.max_bytes:
+            _, old = self._tables.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def take(self, path: str) -> Tuple[List[str], Iterator[List[str]]]:
+        """
+        (columns, rows) of the table at path, for its last reader: decoded
+        from the cache and dropped from it if held, else streamed off disk.
+        """
+        table = self._tables.pop(path, None)
+        if table is None:
+            self.parses += 1
+            return stream_result_table(path)
+        self._bytes -= table.nbytes
+        self.hits += 1
+        return table.columns, table.rows()
+
+    def clear(self) -> None:
+        self._tables.clear()
+        self._bytes = 0
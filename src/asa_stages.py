@@ -15,6 +15,7 @@ Stages:
 
 from __future__ import annotations
 
+import contextlib
 import csv
 import io
 import json
@@ -22,34 +23,100 @@ import time
 import os
 import posixpath
 import shutil
+import stat
 import sys
 import tarfile
 import zipfile
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
 from asa_aggregator import (
     # constants
-    ARCHIVE_EXTENSIONS, EXCLUSION_SUFFIXES, AA_DIR_INCLUDE_SUFFIXES, MISC_AA_SUFFIXES,
-    LEGACY_CNV_BED_SUFFIX, AMPLICON_FILE_EXT_MAP, CORAL_HEADER_PREFIX,
-    AMPLICON_FILE_DISCOVERY_SUFFIXES,
-    AC_MERGE_TARGETS, RUN_JSON_COLUMNS, AGG_CSV_COLUMNS, LIST_COLUMNS,
+    ARCHIVE_EXTENSIONS, EXCLUSION_SUFFIXES, AA_DIR_INCLUDE_SUFFIXES,
+    AMPLICON_FILE_EXT_MAP, CORAL_HEADER_PREFIX, CS_RMDUP_INFIX,
+    AC_MERGE_TARGETS, AGG_CSV_COLUMNS,
     NOT_PROVIDED, EXTRACTION_DIR, RESULTS_DIR,
-    AC_PROFILES_SUFFIX, AC_RESULT_TABLE_SUFFIX,
+    AC_PROFILES_SUFFIX, AC_RESULT_TABLE_SUFFIX, DEFAULT_GZIP_LEVEL, RECONSTRUCT_LOG_SUFFIX,
     # data structures
-    SampleRecord,
+    AmpliconPathPool, SampleRecord,
     # utilities
-    rchop, not_provided, parse_list_field, read_name_map,
+    rchop, not_provided, read_name_map, classify_filename,
     is_valid_aa_results_dir, is_classification_dir,
     is_aa_summary_content, is_coral_summary_content,
-    make_tarball, safe_copy_file, safe_copytree, relative_to_results,
-    convert_cnvkit_cns_to_bed, extract_tool_versions, compress_reconstruct_logs,
-    gzip_files_in_dir,
+    make_tarball, add_file_member, relative_to_results, ingest_file,
+    convert_cnvkit_cns_to_bed, scan_tool_versions, compress_reconstruct_logs,
 )
 
 from asa_aggregator import __version__
+from asa_cache import ExtractionCache, clone_extraction, file_digest, tree_size
+from asa_compress import CompressionPool, ThreadOutput
+from asa_manifest import (
+    DISCOVERY_MANIFEST, RECORD_DIR_FIELDS, RECORD_PATH_FIELDS, ManifestPaths,
+    input_fingerprint, read_manifest, record_from_dict, record_to_dict,
+    stale_reason, write_manifest,
+)
+from asa_feature_store import (
+    FEATURE_SPILL_DB, FeatureChunk, FeatureStore, SQLiteFeatureStore,
+)
+from asa_output import OutputTree
+from asa_result_table import ResultTable, ResultTableCache, stream_result_table
+from asa_vfs import ArchiveTree, DiscoveryFS, materialize_tree, normalize_member_name
+
+
+# ---------------------------------------------------------------------------
+# Process-pool entry points
+# ---------------------------------------------------------------------------
+
+def _extract_archive_job(archive_path: str, dest_parent: str, dest: str, prune: bool,
+                         threads: int) -> Tuple[Tuple[Optional[str], List[str], Optional[str]], str]:
+    """
+    --jobs worker: run Aggregator._extract_archive in a child process and
+    hand back (result, captured console output) so the parent can print
+    each archive's lines as one uninterleaved block.
+    """
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = Aggregator._extract_archive(archive_path, dest_parent, dest,
+                                             prune=prune, threads=threads)
+    return result, buf.getvalue()
+
+
+def _index_archive_job(archive_path: str, dest_parent: str,
+                       dest: str) -> Tuple[Optional[ArchiveTree], str]:
+    """--jobs worker for Aggregator._index_archive (--lazy_extraction)."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = Aggregator._index_archive(archive_path, dest_parent, dest)
+    return result, buf.getvalue()
+
+
+def _materialize_tree_job(tree: ArchiveTree, rels: set) -> Tuple[int, int]:
+    """--jobs worker for asa_vfs.materialize_tree."""
+    return materialize_tree(tree, rels)
+
+
+def _group_result_table_job(rt_path: str) -> Tuple[Optional[FeatureChunk], Optional[str]]:
+    """--jobs worker: stream one result table off disk and group its rows."""
+    try:
+        return Aggregator._group_result_table(*stream_result_table(rt_path)), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _result_table_job(rt_path: str) -> Optional[ResultTable]:
+    """
+    --jobs worker: parse one result table for the generation pre-scan;
+    None if it can't be read (the parent's own parse reports why).
+    """
+    try:
+        return ResultTable(rt_path)
+    except Exception:
+        return None
 
 
 # ---------------------------------------------------------------------------
@@ -65,12 +132,28 @@ class Aggregator:
       project_name      — prefix for consolidated classification files and output archive
       name_map          — { old_sname -> new_sname } rename dict
       no_cleanup        — when True, temp dirs are preserved after completion
+      jobs              — worker count for parallel archive extraction and Stage 5
+                          sample dir builds (--jobs)
+      compress_jobs     — threads for Stage 5's queued gzip/tar jobs and the final
+                          archive (--compress_jobs; default: jobs)
+      gzip_level        — gzip level of every archive and .gz written (--gzip_level)
+      prune_extraction  — when True, Stage 2 never writes EXCLUSION_SUFFIXES files
+      ingest_mode       — how directory inputs are placed in extract_dir (INGEST_MODES)
+      extraction_cache  — persistent extraction cache dir, or None (see asa_cache)
+      lazy_extraction   — when True, input archives are indexed rather than extracted,
+                          and only the members the output needs are written (see asa_vfs)
+      reuse_discovery   — when True, Stage 3 loads DISCOVERY_MANIFEST from work_dir if
+                          it still matches the inputs, and writes it otherwise (see asa_manifest)
+      spill_features    — when True, Stages 4-6 keep feature rows in an SQLite database
+                          (FEATURE_SPILL_DB in work_dir) instead of memory
       work_dir          — absolute cwd at construction time
       extract_dir       — <work_dir>/extracted_from_zips/
       results_dir       — <work_dir>/results/
       samples_dir       — <results_dir>/samples/
       classif_dir       — <results_dir>/consolidated_classification/
       other_dir         — <results_dir>/other_files/
+      _output           — OutputTree over results_dir: Stage 5 records verbatim
+                          copies on it rather than writing them (see asa_output)
       sample_registry   — { sname -> SampleRecord }  (populated by Stage 3)
       classification_dirs — [ dirpath ]               (populated by Stage 3; pruned by
                             _resolve_ac_generations() at the start of Stage 4 to drop
@@ -78,7 +161,13 @@ class Aggregator:
       aux_dirs          — [ dirpath ]                 (populated by Stage 3)
       _files_dirs       — { cls_dir -> files_subdir } (populated by Stage 3)
       _floating_cnv_beds — { sname -> path }          (populated by Stage 3)
+      _tool_sniffs      — { sname -> (SampleRecord, [(path, key)]) } graph/cycles
+                          files awaiting CoRAL sniffing (Stage 3)
+      _log_scans        — { sname -> (SampleRecord, [path]) } logs awaiting a
+                          version-banner scrape (Stage 3)
       _classification_result_tables — { cls_dir -> result_table_path } (populated by Stage 3)
+      _generated_cnv_beds — { bed_path -> cns_path } CNV_CALLS.bed files Stage 3 wrote
+                          into a cnvkit dir from its .cns (rebuilt when a manifest is reused)
       superseded_classification_dirs — [ dirpath ]    (populated by _resolve_ac_generations();
                             dirs excluded as an older/superseded AC reclassification generation)
       completed         — True only after successful _finalise()
@@ -88,6 +177,38 @@ class Aggregator:
     # Above it, suppress them and show periodic progress instead.
     VERBOSE_THRESHOLD: int = 20
 
+    # Print a running member/byte count every this many bytes extracted
+    # from a single archive, so multi-GB inputs don't look hung.
+    EXTRACT_PROGRESS_BYTES: int = 512 * 1024 * 1024
+
+    # With --lazy_extraction, tar members ending in one of these are written
+    # during the indexing pass itself: nested archives (expanded by the
+    # nested pass as usual) and the small text files Stage 3 opens to sniff
+    # content. A tar stream can't be seeked cheaply, so reading them back
+    # out of the archive one at a time would re-inflate it per file.
+    LAZY_EAGER_SUFFIXES: Tuple[str, ...] = ARCHIVE_EXTENSIONS + (
+        "_summary.txt", "_cycles.txt", "_graph.txt", ".log", ".cns",
+    )
+
+    # Bytes of each graph/cycles file sniffed for CoRAL content from the
+    # top (the #CoRAL header) and, for a longer cycles.txt, from the end
+    # (CoRAL writes its Path= walks and subpath constraints after the
+    # segment list). A sample no bounded read settles gets one full read.
+    SNIFF_BYTES: int = 256 * 1024
+
+    # Discovery I/O (listing prefetch, sniffs, log version scrapes) runs on
+    # max(--jobs, READ_THREADS) threads: it is latency-bound, not CPU-bound.
+    READ_THREADS: int = 8
+
+    # Parsed result tables Stage 4 keeps for reuse between generation
+    # resolution, AC version sniffing and row parsing (see asa_result_table).
+    RESULT_TABLE_CACHE_BYTES: int = 512 * 1024 * 1024
+
+    # With --jobs > 1, Stage 4 parses result tables on a process pool once
+    # the tables left to parse add up to this much (see _parse_workers); below it, starting the
+    # workers and shipping rows back costs more than the parse.
+    PARALLEL_PARSE_BYTES: int = 16 * 1024 * 1024
+
     def __init__(
         self,
         input_paths: List[str],
@@ -95,11 +216,33 @@ class Aggregator:
         name_map_file: Optional[str] = None,
         no_cleanup: bool = False,
         work_dir: Optional[str] = None,
+        jobs: int = 1,
+        prune_extraction: bool = False,
+        lazy_extraction: bool = False,
+        ingest_mode: str = "copy",
+        extraction_cache: Optional[str] = None,
+        extraction_cache_size: float = 100.0,
+        extraction_cache_key: str = "sha256",
+        reuse_discovery: bool = False,
+        spill_features: bool = False,
+        compress_jobs: Optional[int] = None,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
     ):
         self.input_paths = input_paths
         self.project_name = project_name
         self.name_map = read_name_map(name_map_file)
         self.no_cleanup = no_cleanup
+        self.jobs = max(1, jobs)
+        self.compress_jobs = max(1, compress_jobs or self.jobs)
+        self.gzip_level = gzip_level
+        self.prune_extraction = prune_extraction
+        self.lazy_extraction = lazy_extraction
+        self.ingest_mode = ingest_mode
+        self.extraction_cache = extraction_cache
+        self.extraction_cache_bytes = int(extraction_cache_size * 1024 ** 3)
+        self.extraction_cache_key = extraction_cache_key
+        self.reuse_discovery = reuse_discovery
+        self.spill_features = spill_features
         self.completed = False
         self._start_time: float = time.perf_counter()
         self.aggregated_filename: str = os.path.join(
@@ -113,23 +256,42 @@ class Aggregator:
         self.samples_dir = os.path.join(self.results_dir, "samples")
         self.classif_dir = os.path.join(self.results_dir, "consolidated_classification")
         self.other_dir   = os.path.join(self.results_dir, "other_files")
+        self._output = OutputTree(self.results_dir)
+        # Stage 5's gzip/tar work, run as a batch largest-first (see asa_compress)
+        self._compressor = CompressionPool(self.compress_jobs, gzip_level)
+        self._feature_spill_path = os.path.join(self.work_dir, FEATURE_SPILL_DB)
+        # FeatureStore, or SQLiteFeatureStore with --spill_features (Stage 4)
+        self.features = None
 
         self.sample_registry:    Dict[str, SampleRecord] = {}
+        # Strings every record's amplicon_files shares (AmpliconPathPool)
+        self._amplicon_paths = AmpliconPathPool()
         self.classification_dirs: List[str] = []
         self.aux_dirs:            List[str] = []
         self._files_dirs:         Dict[str, str] = {}
         self._floating_cnv_beds:  Dict[str, str] = {}
         self._classification_result_tables: Dict[str, str] = {}
+        self._generated_cnv_beds: Dict[str, str] = {}
         self.superseded_classification_dirs: List[str] = []
+        # Stage 3's view of extract_dir; archives indexed by --lazy_extraction
+        # are mounted on it, otherwise it is a pass-through to os.
+        self._fs = DiscoveryFS()
+        # Top-level archive dest -> the sole dir it extracted to, or None
+        # (see _wrapper_dir); how a copy of it is unwrapped under another name.
+        self._archive_wrappers: Dict[str, Optional[str]] = {}
         # Memoised AC-version lookups. Both are pure functions of a path, and
         # both were being recomputed several times per classification dir:
         # _sniff_ac_version_for_generation is called once for ranking and
         # again for every log message that describes a generation, and the
-        # log scan underneath it re-reads AC's whole log each time. Only the
-        # tiny derived strings are cached — never the parsed result tables,
-        # which are far too large to hold for a big cohort.
+        # log scan underneath it re-reads AC's whole log each time. Parsed
+        # result tables go through _result_tables instead, whose byte budget
+        # keeps a big cohort's pooled tables from piling up in memory.
         self._ac_version_cache: Dict[str, Optional[str]] = {}
         self._cls_log_version_cache: Dict[str, Optional[str]] = {}
+        self._result_tables = ResultTableCache(self.RESULT_TABLE_CACHE_BYTES)
+        # run_metadata.json path -> its (aa, pipeline, ac) versions; filled
+        # by _prefetch_run_metadata before Stage 4's merge needs them.
+        self._run_metadata_versions: Dict[str, Tuple[Optional[str], ...]] = {}
 
         self._run_pipeline()
 
@@ -174,9 +336,14 @@ class Aggregator:
         print(f"  Results dir    : {self.results_dir}")
 
     def _cleanup(self, failure: bool = False) -> None:
+        if self.features is not None:
+            self.features.close()
+        self._compressor.shutdown()
         if self.no_cleanup:
             print("--no_cleanup set: leaving working directories in place.")
             return
+        if os.path.exists(self._feature_spill_path):
+            os.remove(self._feature_spill_path)
         if os.path.exists(self.extract_dir):
             shutil.rmtree(self.extract_dir, ignore_errors=True)
         if os.path.exists(self.results_dir):
@@ -207,82 +374,646 @@ class Aggregator:
                             pass
         input_mb = self._input_size_bytes / (1024 * 1024)
         print(f"  Input size: {input_mb:.2f} MB ({len(self.input_paths)} source(s))")
+        if self.reuse_discovery:
+            # Taken before extraction, so an input modified mid-run can
+            # only ever invalidate the manifest, never slip past it.
+            self._input_fingerprint = input_fingerprint(
+                self.input_paths, self.prune_extraction, self.lazy_extraction)
+
+        # Every destination is reserved here, in input order, before any
+        # extraction starts — so with --jobs > 1 the cohortA/ vs cohortA_2/
+        # naming is identical to a serial run no matter which worker
+        # finishes first.
+        jobs: List[Tuple[str, str, str, bool]] = []
+        nested: List[str] = []
         for path in self.input_paths:
             abs_path = os.path.abspath(path)
             if os.path.isdir(abs_path):
-                self._copy_input_dir(abs_path)
+                dest = self._copy_input_dir(abs_path)
+                nested.extend(self._find_nested_archives(dest))
             elif os.path.isfile(abs_path):
-                self._extract_archive(abs_path, self.extract_dir)
+                dest = self._reserve_archive_dest(abs_path, self.extract_dir)
+                if dest:
+                    jobs.append((abs_path, self.extract_dir, dest, False))
             else:
                 print(f"Warning: input path does not exist or is not accessible: {abs_path}")
 
-        pass_num = 0
-        while True:
-            pass_num += 1
-            nested = self._find_nested_archives()
-            if not nested:
-                break
-            print(f"  Nested archive pass {pass_num}: found {len(nested)} archive(s) to expand.")
-            for archive_path in nested:
-                dest_dir = os.path.dirname(archive_path)
-                self._extract_archive(archive_path, dest_dir)
+        duplicates: List[Tuple[str, str, str, str]] = []
+        digests: Dict[str, str] = {}
+        if not self.lazy_extraction:
+            jobs, duplicates, digests = self._find_duplicate_inputs(jobs)
+        cache = self._open_extraction_cache()
+        misses: List[Tuple[str, str, str]] = []
+        if cache is not None:
+            jobs, misses = self._apply_extraction_cache(cache, jobs, digests)
+        jobs.extend(self._reserve_nested_jobs(nested))
+        failed = self._extract_archives(jobs)
+        if cache is not None:
+            self._finish_extraction_cache(cache, misses, failed)
+        self._place_duplicate_inputs(duplicates, failed)
+
+        print(f"  Extraction complete. Working tree: {self.extract_dir}")
+
+    def _open_extraction_cache(self) -> Optional[ExtractionCache]:
+        if not self.extraction_cache:
+            return None
+        if self.lazy_extraction:
+            print("  Note: --extraction_cache is not used with --lazy_extraction.")
+            return None
+        try:
+            return ExtractionCache(self.extraction_cache, self.extraction_cache_bytes,
+                                   key_mode=self.extraction_cache_key)
+        except OSError as e:
+            print(f"  Warning: cannot use extraction cache {self.extraction_cache}: {e}")
+            return None
+
+    def _find_duplicate_inputs(
+        self, jobs: List[Tuple[str, str, str, bool]],
+    ) -> Tuple[List[Tuple[str, str, str, bool]], List[Tuple[str, str, str, str]],
+               Dict[str, str]]:
+        """
+        Find top-level archives whose bytes match an earlier input's — the
+        same file listed twice, or a renamed copy — so each distinct archive
+        is expanded once and the later copies are cloned from its tree by
+        _place_duplicate_inputs. Returns (jobs still to extract, duplicates
+        as (archive_path, dest, first archive_path, first dest), the sha256
+        of every archive that had to be hashed, for the cache key).
+
+        Only archives sharing their size with another input are hashed,
+        and each file once however many times it is listed.
+        """
+        stats: Dict[str, Optional[os.stat_result]] = {}
+        by_size: Dict[int, int] = defaultdict(int)
+        for archive_path, _, _, _ in jobs:
+            try:
+                stats[archive_path] = st = os.stat(archive_path)
+                by_size[st.st_size] += 1
+            except OSError:
+                stats[archive_path] = None
+
+        remaining: List[Tuple[str, str, str, bool]] = []
+        duplicates: List[Tuple[str, str, str, str]] = []
+        digests: Dict[str, str] = {}
+        by_inode: Dict[Tuple[int, int], str] = {}
+        first: Dict[str, Tuple[str, str]] = {}  # digest -> (archive_path, dest)
+        for job in jobs:
+            archive_path, _, dest, _ = job
+            st = stats[archive_path]
+            if st is None or by_size[st.st_size] < 2:
+                remaining.append(job)
+                continue
+            digest = by_inode.get((st.st_dev, st.st_ino))
+            if digest is None:
                 try:
-                    os.remove(archive_path)
+                    digest = file_digest(archive_path)
                 except OSError as e:
-                    print(f"  Warning: could not remove nested archive {archive_path}: {e}")
+                    print(f"  Warning: could not read {archive_path} to compare inputs: {e}")
+                    remaining.append(job)
+                    continue
+                by_inode[(st.st_dev, st.st_ino)] = digest
+            digests[archive_path] = digest
+            if digest in first:
+                print(f"  Duplicate input: {archive_path} is identical to "
+                      f"{first[digest][0]}; expanding it once -> {dest}")
+                duplicates.append((archive_path, dest, *first[digest]))
+                continue
+            first[digest] = (archive_path, dest)
+            remaining.append(job)
+        return remaining, duplicates, digests
+
+    def _place_duplicate_inputs(self, duplicates: List[Tuple[str, str, str, str]],
+                                failed: List[str]) -> None:
+        """
+        Clone each duplicate input's dest from the tree its first copy
+        expanded to, unwrapped for its own archive stem (clone_extraction).
+        A copy of an input that failed gets whatever it left, as extracting
+        the copy would have.
+        """
+        for archive_path, dest, first_path, first_dest in duplicates:
+            if first_dest in failed:
+                print(f"  Warning: failed to extract {archive_path}: "
+                      f"identical input {first_path} could not be extracted")
+                failed.append(dest)
+            if not os.path.isdir(first_dest):
+                if os.path.isdir(dest) and not os.listdir(dest):
+                    shutil.rmtree(dest, ignore_errors=True)
+                continue
+            try:
+                clone_extraction(first_dest,
+                                 self._archive_stem(os.path.basename(first_path)),
+                                 self._archive_wrappers.get(first_dest), dest,
+                                 self._archive_stem(os.path.basename(archive_path)))
+            except (OSError, shutil.Error) as e:
+                print(f"  Warning: could not copy {first_dest} -> {dest}: {e}")
+
+    def _apply_extraction_cache(
+        self, cache: ExtractionCache, jobs: List[Tuple[str, str, str, bool]],
+        digests: Dict[str, str],
+    ) -> Tuple[List[Tuple[str, str, str, bool]], List[Tuple[str, str, str]]]:
+        """
+        Resolve the top-level archive jobs against the cache before any
+        extraction starts. Returns (jobs still to extract, misses as
+        (key, archive_path, dest) for _finish_extraction_cache to publish).
+        digests holds the archives _find_duplicate_inputs already hashed.
+        """
+        remaining: List[Tuple[str, str, str, bool]] = []
+        misses: List[Tuple[str, str, str]] = []
+        for job in jobs:
+            archive_path, _, dest, _ = job
+            try:
+                key = cache.key_for(archive_path, self.prune_extraction,
+                                    digests.get(archive_path))
+            except OSError as e:
+                print(f"  Warning: could not fingerprint {archive_path} for the cache: {e}")
+                remaining.append(job)
+                continue
+            hit = cache.fetch(key, dest, self._archive_stem(os.path.basename(archive_path)))
+            if hit is not None:
+                n_files, self._archive_wrappers[dest] = hit
+                print(f"  Cache hit: {archive_path} -> {dest} ({n_files} file(s))")
+                continue
+            misses.append((key, archive_path, dest))
+            remaining.append(job)
+        self._cache_hits = len(jobs) - len(remaining)
+        return remaining, misses
+
+    def _finish_extraction_cache(self, cache: ExtractionCache,
+                                 misses: List[Tuple[str, str, str]],
+                                 failed: List[str]) -> None:
+        """
+        Publish every cleanly extracted miss (nested archives included —
+        any failure inside its tree disqualifies it), then evict down to
+        the size cap.
+        """
+        stored = 0
+        for key, archive_path, dest in misses:
+            if not os.path.isdir(dest):
+                continue
+            if any(f == dest or f.startswith(dest + os.sep) for f in failed):
+                continue
+            fname = os.path.basename(archive_path)
+            if cache.store(key, dest, fname, self._archive_stem(fname),
+                           self._archive_wrappers.get(dest)):
+                stored += 1
+        print(f"  Extraction cache: {self._cache_hits} hit(s), {len(misses)} miss(es), "
+              f"{stored} stored")
+        cache.evict()
+        cache.close()
+
+    def _reserve_nested_jobs(self, archives: List[str]) -> List[Tuple[str, str, str, bool]]:
+        """
+        Reserve a dest beside each nested archive, in sorted order, and
+        return the jobs for _extract_archives. Nested archives found
+        together always come from the same parent (one extraction, or one
+        copied input dir), and no two parents share a directory, so
+        sorting per batch gives the same _2/_3 suffixes a global sort would.
+        """
+        jobs = []
+        for archive_path in sorted(archives):
+            dest_dir = os.path.dirname(archive_path)
+            dest = self._reserve_archive_dest(archive_path, dest_dir)
+            if dest:
+                jobs.append((archive_path, dest_dir, dest, True))
+            else:
+                self._remove_nested_archive(archive_path)
+        return jobs
 
-        print(f"  Extraction complete. Working tree: {self.extract_dir}")
+    def _remove_nested_archive(self, archive_path: str) -> None:
+        try:
+            os.remove(archive_path)
+        except OSError as e:
+            print(f"  Warning: could not remove nested archive {archive_path}: {e}")
+        # Indexed archives still list it; it has been expanded in its place.
+        self._fs.discard(archive_path)
+
+    def _extract_archives(self, jobs: List[Tuple[str, str, str, bool]]) -> List[str]:
+        """
+        Work through (archive_path, dest_parent, dest, is_nested) jobs,
+        whose dest has already been reserved, until no archive is left.
+        Returns the dests of any archives (top-level or nested) that failed.
+
+        Each extraction reports the nested archives it wrote; those are
+        reserved and queued as soon as it finishes, and each is deleted
+        once expanded. Nested expansion therefore costs time in proportion
+        to the new content, rather than one walk of the whole extraction
+        tree per nesting level. Top-level inputs are indexed instead of
+        extracted under --lazy_extraction (_index_archive, mounting each
+        ArchiveTree on self._fs); nested archives always expand on disk.
+
+        With --jobs > 1 the archives are spread over a process pool (gzip
+        inflate and tarfile's per-member bookkeeping are both CPU-bound, so
+        threads would just queue on the GIL). The initial batch is handed
+        out largest-first so a single huge archive starts early instead of
+        becoming the tail of the makespan; nested archives are submitted
+        the moment their parent finishes. Each worker's console output is
+        captured and printed as a block when that archive finishes, so
+        lines from different archives never interleave.
+        """
+        if not jobs:
+            return []
+        n_nested = sum(1 for job in jobs if job[3])
+        failed: List[str] = []
+
+        def _finish(job: Tuple[str, str, str, bool], result) -> List[Tuple[str, str, str, bool]]:
+            archive_path, _, dest, is_nested = job
+            if not result or (isinstance(result, tuple) and result[0] is None):
+                failed.append(dest)
+            elif isinstance(result, tuple) and not is_nested:
+                self._archive_wrappers[dest] = result[2]
+            if isinstance(result, ArchiveTree):
+                self._fs.mount(result)
+                found = [os.path.join(result.root, rel) for rel in result.files()
+                         if rel.endswith(ARCHIVE_EXTENSIONS)]
+            else:
+                found = result[1] if result else []
+            if is_nested:
+                self._remove_nested_archive(archive_path)
+            if found:
+                print(f"    Found {len(found)} nested archive(s) in "
+                      f"{os.path.basename(archive_path)}; queued for expansion.")
+            return self._reserve_nested_jobs(found)
+
+        if self.jobs <= 1:
+            queue = deque(jobs)
+            while queue:
+                job = queue.popleft()
+                archive_path, dest_parent, dest, is_nested = job
+                if self.lazy_extraction and not is_nested:
+                    result = self._index_archive(archive_path, dest_parent, dest)
+                else:
+                    result = self._extract_archive(archive_path, dest_parent, dest,
+                                                   prune=self.prune_extraction)
+                more = _finish(job, result)
+                n_nested += len(more)
+                queue.extend(more)
+        else:
+            def _size(job: Tuple[str, str, str, bool]) -> int:
+                try:
+                    return os.path.getsize(job[0])
+                except OSError:
+                    return 0
+
+            def _submit(pool, job):
+                archive_path, dest_parent, dest, is_nested = job
+                if self.lazy_extraction and not is_nested:
+                    return pool.submit(_index_archive_job, archive_path, dest_parent, dest)
+                return pool.submit(_extract_archive_job, archive_path, dest_parent,
+                                   dest, self.prune_extraction, threads)
+
+            ordered = sorted(jobs, key=_size, reverse=True)
+            # Left-over --jobs capacity goes to zip member threads: a lone
+            # big zip gets all of it, a batch of many archives none.
+            threads = max(1, self.jobs // len(ordered))
+            print(f"  Extracting {len(ordered)} archive(s) with "
+                  f"{self.jobs} worker process(es)...")
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                pending = {_submit(pool, job): job for job in ordered}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        job = pending.pop(fut)
+                        try:
+                            result, output = fut.result()
+                        except Exception as e:
+                            print(f"  Warning: failed to extract {job[0]}: {e}")
+                            result = None
+                        else:
+                            sys.stdout.write(output)
+                        for more in _finish(job, result):
+                            n_nested += 1
+                            pending[_submit(pool, more)] = more
 
-    def _copy_input_dir(self, src_dir: str) -> None:
+        if n_nested:
+            print(f"  Expanded {n_nested} nested archive(s).")
+        return failed
+
+    def _copy_input_dir(self, src_dir: str) -> str:
         basename = os.path.basename(src_dir.rstrip("/"))
         dest = self._unique_dest(self.extract_dir, basename)
-        print(f"  Copying directory: {src_dir} -> {dest}")
+        if self.ingest_mode == "copy":
+            print(f"  Copying directory: {src_dir} -> {dest}")
+        else:
+            print(f"  Ingesting directory ({self.ingest_mode}): {src_dir} -> {dest}")
+        placed: Dict[str, int] = defaultdict(int)  # method -> files
+        base_ignore = shutil.ignore_patterns(".*", "__MACOSX")
+        pruned = [0, 0]  # members, bytes
+
+        def _ignore(directory: str, contents: list) -> set:
+            ignored = base_ignore(directory, contents)
+            if self.prune_extraction:
+                for f in contents:
+                    if f in ignored or not f.endswith(EXCLUSION_SUFFIXES):
+                        continue
+                    fpath = os.path.join(directory, f)
+                    if os.path.isfile(fpath):
+                        ignored.add(f)
+                        pruned[0] += 1
+                        pruned[1] += os.path.getsize(fpath)
+            return ignored
+
+        def _place(src: str, dst: str) -> str:
+            placed[ingest_file(src, dst, self.ingest_mode)] += 1
+            return dst
+
         try:
-            shutil.copytree(src_dir, dest,
-                            ignore=shutil.ignore_patterns(".*", "__MACOSX"))
+            shutil.copytree(src_dir, dest, ignore=_ignore, copy_function=_place)
         except Exception as e:
             print(f"  Warning: error copying directory {src_dir}: {e}")
+        if self.ingest_mode != "copy":
+            how = ", ".join(f"{placed[m]} by {m}"
+                            for m in ("reflink", "hardlink", "copy") if placed[m])
+            print(f"    Ingested {sum(placed.values())} file(s) ({how or 'none'})")
+        if pruned[0]:
+            print(f"    Pruned {pruned[0]} excluded file(s), "
+                  f"{pruned[1] / (1024 * 1024):.2f} MB not copied")
+        return dest
 
-    def _extract_archive(self, archive_path: str, dest_parent: str) -> Optional[str]:
-        fname = os.path.basename(archive_path)
+    @staticmethod
+    def _archive_stem(fname: str) -> Optional[str]:
+        """Archive basename minus its recognised extension, or None."""
         if fname.endswith(".tar.gz"):
-            stem = fname[:-7]
-        elif fname.endswith(".tar"):
-            stem = fname[:-4]
-        elif fname.endswith(".zip"):
-            stem = fname[:-4]
-        else:
+            return fname[:-7]
+        if fname.endswith(".tar"):
+            return fname[:-4]
+        if fname.endswith(".zip"):
+            return fname[:-4]
+        return None
+
+    @classmethod
+    def _reserve_archive_dest(cls, archive_path: str, dest_parent: str) -> Optional[str]:
+        """
+        Claim (create) the directory archive_path will be extracted into.
+        Returns None, with a warning, for an unrecognised archive type.
+        """
+        stem = cls._archive_stem(os.path.basename(archive_path))
+        if stem is None:
             print(f"  Warning: unrecognised archive type, skipping: {archive_path}")
             return None
-
-        dest = self._unique_dest(dest_parent, stem)
+        dest = cls._unique_dest(dest_parent, stem)
         os.makedirs(dest, exist_ok=True)
+        return dest
+
+    @classmethod
+    def _extract_archive(cls, archive_path: str, dest_parent: str,
+                         dest: Optional[str] = None,
+                         prune: bool = False,
+                         threads: int = 1) -> Tuple[Optional[str], List[str], Optional[str]]:
+        """
+        Extract archive_path into dest (reserving one under dest_parent if
+        not given) and return (final extracted dir, paths of the nested
+        archives it wrote, its wrapper dir — see _wrapper_dir), or
+        (None, [], None) on failure.
+        A classmethod, not an instance method, so the --jobs process pool
+        can run it without pickling the whole Aggregator.
+
+        With prune, members whose names end in one of EXCLUSION_SUFFIXES
+        (BAM/FASTQ/CRAM and friends) are never written: make_tarball drops
+        them from every archive we emit, and no discovery rule reads them,
+        so extracting them is pure wasted I/O. AA_DIR_INCLUDE_SUFFIXES can't
+        be applied this early — which directories are AA results dirs isn't
+        known until Stage 3 has looked at their contents.
+
+        threads > 1 extracts a zip's members concurrently
+        (_extract_zip_members); tar is a sequential stream and ignores it.
+        """
+        if dest is None:
+            dest = cls._reserve_archive_dest(archive_path, dest_parent)
+            if dest is None:
+                return None, [], None
+        stem = cls._archive_stem(os.path.basename(archive_path))
         try:
             if archive_path.endswith(".zip"):
                 with zipfile.ZipFile(archive_path, "r") as zf:
-                    keep = self._filter_members(zf.namelist(), archive_path)
-                    zf.extractall(dest, members=sorted(keep))
+                    keep = cls._filter_members(zf.namelist(), archive_path)
+                    pruned = {n for n in keep if prune and cls._is_pruned_member(n)}
+                    keep -= pruned
+                    cls._extract_zip_members(zf, archive_path, dest, sorted(keep), threads)
+                    n_members = len(keep)
+                    n_bytes = sum(zf.getinfo(n).file_size for n in keep)
+                    n_pruned = len(pruned)
+                    pruned_bytes = sum(zf.getinfo(n).file_size for n in pruned)
+                    nested = [n for n in keep if n.endswith(ARCHIVE_EXTENSIONS)]
             else:
-                with tarfile.open(archive_path, "r:*") as tf:
-                    all_members = tf.getmembers()
-                    keep = self._filter_members([m.name for m in all_members],
-                                                archive_path)
-                    # A link whose *target* escapes is unsafe even when its own
-                    # name is fine — a later member could be written through it.
-                    members = [m for m in all_members
-                               if m.name in keep
-                               and not ((m.issym() or m.islnk())
-                                        and self._is_unsafe_member(m.linkname))]
-                    tf.extractall(dest, members=members)
-            dest = self._unwrap_redundant_dir(dest, dest_parent, stem)
-            print(f"  Extracted: {archive_path} -> {dest}")
-            return dest
+                n_members, n_bytes, n_pruned, pruned_bytes, nested = cls._stream_extract_tar(
+                    archive_path, dest, prune=prune)
+            # Member paths are relative to dest as extracted; re-root them
+            # if the wrapper dir was hoisted away.
+            nested = [normalize_member_name(n) for n in nested]
+            wrapper = cls._wrapper_dir(dest)
+            if cls._unwrap_redundant_dir(dest, dest_parent, stem):
+                nested = [n[len(stem) + 1:] for n in nested]
+            nested = [os.path.join(dest, n) for n in nested]
+            print(f"  Extracted: {archive_path} -> {dest} "
+                  f"({n_members} member(s), {n_bytes / (1024 * 1024):.2f} MB)")
+            if n_pruned:
+                print(f"    Pruned {n_pruned} excluded member(s), "
+                      f"{pruned_bytes / (1024 * 1024):.2f} MB not written")
+            return dest, nested, wrapper
         except Exception as e:
             print(f"  Warning: failed to extract {archive_path}: {e}")
+            if os.path.exists(dest) and not os.listdir(dest):
+                shutil.rmtree(dest, ignore_errors=True)
+            return None, [], None
+
+    @staticmethod
+    def _zip_member_target(dest: str, name: str) -> str:
+        """Where ZipFile.extract writes member name under dest (its own sanitising)."""
+        arcname = name.replace("/", os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        arcname = os.path.splitdrive(arcname)[1]
+        arcname = os.path.sep.join(x for x in arcname.split(os.path.sep)
+                                   if x not in ("", os.path.curdir, os.path.pardir))
+        return os.path.join(dest, arcname)
+
+    @classmethod
+    def _extract_zip_members(cls, zf: zipfile.ZipFile, archive_path: str,
+                             dest: str, names: List[str], threads: int) -> None:
+        """
+        Extract the (already filtered) members names of zf into dest.
+
+        With threads > 1 the file members are split into size-balanced
+        batches (largest first, each to the least-loaded batch), and each
+        batch is extracted by its own thread through its own ZipFile handle
+        — a shared handle would serialise every read on zipfile's file lock,
+        while zlib releases the GIL while it inflates. Every directory is
+        created before the threads start, since ZipFile.extract's own
+        exists-then-makedirs would race between them.
+        """
+        infos = [zf.getinfo(n) for n in names]
+        files = [i for i in infos if not i.is_dir()]
+        if threads <= 1 or len(files) < 2:
+            zf.extractall(dest, members=names)
+            return
+
+        for info in infos:
+            target = cls._zip_member_target(dest, info.filename)
+            os.makedirs(target if info.is_dir() else os.path.dirname(target),
+                        exist_ok=True)
+
+        n_batches = min(threads, len(files))
+        batches: List[List[zipfile.ZipInfo]] = [[] for _ in range(n_batches)]
+        loads = [0] * n_batches
+        for info in sorted(files, key=lambda i: i.compress_size, reverse=True):
+            k = loads.index(min(loads))
+            batches[k].append(info)
+            loads[k] += info.compress_size
+
+        def _run(batch: List[zipfile.ZipInfo]) -> None:
+            with zipfile.ZipFile(archive_path, "r") as own:
+                for info in batch:
+                    own.extract(info, dest)
+
+        with ThreadPoolExecutor(max_workers=n_batches) as pool:
+            for fut in [pool.submit(_run, b) for b in batches]:
+                fut.result()
+
+    @classmethod
+    def _index_archive(cls, archive_path: str, dest_parent: str,
+                       dest: str) -> Optional[ArchiveTree]:
+        """
+        --lazy_extraction counterpart of _extract_archive: index
+        archive_path's members into an ArchiveTree rooted at dest (already
+        reserved) instead of writing them out, and return it (None on
+        failure).
+
+        Only the directory skeleton and nested archives are written now,
+        plus — for a tar — the LAZY_EAGER_SUFFIXES files Stage 3 sniffs,
+        taken on the same single pass that builds the index. A zip's
+        members are read on demand instead, since zip has a central
+        directory and random access is cheap. Everything else stays in the
+        archive until _materialize_lazy_trees knows whether the output
+        needs it.
+        """
+        stem = cls._archive_stem(os.path.basename(archive_path))
+        tree = ArchiveTree(archive_path, dest)
+        try:
+            if archive_path.endswith(".zip"):
+                with zipfile.ZipFile(archive_path, "r") as zf:
+                    keep = cls._filter_members(zf.namelist(), archive_path)
+                    for info in zf.infolist():
+                        if info.filename in keep:
+                            tree.add_member(info.filename, info.file_size, info.is_dir())
+                tree.strip_wrapper(stem)
+                nested = {rel for rel in tree.files() if rel.endswith(ARCHIVE_EXTENSIONS)}
+                n_written, bytes_written = materialize_tree(tree, nested)
+            else:
+                n_written, bytes_written, _, _, _ = cls._stream_extract_tar(
+                    archive_path, dest,
+                    select=lambda m: m.name.endswith(cls.LAZY_EAGER_SUFFIXES),
+                    index=tree)
+                # Eager members were written under their original names,
+                # before the index could say whether the wrapper would go.
+                if tree.strip_wrapper(stem):
+                    cls._hoist_wrapper_dir(dest, dest_parent, stem)
+            for rel in tree.dirs():
+                os.makedirs(os.path.join(dest, rel), exist_ok=True)
+            n_members = sum(1 for _ in tree.files())
+            print(f"  Indexed: {archive_path} -> {dest} "
+                  f"({n_members} member(s), {tree.total_size() / (1024 * 1024):.2f} MB; "
+                  f"{n_written} written now, {bytes_written / (1024 * 1024):.2f} MB)")
+            return tree
+        except Exception as e:
+            print(f"  Warning: failed to index {archive_path}: {e}")
             if os.path.exists(dest) and not os.listdir(dest):
                 shutil.rmtree(dest, ignore_errors=True)
             return None
 
+    @classmethod
+    def _stream_extract_tar(cls, archive_path: str, dest: str,
+                            prune: bool = False,
+                            select=None,
+                            index: Optional[ArchiveTree] = None
+                            ) -> Tuple[int, int, int, int, List[str]]:
+        """
+        Extract a .tar/.tar.gz into dest in one forward pass over the stream,
+        returning (members extracted, bytes extracted, members pruned, bytes
+        pruned, names of the nested archives extracted) — see
+        _extract_archive for what prune skips.
+
+        For _index_archive, every member that passes the safety filters is
+        added to index, and select (TarInfo -> bool) restricts what is
+        actually written; directories are then left to the caller.
+
+        tf.getmembers() has to inflate the whole gzip stream just to build
+        the member list, and extractall() then seeks back to the start and
+        inflates everything a second time — twice the Stage 2 CPU for every
+        .tar.gz. Stream mode ("r|*") reads the archive exactly once, so the
+        keep/drop decision is made member by member as each header arrives,
+        with the same rules _filter_members applies to a full name list,
+        plus the link-target check (a link whose *target* escapes is unsafe
+        even when its own name is fine — a later member could be written
+        through it).
+
+        Directory attributes are applied last, deepest first, exactly as
+        extractall does: a read-only mode applied on creation would make
+        every later member inside that directory unwritable.
+        """
+        unsafe: List[str] = []
+        nested: List[str] = []
+        directories: List[tarfile.TarInfo] = []
+        n_members = n_bytes = n_pruned = pruned_bytes = 0
+        next_report = cls.EXTRACT_PROGRESS_BYTES
+        with tarfile.open(archive_path, "r|*") as tf:
+            for member in tf:
+                if cls._is_unsafe_member(member.name):
+                    unsafe.append(member.name)
+                    continue
+                if cls._is_ignored_member(member.name):
+                    continue
+                is_link = member.issym() or member.islnk()
+                if is_link and cls._is_unsafe_member(member.linkname):
+                    continue
+                if prune and not member.isdir() and cls._is_pruned_member(member.name):
+                    n_pruned += 1
+                    pruned_bytes += member.size
+                    continue
+                if index is not None:
+                    index.add_member(member.name, member.size, member.isdir())
+                if select is not None and (member.isdir() or not select(member)):
+                    continue
+                if member.isdir():
+                    tf.extract(member, dest, set_attrs=False)
+                    directories.append(member)
+                elif is_link:
+                    # A hard link whose target was dropped above (hidden,
+                    # __MACOSX) would make tarfile seek back for the target's
+                    # data, which a forward-only stream can't do.
+                    try:
+                        tf.extract(member, dest)
+                    except (tarfile.TarError, KeyError) as e:
+                        print(f"  Warning: skipped link {member.name} in "
+                              f"{archive_path}: {e}")
+                        continue
+                else:
+                    tf.extract(member, dest)
+                    if member.isfile() and member.name.endswith(ARCHIVE_EXTENSIONS):
+                        nested.append(member.name)
+                n_members += 1
+                n_bytes += member.size
+                if n_bytes >= next_report:
+                    print(f"    ... {os.path.basename(archive_path)}: "
+                          f"{n_members} member(s), "
+                          f"{n_bytes / (1024 * 1024):.0f} MB extracted so far")
+                    next_report += cls.EXTRACT_PROGRESS_BYTES
+
+            for member in sorted(directories, key=lambda m: m.name, reverse=True):
+                dirpath = os.path.join(dest, member.name)
+                try:
+                    tf.chown(member, dirpath, numeric_owner=False)
+                    tf.utime(member, dirpath)
+                    tf.chmod(member, dirpath)
+                except tarfile.ExtractError as e:
+                    print(f"  Warning: could not set attributes on {dirpath}: {e}")
+
+        cls._report_unsafe_members(unsafe, archive_path)
+        return n_members, n_bytes, n_pruned, pruned_bytes, nested
+
+    @staticmethod
+    def _is_pruned_member(name: str) -> bool:
+        """True if a member's basename ends in one of EXCLUSION_SUFFIXES."""
+        return name.rstrip("/").endswith(EXCLUSION_SUFFIXES)
+
     @staticmethod
     def _is_ignored_member(name: str) -> bool:
         """
@@ -332,7 +1063,8 @@ class Aggregator:
         resolved = posixpath.normpath(normalized)
         return resolved == ".." or resolved.startswith("../")
 
-    def _filter_members(self, names: List[str], archive_path: str) -> set:
+    @classmethod
+    def _filter_members(cls, names: List[str], archive_path: str) -> set:
         """
         Partition member names into those to extract and those to drop.
         Returns the set of names to keep.
@@ -342,25 +1074,31 @@ class Aggregator:
         dangerous to add, so if this ever fires on a real archive the user
         finds out rather than quietly getting an incomplete aggregation.
         """
-        unsafe = [n for n in names if self._is_unsafe_member(n)]
-        if unsafe:
-            print(f"  Warning: {len(unsafe)} member(s) of {archive_path} "
-                  f"would extract outside the destination directory and were "
-                  f"SKIPPED (possible path-traversal or absolute paths):")
-            for n in unsafe[:5]:
-                print(f"    {n}")
-            if len(unsafe) > 5:
-                print(f"    ... and {len(unsafe) - 5} more")
+        unsafe = [n for n in names if cls._is_unsafe_member(n)]
+        cls._report_unsafe_members(unsafe, archive_path)
         unsafe_set = set(unsafe)
         return {n for n in names
-                if n not in unsafe_set and not self._is_ignored_member(n)}
+                if n not in unsafe_set and not cls._is_ignored_member(n)}
 
-    def _unwrap_redundant_dir(self, dest: str, dest_parent: str,
-                              stem: str) -> str:
+    @staticmethod
+    def _report_unsafe_members(unsafe: List[str], archive_path: str) -> None:
+        if not unsafe:
+            return
+        print(f"  Warning: {len(unsafe)} member(s) of {archive_path} "
+              f"would extract outside the destination directory and were "
+              f"SKIPPED (possible path-traversal or absolute paths):")
+        for n in unsafe[:5]:
+            print(f"    {n}")
+        if len(unsafe) > 5:
+            print(f"    ... and {len(unsafe) - 5} more")
+
+    @classmethod
+    def _unwrap_redundant_dir(cls, dest: str, dest_parent: str,
+                              stem: str) -> bool:
         """
         Collapse a redundant self-similar wrapper directory produced when one
-        of our own tarballs is re-extracted, returning the path to use as the
-        extracted dir.
+        of our own tarballs is re-extracted, in place — dest keeps its path
+        and takes the wrapper's contents. Returns True if it did.
 
         make_tarball roots every archive it writes at the source dir's
         basename, so a tarball we emitted — e.g. DMS273_cnvkit_output.tar.gz
@@ -378,24 +1116,43 @@ class Aggregator:
         if any, is named for the sample/cohort, not the archive) are never
         touched.
         """
+        wrapper = cls._wrapper_dir(dest)
+        if wrapper is None or wrapper != stem:
+            return False
+        cls._hoist_wrapper_dir(dest, dest_parent, stem)
+        return True
+
+    @staticmethod
+    def _wrapper_dir(dest: str) -> Optional[str]:
+        """The sole (non-hidden) entry of a fresh extraction, if it is a dir."""
         try:
             entries = [e for e in os.listdir(dest) if not e.startswith(".")]
         except OSError:
-            return dest
-        if entries != [stem] or not os.path.isdir(os.path.join(dest, stem)):
-            return dest
+            return None
+        if len(entries) != 1 or not os.path.isdir(os.path.join(dest, entries[0])):
+            return None
+        return entries[0]
 
+    @classmethod
+    def _hoist_wrapper_dir(cls, dest: str, dest_parent: str, stem: str) -> None:
+        """Replace dest with its dest/stem subdir (no-op if that's missing)."""
         inner = os.path.join(dest, stem)
-        hold = self._unique_dest(dest_parent, stem + ".__unwrap__")
+        if not os.path.isdir(inner):
+            return
+        # The hold name derives from dest (already unique), and the hoisted
+        # dir takes dest's own name back — never a fresh _unique_dest(stem)
+        # lookup, which with --jobs could race a sibling worker unwrapping
+        # a same-stem archive into the same parent at the same moment.
+        hold = cls._unique_dest(dest_parent, os.path.basename(dest) + ".__unwrap__")
         os.rename(inner, hold)
         shutil.rmtree(dest, ignore_errors=True)
-        final = self._unique_dest(dest_parent, stem)
-        os.rename(hold, final)
-        return final
+        os.rename(hold, dest)
 
-    def _find_nested_archives(self) -> List[str]:
+    @staticmethod
+    def _find_nested_archives(top: str) -> List[str]:
+        """Every archive under top — used once per copied input dir."""
         archives = []
-        for root, dirs, files in os.walk(self.extract_dir):
+        for root, dirs, files in os.walk(top):
             dirs[:] = [d for d in dirs
                        if not d.startswith(".") and d != "__MACOSX"]
             for fname in files:
@@ -421,10 +1178,16 @@ class Aggregator:
 
     def _stage3_discover(self) -> None:
         print("\n--- Stage 3: Discovery ---")
+        if self.reuse_discovery and self._load_discovery_manifest():
+            self._materialize_lazy_trees()
+            return
         self._files_dirs = {}
         self._floating_cnv_beds = {}
+        self._tool_sniffs = {}
+        self._log_scans = {}
+        self._prefetch_discovery()
 
-        for root, dirs, files in os.walk(self.extract_dir, topdown=True):
+        for root, dirs, files in self._fs.walk(self.extract_dir):
             dirs[:] = [d for d in dirs
                        if not d.startswith(".") and d != "__MACOSX"]
 
@@ -432,7 +1195,7 @@ class Aggregator:
             for dname in list(dirs):
                 dpath = os.path.join(root, dname)
                 try:
-                    dcontents = set(os.listdir(dpath))
+                    dcontents = set(self._fs.listdir(dpath))
                 except OSError:
                     dcontents = set()
 
@@ -444,7 +1207,7 @@ class Aggregator:
                     continue
 
                 if dname.endswith("_AA_results"):
-                    if is_valid_aa_results_dir(dpath):
+                    if is_valid_aa_results_dir(dpath, fs=self._fs):
                         sname = rchop(dname, "_AA_results")
                         self._register_aa_results_dir(sname, dpath)
                         dirs.remove(dname)
@@ -454,7 +1217,7 @@ class Aggregator:
                               f"but failed validation — will descend.")
                         continue
 
-                if is_valid_aa_results_dir(dpath):
+                if is_valid_aa_results_dir(dpath, fs=self._fs):
                     print(f"  Warning: '{dpath}' passes AA validation but "
                           f"is not named _AA_results — registering anyway.")
                     sname = self._sname_from_summary(dpath) or dname
@@ -478,14 +1241,14 @@ class Aggregator:
                     dirs.remove(dname)
                     continue
 
-                is_cls, _profiles, _rt = is_classification_dir(dpath)
+                is_cls, _profiles, _rt = is_classification_dir(dpath, fs=self._fs)
                 if is_cls:
                     self.classification_dirs.append(dpath)
                     self._classification_result_tables[dpath] = _rt
                     if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
                         print(f"  Classif dir  : {dpath}")
                     files_sub = os.path.join(dpath, "files")
-                    if os.path.isdir(files_sub):
+                    if self._fs.isdir(files_sub):
                         self._files_dirs[dpath] = files_sub
                     dirs.remove(dname)
                     self._walk_classification_dir(dpath)
@@ -497,16 +1260,12 @@ class Aggregator:
                 if fname.startswith("."):
                     continue
 
-                matched = False
-                for suffix in MISC_AA_SUFFIXES:
-                    if fname.endswith(suffix):
-                        sname = rchop(fname, suffix)
-                        rec = self._get_or_create_record(sname)
-                        self._register_misc_file(rec, suffix, fpath)
-                        matched = True
-                        break
-
-                if not matched:
+                match = classify_filename(fname)
+                kind = match[0] if match else None
+                if kind == "misc":
+                    rec = self._get_or_create_record(match[2])
+                    self._register_misc_file(rec, match[1], fpath)
+                else:
                     if fname.endswith(".log") and root != self.extract_dir:
                         # AmpliconSuite-pipeline writes a short [name].log
                         # sibling and, on newer versions, a fuller
@@ -523,21 +1282,21 @@ class Aggregator:
                         # matching only _AA_results silently dropped
                         # [sname].log (and with it the AmpliconArchitect
                         # version banner) on every round-trip.
-                        if any(os.path.isdir(os.path.join(root, f"{sname}{sfx}"))
+                        if any(self._fs.isdir(os.path.join(root, f"{sname}{sfx}"))
                                for sfx in ("_AA_results",
                                            "_reconstruction_results")):
                             rec = self._get_or_create_record(sname)
                             if not rec.pipeline_log:
                                 rec.pipeline_log = fpath
-                            self._extract_log_versions(rec, fpath)
+                            self._queue_log_scan(rec, fpath)
 
-                    if fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX):
+                    if kind == "cnv_bed":
                         parent_name = os.path.basename(root)
                         if not (parent_name.endswith("_cnvkit_output")
                                 or parent_name.endswith("_cnvkit_outputs")):
                             sname = self._cnv_bed_sample_name(
                                 fname, parent_name,
-                                known_snames=set(self.sample_registry.keys()))
+                                known_snames=self.sample_registry.keys())
                             if sname not in self._floating_cnv_beds:
                                 self._floating_cnv_beds[sname] = fpath
                                 if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
@@ -550,21 +1309,22 @@ class Aggregator:
         # via Stage 5's blind-copy fallback (_pull_aa_files_from_files_dirs).
         for files_dir in self._files_dirs.values():
             try:
-                for fname in os.listdir(files_dir):
+                for fname in self._fs.listdir(files_dir):
                     if fname.startswith("."):
                         continue
                     fpath = os.path.join(files_dir, fname)
-                    if fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX):
+                    match = classify_filename(fname)
+                    if match and match[0] == "cnv_bed":
                         sname = self._cnv_bed_sample_name(
-                            fname, known_snames=set(self.sample_registry.keys()))
+                            fname, known_snames=self.sample_registry.keys())
                         if sname not in self._floating_cnv_beds:
                             self._floating_cnv_beds[sname] = fpath
                             if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
                                 print(f"  Floating CNV : {sname} -> {fpath}")
                         continue
-                    if self._register_summary_file(fname, fpath):
+                    if self._register_summary_file(fname, fpath, match=match):
                         continue
-                    self._register_amplicon_file(fname, fpath)
+                    self._register_amplicon_file(fname, fpath, match=match)
             except OSError:
                 pass
 
@@ -574,6 +1334,11 @@ class Aggregator:
             if not rec.cnv_calls_bed:
                 rec.cnv_calls_bed = bed_path
 
+        # 3d. Content-sniff graph/cycles files for CoRAL output, and scrape
+        # tool versions out of sample logs
+        self._sniff_reconstruction_tools()
+        self._scan_sample_logs()
+
         n_samples = len(self.sample_registry)
         print(f"  Discovery complete: {n_samples} sample(s) inferred, "
               f"{len(self.classification_dirs)} classification dir(s), "
@@ -581,8 +1346,191 @@ class Aggregator:
         if n_samples > self.VERBOSE_THRESHOLD:
             print(f"  (Per-item discovery lines suppressed for >{self.VERBOSE_THRESHOLD} samples)")
 
+        if self.reuse_discovery:
+            self._save_discovery_manifest()
+        self._materialize_lazy_trees()
+
+    def _prefetch_discovery(self) -> None:
+        """
+        Fill the DiscoveryFS listing index and summary-header cache from a
+        pool of reader threads, one directory per task, fanning out as
+        subdirs turn up — so a cohort that arrives as one archive spreads
+        out as well as many small inputs do. The walk below then replays
+        serially against warm caches: every registration decision and
+        first-wins rule runs in exactly the order it always has, and only
+        the I/O is parallel.
+        """
+        t0 = time.time()
+        n_dirs = 0
+        with ThreadPoolExecutor(max_workers=self._read_threads) as pool:
+            pending = {pool.submit(self._prefetch_dir, self.extract_dir, True)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    n_dirs += 1
+                    for sub, descend in fut.result():
+                        pending.add(pool.submit(self._prefetch_dir, sub, descend))
+        print(f"  Listed {n_dirs} dir(s) ahead of discovery ({time.time() - t0:.1f}s)")
+
+    def _prefetch_dir(self, dpath: str, descend: bool) -> List[Tuple[str, bool]]:
+        """
+        List one dir and read its summary headers; returns the subdirs to
+        prefetch next as (path, descend). Mirrors the walk's pruning: hidden
+        and __MACOSX dirs and AUX dirs are skipped, and results/cnvkit dirs
+        are listed but not descended into.
+        """
+        try:
+            entries = self._fs.listdir(dpath)
+        except OSError:
+            return []
+        if "AUX_DIR" in entries and dpath != self.extract_dir:
+            return []
+        subdirs: List[Tuple[str, bool]] = []
+        for name in entries:
+            path = os.path.join(dpath, name)
+            if name.endswith("_summary.txt"):
+                try:
+                    self._fs.head(path, 5)
+                except (OSError, ValueError):
+                    pass
+            elif descend and not name.startswith(".") and name != "__MACOSX" \
+                    and self._fs.isdir(path):
+                leaf = (name.endswith("_AA_results") or name == "files"
+                        or "cnvkit_output" in name)
+                subdirs.append((path, not leaf))
+        return subdirs
+
+    @property
+    def _discovery_manifest_path(self) -> str:
+        return os.path.join(self.work_dir, DISCOVERY_MANIFEST)
+
+    def _save_discovery_manifest(self) -> None:
+        """
+        --reuse_discovery: persist what discovery decided, plus the size of
+        every tree path it recorded (dirs as None) for the next run to check.
+        """
+        path = self._discovery_manifest_path
+        paths = ManifestPaths(self.extract_dir)
+        files: Dict[str, Optional[int]] = {}
+
+        def _note(p: Optional[str], is_dir: bool = False) -> None:
+            if p and p not in self._generated_cnv_beds:
+                files[paths.rel(p)] = None if is_dir else self._fs.getsize(p)
+
+        try:
+            samples = []
+            for rec in self.sample_registry.values():
+                samples.append(record_to_dict(rec, paths))
+                for field in RECORD_PATH_FIELDS:
+                    _note(getattr(rec, field), field in RECORD_DIR_FIELDS)
+                for file_dict in rec.amplicon_files.values():
+                    for fpath in file_dict.values():
+                        _note(fpath)
+            for d in self.classification_dirs + self.aux_dirs + list(self._files_dirs.values()):
+                _note(d, is_dir=True)
+            for p in list(self._classification_result_tables.values()) \
+                    + list(self._floating_cnv_beds.values()):
+                _note(p)
+            write_manifest(path, {
+                "fingerprint": self._input_fingerprint,
+                "samples": samples,
+                "classification_dirs": [paths.rel(d) for d in self.classification_dirs],
+                "result_tables": {paths.rel(d): paths.rel(rt)
+                                  for d, rt in self._classification_result_tables.items()},
+                "aux_dirs": [paths.rel(d) for d in self.aux_dirs],
+                "files_dirs": {paths.rel(d): paths.rel(f) for d, f in self._files_dirs.items()},
+                "floating_cnv_beds": {s: paths.rel(p)
+                                      for s, p in self._floating_cnv_beds.items()},
+                "generated_cnv_beds": {paths.rel(b): paths.rel(c)
+                                       for b, c in self._generated_cnv_beds.items()},
+                "files": files,
+            })
+        except (OSError, ValueError) as e:
+            print(f"  Warning: could not write discovery manifest {path}: {e}")
+            return
+        print(f"  Discovery manifest written: {path} ({len(files)} path(s) recorded)")
+
+    def _load_discovery_manifest(self) -> bool:
+        """
+        --reuse_discovery: adopt the manifest's discovery results if the
+        inputs are unchanged and every path it records is still in the
+        freshly extracted tree at the same size. Returns False (having
+        changed nothing) when discovery has to run after all.
+        """
+        path = self._discovery_manifest_path
+        manifest = read_manifest(path)
+        if manifest is None:
+            print(f"  No reusable discovery manifest at {path}; running discovery.")
+            return False
+        t0 = time.time()
+        paths = ManifestPaths(self.extract_dir)
+        reason = stale_reason(manifest, self._input_fingerprint)
+        if reason is None:
+            checks = list(manifest.get("files", {}).items())
+            matches = self._thread_map(
+                lambda c: self._manifest_path_matches(paths.abs(c[0]), c[1]), checks)
+            bad = [rel for (rel, _), ok in zip(checks, matches) if not ok]
+            if bad:
+                reason = f"{len(bad)} path(s) missing or resized, e.g. {bad[0]}"
+        if reason is not None:
+            print(f"  Discovery manifest is stale ({reason}); running discovery.")
+            return False
+
+        for entry in manifest["samples"]:
+            rec = record_from_dict(entry, paths, self._amplicon_paths)
+            self.sample_registry[rec.name] = rec
+        self.classification_dirs = [paths.abs(d) for d in manifest["classification_dirs"]]
+        self._classification_result_tables = {
+            paths.abs(d): paths.abs(rt) for d, rt in manifest["result_tables"].items()}
+        self.aux_dirs = [paths.abs(d) for d in manifest["aux_dirs"]]
+        self._files_dirs = {paths.abs(d): paths.abs(f)
+                            for d, f in manifest["files_dirs"].items()}
+        self._floating_cnv_beds = {s: paths.abs(p)
+                                   for s, p in manifest["floating_cnv_beds"].items()}
+        self._regenerate_cnv_beds({paths.abs(b): paths.abs(c)
+                                   for b, c in manifest["generated_cnv_beds"].items()})
+
+        print(f"  Reused discovery manifest {path}: {len(self.sample_registry)} sample(s), "
+              f"{len(self.classification_dirs)} classification dir(s), "
+              f"{len(self.aux_dirs)} AUX dir(s); {len(manifest['files'])} path(s) "
+              f"checked ({time.time() - t0:.1f}s)")
+        return True
+
+    def _manifest_path_matches(self, path: str, size: Optional[int]) -> bool:
+        # One stat for anything on disk; only paths still inside a mounted
+        # archive (--lazy_extraction) go through DiscoveryFS.
+        try:
+            st = os.stat(path)
+        except OSError:
+            if size is None:
+                return self._fs.isdir(path)
+            try:
+                return self._fs.getsize(path) == size
+            except OSError:
+                return False
+        if size is None:
+            return stat.S_ISDIR(st.st_mode)
+        return stat.S_ISREG(st.st_mode) and st.st_size == size
+
+    def _regenerate_cnv_beds(self, generated: Dict[str, str]) -> None:
+        """
+        Rewrite the CNV_CALLS.bed files an earlier discovery converted from
+        .cns (see _register_cnvkit_dir) — Stage 2 has just rebuilt the tree
+        without them. A bed that can't be rebuilt is dropped from its record.
+        """
+        for dest, cns_path in generated.items():
+            try:
+                convert_cnvkit_cns_to_bed(self._fs.fetch(cns_path), dest)
+                self._fs.note_file(dest)
+                self._generated_cnv_beds[dest] = cns_path
+            except (OSError, ValueError, IndexError) as e:
+                print(f"  Warning: failed to convert {cns_path} to CNV_CALLS.bed: {e}")
+                for rec in self.sample_registry.values():
+                    if rec.cnv_calls_bed == dest:
+                        rec.cnv_calls_bed = None
+
     def _walk_classification_dir(self, cls_dir: str) -> None:
-        for root, dirs, files in os.walk(cls_dir, topdown=True):
+        for root, dirs, files in self._fs.walk(cls_dir):
             dirs[:] = [d for d in dirs
                        if not d.startswith(".") and d != "__MACOSX"]
             for dname in list(dirs):
@@ -590,7 +1538,7 @@ class Aggregator:
                 if dname == "files":
                     dirs.remove(dname)
                     continue
-                if dname.endswith("_AA_results") and is_valid_aa_results_dir(dpath):
+                if dname.endswith("_AA_results") and is_valid_aa_results_dir(dpath, fs=self._fs):
                     sname = rchop(dname, "_AA_results")
                     self._register_aa_results_dir(sname, dpath)
                     dirs.remove(dname)
@@ -611,30 +1559,25 @@ class Aggregator:
                     continue
                 fpath = os.path.join(root, fname)
 
-                matched = False
-                for suffix in MISC_AA_SUFFIXES:
-                    if fname.endswith(suffix):
-                        sname = rchop(fname, suffix)
-                        rec = self._get_or_create_record(sname)
-                        self._register_misc_file(rec, suffix, fpath)
-                        matched = True
-                        break
-                if matched:
+                match = classify_filename(fname)
+                if match and match[0] == "misc":
+                    rec = self._get_or_create_record(match[2])
+                    self._register_misc_file(rec, match[1], fpath)
                     continue
 
                 # Summary file (flat classification dir — all sample files at top level)
-                if self._register_summary_file(fname, fpath):
+                if self._register_summary_file(fname, fpath, match=match):
                     continue
 
                 # Per-amplicon files sitting flat alongside classification TSVs
-                if self._register_amplicon_file(fname, fpath):
+                if self._register_amplicon_file(fname, fpath, match=match):
                     continue
 
                 # CNV BED files (no parent-dir fallback — we're inside a classification dir)
-                if fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX):
+                if match and match[0] == "cnv_bed":
                     sname = self._cnv_bed_sample_name(
                         fname, parent_dir_name="",
-                        known_snames=set(self.sample_registry.keys()))
+                        known_snames=self.sample_registry.keys())
                     if sname not in self._floating_cnv_beds:
                         self._floating_cnv_beds[sname] = fpath
 
@@ -648,9 +1591,9 @@ class Aggregator:
         if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
             print(f"  AA results   : {sname} -> {dpath}")
         try:
-            for fname in os.listdir(dpath):
+            for fname in self._fs.listdir(dpath):
                 fpath = os.path.join(dpath, fname)
-                if os.path.isdir(fpath):
+                if self._fs.isdir(fpath):
                     # CoRAL has no AmpliconSuite-pipeline wrapper, so its
                     # cnvkit_output dir sometimes sits *inside* the results
                     # dir (which is itself claimed wholesale here off loose
@@ -667,53 +1610,85 @@ class Aggregator:
                     # outside it) reliably opens with an "AmpliconArchitect
                     # version ..." banner line, even when no pipeline-level
                     # sibling log exists at all.
-                    self._extract_log_versions(rec, fpath)
-                if self._register_summary_file(fname, fpath, sname=sname):
+                    self._queue_log_scan(rec, fpath)
+                match = classify_filename(fname)
+                kind = match[0] if match else None
+                if self._register_summary_file(fname, fpath, sname=sname, match=match):
                     continue
-                if (fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX)) and fname.startswith(sname):
+                if kind == "cnv_bed" and fname.startswith(sname):
                     if not rec.cnv_calls_bed:
                         rec.cnv_calls_bed = fpath
                     continue
-                if (fname.endswith("_CNV_CALLS_unfiltered_gains.bed")
+                if (kind == "misc" and match[1] == "_CNV_CALLS_unfiltered_gains.bed"
                         and fname.startswith(sname)
                         and not rec.cnv_calls_unfiltered_gains_bed):
                     rec.cnv_calls_unfiltered_gains_bed = fpath
                     continue
-                self._register_amplicon_file(fname, fpath, sname=sname)
+                self._register_amplicon_file(fname, fpath, sname=sname, match=match)
         except OSError as e:
             print(f"  Warning: could not index files in {dpath}: {e}")
 
-    def _extract_log_versions(self, rec: SampleRecord, fpath: str) -> None:
+    def _queue_log_scan(self, rec: SampleRecord, fpath: str) -> None:
+        """Defer a log's version scrape to _scan_sample_logs() (step 3d)."""
+        self._log_scans.setdefault(rec.name, (rec, []))[1].append(fpath)
+
+    def _extract_log_versions(self, paths: List[str]) -> Tuple[Optional[str], ...]:
         """
         Scrape AmpliconArchitect / AmpliconSuite-pipeline version banner
-        lines out of a log file, filling in whichever of rec.aa_version /
-        rec.amplicon_suite_pipeline_version is still unset. First log found
-        with a given version line wins; called from multiple discovery
+        lines out of one sample's logs, in discovery order. First log found
+        with a given version line wins; logs come from multiple discovery
         sites (nested AA-tool log, sibling pipeline log) since neither
         source is guaranteed to carry both lines. Also opportunistically
-        fills rec.ac_version if this particular log happens to carry an
-        AmpliconClassifier banner too (e.g. a combined-invocation pipeline
-        log) — but this isn't AC version's primary source, see Stage 4's
+        returns an AmpliconClassifier banner if a log happens to carry one
+        (e.g. a combined-invocation pipeline log) — but this isn't AC
+        version's primary source, see Stage 4's
         _scan_classification_log_version() and result_table.tsv's own
         "AC version" column, which take priority.
+
+        Returns (aa_version, pipeline_version, ac_version).
         """
-        if rec.aa_version and rec.amplicon_suite_pipeline_version:
-            return
-        try:
-            with open(fpath, errors="ignore") as fh:
-                text = fh.read()
-        except OSError:
-            return
-        aa_v, pipeline_v, ac_v = extract_tool_versions(text)
-        if aa_v and not rec.aa_version:
-            rec.aa_version = aa_v
-        if pipeline_v and not rec.amplicon_suite_pipeline_version:
-            rec.amplicon_suite_pipeline_version = pipeline_v
-        if ac_v and not rec.ac_version:
-            rec.ac_version = ac_v
+        aa_v = pipeline_v = ac_v = None
+        for fpath in paths:
+            if aa_v and pipeline_v:
+                break
+            try:
+                with self._fs.open(fpath, errors="ignore") as fh:
+                    found = scan_tool_versions(
+                        fh, want=(not aa_v, not pipeline_v, not ac_v))
+            except OSError:
+                continue
+            aa_v = aa_v or found[0]
+            pipeline_v = pipeline_v or found[1]
+            ac_v = ac_v or found[2]
+        return aa_v, pipeline_v, ac_v
 
-    @staticmethod
-    def _descend_redundant_cnvkit_dir(dpath: str) -> str:
+    def _scan_sample_logs(self) -> None:
+        """Run the queued per-sample log scrapes concurrently."""
+        queued = list(self._log_scans.values())
+        self._log_scans = {}
+        results = self._thread_map(self._extract_log_versions,
+                                   [paths for _, paths in queued])
+        for (rec, _), (aa_v, pipeline_v, ac_v) in zip(queued, results):
+            if aa_v and not rec.aa_version:
+                rec.aa_version = aa_v
+            if pipeline_v and not rec.amplicon_suite_pipeline_version:
+                rec.amplicon_suite_pipeline_version = pipeline_v
+            if ac_v and not rec.ac_version:
+                rec.ac_version = ac_v
+
+    @property
+    def _read_threads(self) -> int:
+        return max(self.jobs, self.READ_THREADS)
+
+    def _thread_map(self, fn, items: list) -> list:
+        """map() over the discovery reader threads, results in order."""
+        n_threads = min(self._read_threads, len(items))
+        if n_threads <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            return list(pool.map(fn, items))
+
+    def _descend_redundant_cnvkit_dir(self, dpath: str) -> str:
         """
         Collapse a cnvkit dir that wraps nothing but another cnvkit dir.
 
@@ -733,13 +1708,13 @@ class Aggregator:
         while dpath not in seen:
             seen.add(dpath)
             try:
-                entries = [e for e in os.listdir(dpath) if not e.startswith(".")]
+                entries = [e for e in self._fs.listdir(dpath) if not e.startswith(".")]
             except OSError:
                 return dpath
             if len(entries) != 1:
                 return dpath
             inner = os.path.join(dpath, entries[0])
-            if not os.path.isdir(inner):
+            if not self._fs.isdir(inner):
                 return dpath
             if not (entries[0] in ("cnvkit_output", "cnvkit_outputs")
                     or entries[0].endswith(("_cnvkit_output", "_cnvkit_outputs"))):
@@ -758,11 +1733,12 @@ class Aggregator:
         if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
             print(f"  cnvkit dir   : {sname} -> {dpath}")
         try:
-            entries = os.listdir(dpath)
+            entries = self._fs.listdir(dpath)
         except OSError:
             entries = []
         for fname in entries:
-            if fname.endswith("_CNV_CALLS.bed") or fname.endswith(LEGACY_CNV_BED_SUFFIX):
+            match = classify_filename(fname)
+            if match and match[0] == "cnv_bed":
                 rec.cnv_calls_bed = os.path.join(dpath, fname)
                 break
         if not rec.cnv_calls_bed:
@@ -779,8 +1755,11 @@ class Aggregator:
             if plain_cns:
                 dest = os.path.join(dpath, f"{sname}_CNV_CALLS.bed")
                 try:
-                    convert_cnvkit_cns_to_bed(os.path.join(dpath, plain_cns), dest)
+                    convert_cnvkit_cns_to_bed(
+                        self._fs.fetch(os.path.join(dpath, plain_cns)), dest)
+                    self._fs.note_file(dest)
                     rec.cnv_calls_bed = dest
+                    self._generated_cnv_beds[dest] = os.path.join(dpath, plain_cns)
                     print(f"  Generated CNV_CALLS.bed for '{sname}' from {plain_cns} "
                           f"(no CNV_CALLS.bed found in cnvkit dir)")
                 except (OSError, ValueError, IndexError) as e:
@@ -788,7 +1767,8 @@ class Aggregator:
                           f"CNV_CALLS.bed for '{sname}': {e}")
 
     def _register_amplicon_file(self, fname: str, fpath: str,
-                                 sname: Optional[str] = None) -> bool:
+                                 sname: Optional[str] = None,
+                                 match: Optional[tuple] = None) -> bool:
         """
         Register a per-amplicon file (pdf/png/cycles/graph/cycles_png/
         cycles_pdf) on the owning SampleRecord and run tool-detection
@@ -799,37 +1779,38 @@ class Aggregator:
         Returns True if fname matched the "_amplicon"-file pattern at all
         (whether or not registration actually succeeded), so callers can
         treat this as "recognised, stop trying other matchers" — mirrors
-        the original inline logic's unconditional `continue`.
+        the original inline logic's unconditional `continue`. match is
+        classify_filename(fname), if the caller already has it.
         """
         if "_amplicon" not in fname:
             return False
-        for suffix, key in AMPLICON_FILE_DISCOVERY_SUFFIXES:
-            if not fname.endswith(suffix):
-                continue
-            candidate = sname
-            if candidate is None:
-                amp_idx = fname.find("_amplicon")
-                if amp_idx <= 0:
-                    break
-                candidate = fname[:amp_idx]
-            num = self._parse_amplicon_num(fname, candidate)
-            # Require an exact shape ({sname}_amplicon{N}{suffix}) — not
-            # just "contains _amplicon and ends with a recognised suffix".
-            # Other per-amplicon-numbered artifacts (e.g. BFBArchitect's
-            # {sname}_amplicon{N}_whole_graph_BFB_cycles.txt) also end in a
-            # recognised suffix but carry extra text in between; without
-            # this check they'd collide with the real per-amplicon file
-            # under the same dict key.
-            if num is not None and fname == f"{candidate}_amplicon{num}{suffix}":
-                rec = self._get_or_create_record(candidate)
-                rec.amplicon_files.setdefault(num, {}).setdefault(key, fpath)
-                if key in ("cycles", "graph"):
-                    self._detect_tool_from_amplicon_txt(rec, fpath, key)
-            break
+        if match is None:
+            match = classify_filename(fname)
+        # classify_filename only reports the exact {sname}_amplicon{N}{suffix}
+        # shape — not just "contains _amplicon and ends with a recognised
+        # suffix". Other per-amplicon-numbered artifacts (e.g. BFBArchitect's
+        # {sname}_amplicon{N}_whole_graph_BFB_cycles.txt) also end in a
+        # recognised suffix but carry extra text in between; without that
+        # they'd collide with the real per-amplicon file under the same key.
+        if match is None or match[0] != "amplicon":
+            return True
+        _, key, candidate, num = match
+        if sname is not None:
+            if candidate != sname:
+                return True
+        elif not candidate or "_amplicon" in candidate:
+            # With the sample name unknown, it is whatever precedes the
+            # first "_amplicon".
+            return True
+        rec = self._get_or_create_record(candidate)
+        rec.amplicon_files.add(num, key, fpath)
+        if key in ("cycles", "graph"):
+            self._queue_tool_sniff(rec, fpath, key)
         return True
 
     def _register_summary_file(self, fname: str, fpath: str,
-                                sname: Optional[str] = None) -> bool:
+                                sname: Optional[str] = None,
+                                match: Optional[tuple] = None) -> bool:
         """
         Register a summary file (AA's `_summary.txt` or CoRAL's older
         `_amplicon_summary.txt`) on the owning SampleRecord, validating
@@ -841,17 +1822,14 @@ class Aggregator:
         (whether or not its content validated), so callers can stop
         trying other matchers for this file.
         """
-        if fname.endswith("_amplicon_summary.txt"):
-            suffix = "_amplicon_summary.txt"
-        elif fname.endswith("_summary.txt"):
-            suffix = "_summary.txt"
-        else:
+        if match is None:
+            match = classify_filename(fname)
+        if match is None or match[0] != "summary":
             return False
 
-        candidate = sname if sname is not None else rchop(fname, suffix)
+        candidate = sname if sname is not None else match[2]
         try:
-            with open(fpath) as fh:
-                lines = [fh.readline() for _ in range(5)]
+            lines = self._fs.head(fpath, 5)
         except OSError:
             return True
 
@@ -866,31 +1844,104 @@ class Aggregator:
             rec.reconstruction_tool = "CoRAL"
         return True
 
-    def _detect_tool_from_amplicon_txt(self, rec: SampleRecord, fpath: str,
-                                        key: str) -> None:
+    def _queue_tool_sniff(self, rec: SampleRecord, fpath: str, key: str) -> None:
+        """
+        Defer CoRAL content sniffing of a per-amplicon graph.txt/cycles.txt
+        to _sniff_reconstruction_tools(), which runs once discovery has
+        seen every file. Samples already tagged CoRAL need no sniffing.
+        """
+        if rec.reconstruction_tool == "CoRAL":
+            return
+        self._tool_sniffs.setdefault(rec.name, (rec, []))[1].append((fpath, key))
+
+    def _sniff_amplicon_txt(self, fpath: str, key: str,
+                            bounded: bool = True) -> Tuple[Optional[bool], int]:
         """
         Peek a per-amplicon graph.txt/cycles.txt for CoRAL content signals:
         the future `#CoRAL` header line, or (cycles.txt only) a `Path=`
         walk line / "subpath constraints" section — both CoRAL-only per
-        AC's own AA/CoRAL parsing distinction. No-ops once a sample is
-        already tagged CoRAL.
-        """
-        if rec.reconstruction_tool == "CoRAL":
+        AC's own AA/CoRAL parsing distinction. When bounded, reads the
+        first SNIFF_BYTES and, if a cycles.txt runs past them, its last
+        SNIFF_BYTES, where CoRAL's walks sit behind a long segment list.
+
+        Returns (verdict, bytes read): True for CoRAL, False when a whole
+        cycles.txt was read without a signal, None if inconclusive (a
+        graph.txt, or a cycles.txt whose middle the budget skipped).
+        """
+        budget = self.SNIFF_BYTES if bounded else -1
+        skipped = False
+        with self._fs.open_binary(fpath) as fh:
+            line = fh.readline(budget)
+            n_read = len(line)
+            if line.startswith(CORAL_HEADER_PREFIX.encode()):
+                return True, n_read
+            if key != "cycles":
+                return None, n_read
+            while line:
+                if line.startswith(b"Path=") or b"subpath constraints" in line:
+                    return True, n_read
+                if budget > 0 and n_read >= budget:
+                    tail_start = self._fs.getsize(fpath) - budget
+                    if tail_start > fh.tell():
+                        fh.seek(tail_start)
+                        n_read += len(fh.readline())    # partial line
+                        skipped = True
+                    budget = -1     # at most SNIFF_BYTES left either way
+                line = fh.readline(budget - n_read if budget > 0 else -1)
+                n_read += len(line)
+        return (None if skipped else False), n_read
+
+    def _sniff_sample_tool(self, files: List[Tuple[str, str]]) -> Tuple[Optional[bool], int, int]:
+        """
+        Sniff one sample's queued files in discovery order until one gives
+        a verdict. A sample's amplicons all come out of the same
+        reconstruction run, so the first CoRAL signal or the first
+        cycles.txt read end to end without one settles it — AA samples
+        used to pay a full read of every cycles file, per amplicon. If
+        no bounded read settles it, its cycles files are read in full
+        rather than the sample defaulting to AmpliconArchitect.
+        Returns (verdict, files read, bytes read).
+        """
+        n_files = n_read = 0
+        passes = ((files, True),
+                  ([(fpath, key) for fpath, key in files if key == "cycles"], False))
+        for pass_files, bounded in passes:
+            for fpath, key in pass_files:
+                try:
+                    verdict, n = self._sniff_amplicon_txt(fpath, key, bounded)
+                except OSError:
+                    continue
+                n_files += 1
+                n_read += n
+                if verdict is not None:
+                    return verdict, n_files, n_read
+        return None, n_files, n_read
+
+    def _sniff_reconstruction_tools(self) -> None:
+        """
+        Run the queued per-sample sniffs on a thread pool (they are pure
+        reads, so I/O latency overlaps) and tag CoRAL samples. One verdict
+        per sample, so the outcome doesn't depend on thread scheduling.
+        """
+        queued = [(rec, files) for rec, files in self._tool_sniffs.values()
+                  if rec.reconstruction_tool != "CoRAL"]
+        self._tool_sniffs = {}
+        if not queued:
             return
-        try:
-            with open(fpath) as fh:
-                first_line = fh.readline()
-                if first_line.startswith(CORAL_HEADER_PREFIX):
-                    rec.reconstruction_tool = "CoRAL"
-                    return
-                if key != "cycles":
-                    return
-                for line in (first_line, *fh):
-                    if line.startswith("Path=") or "subpath constraints" in line:
-                        rec.reconstruction_tool = "CoRAL"
-                        return
-        except OSError:
-            pass
+        results = self._thread_map(self._sniff_sample_tool,
+                                   [files for _, files in queued])
+
+        n_files = 0
+        read_by_tool: Dict[str, int] = defaultdict(int)
+        for (rec, _), (verdict, files_read, bytes_read) in zip(queued, results):
+            if verdict:
+                rec.reconstruction_tool = "CoRAL"
+            n_files += files_read
+            read_by_tool[rec.reconstruction_tool] += bytes_read
+        per_tool = ", ".join(f"{tool} {n / (1024 * 1024):.2f} MB"
+                             for tool, n in sorted(read_by_tool.items()))
+        print(f"  Tool sniffing: {n_files} file(s) from {len(queued)} sample(s), "
+              f"{sum(read_by_tool.values()) / (1024 * 1024):.2f} MB read ({per_tool})")
 
     def _register_misc_file(self, rec: SampleRecord, suffix: str, fpath: str) -> None:
         if suffix in ("_AA_CNV_SEEDS.bed", "_CNV_SEEDS.bed"):
@@ -908,47 +1959,24 @@ class Aggregator:
 
     def _get_or_create_record(self, sname: str) -> SampleRecord:
         if sname not in self.sample_registry:
-            self.sample_registry[sname] = SampleRecord(name=sname)
+            self.sample_registry[sname] = SampleRecord(name=sname, amplicon_paths=self._amplicon_paths)
         return self.sample_registry[sname]
 
-    @staticmethod
-    def _sname_from_summary(dirpath: str) -> Optional[str]:
+    def _sname_from_summary(self, dirpath: str) -> Optional[str]:
         try:
-            for fname in os.listdir(dirpath):
-                # Check the longer CoRAL suffix first — it ends in the same
-                # "_summary.txt" tail, so checking that one first would chop
-                # "_amplicon" off the sample name too.
-                if fname.endswith("_amplicon_summary.txt"):
-                    return rchop(fname, "_amplicon_summary.txt")
-                if fname.endswith("_summary.txt"):
-                    return rchop(fname, "_summary.txt")
+            for fname in self._fs.listdir(dirpath):
+                # classify_filename prefers CoRAL's longer
+                # "_amplicon_summary.txt", so "_amplicon" is chopped too.
+                match = classify_filename(fname)
+                if match and match[0] == "summary":
+                    return match[2]
         except OSError:
             pass
         return None
 
-    @staticmethod
-    def _parse_amplicon_num(fname: str, sname: str) -> Optional[int]:
-        stem = fname
-        if stem.startswith(sname + "_amplicon"):
-            stem = stem[len(sname) + len("_amplicon"):]
-        elif "_amplicon" in stem:
-            stem = stem.split("_amplicon", 1)[1]
-        else:
-            return None
-        num_str = ""
-        for ch in stem:
-            if ch.isdigit():
-                num_str += ch
-            else:
-                break
-        try:
-            return int(num_str)
-        except ValueError:
-            return None
-
     @staticmethod
     def _cnv_bed_sample_name(fname: str, parent_dir_name: str = "",
-                              known_snames: Optional[set] = None) -> str:
+                              known_snames: Optional[Collection[str]] = None) -> str:
         """
         Derive a sample name from a CNV BED filename.
 
@@ -969,19 +1997,9 @@ class Aggregator:
         the directory name so _cnv_bed_sample_name is not used — any file ending
         in _CNV_CALLS.bed or LEGACY_CNV_BED_SUFFIX is accepted directly.
         """
-        # Strip bed suffix
-        if fname.endswith(LEGACY_CNV_BED_SUFFIX):
-            prefix = rchop(fname, LEGACY_CNV_BED_SUFFIX)
-        else:
-            prefix = rchop(fname, "_CNV_CALLS.bed")
-
-        # Strip .cs.rmdup infix if present
-        CS_RMDUP = ".cs.rmdup"
-        has_cs_rmdup = prefix.endswith(CS_RMDUP)
-        if has_cs_rmdup:
-            candidate = prefix[:-len(CS_RMDUP)]
-        else:
-            candidate = prefix
+        # Strip the bed suffix and any .cs.rmdup infix
+        _, suffix, candidate, _ = classify_filename(fname)
+        has_cs_rmdup = suffix.startswith(CS_RMDUP_INFIX)
 
         # If candidate matches a known sample, return it
         if known_snames and candidate in known_snames:
@@ -994,6 +2012,73 @@ class Aggregator:
 
         return candidate
 
+    def _materialize_lazy_trees(self) -> None:
+        """
+        --lazy_extraction: write out, in place, exactly the archive members
+        Stages 4-6 will read — now that discovery knows which those are —
+        and leave the rest (BAMs, intermediate files, anything outside a
+        recognised dir) in the archives. Per registered sample that is its
+        AA results dir (AA_DIR_INCLUDE_SUFFIXES plus the per-amplicon files
+        _rescue_amplicon_files may pull from it), its cnvkit dir and every
+        individually registered file; plus every classification and AUX dir,
+        the floating CNV beds, and any result table Stage 4's fallback walk
+        could find. EXCLUSION_SUFFIXES files are never written.
+        """
+        trees = self._fs.trees
+        if not trees:
+            return
+        needed: List[str] = []
+
+        def _add_tree(top: str, suffixes: Optional[Tuple[str, ...]] = None) -> None:
+            for root, _, files in self._fs.walk(top):
+                for fname in files:
+                    if fname.endswith(EXCLUSION_SUFFIXES):
+                        continue
+                    if suffixes is None or fname.endswith(suffixes) or "_amplicon" in fname:
+                        needed.append(os.path.join(root, fname))
+
+        for rec in self.sample_registry.values():
+            if rec.aa_results_dir:
+                _add_tree(rec.aa_results_dir, AA_DIR_INCLUDE_SUFFIXES)
+            if rec.cnvkit_dir:
+                _add_tree(rec.cnvkit_dir)
+            needed.extend(p for p in (
+                rec.cnv_calls_bed, rec.cnv_calls_unfiltered_gains_bed,
+                rec.run_metadata_json, rec.sample_metadata_json,
+                rec.aa_cnv_seeds_bed, rec.finish_flag, rec.timing_log,
+                rec.pipeline_log, rec.aa_summary_file) if p)
+            for file_dict in rec.amplicon_files.values():
+                needed.extend(file_dict.values())
+        for d in self.classification_dirs + self.aux_dirs:
+            _add_tree(d)
+        needed.extend(self._floating_cnv_beds.values())
+        for root, dirs, files in self._fs.walk(self.extract_dir):
+            dirs[:] = [d for d in dirs
+                       if not d.startswith(".") and d != "__MACOSX"]
+            needed.extend(os.path.join(root, f) for f in files
+                          if f.endswith(AC_RESULT_TABLE_SUFFIX))
+
+        pending = self._fs.pending(needed)
+        n_files = n_bytes = 0
+        if self.jobs <= 1 or len(pending) <= 1:
+            for tree, rels in pending.items():
+                f, b = materialize_tree(tree, rels)
+                n_files += f
+                n_bytes += b
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(pending))) as pool:
+                for f, b in pool.map(_materialize_tree_job, pending.keys(), pending.values()):
+                    n_files += f
+                    n_bytes += b
+        for tree in trees:
+            tree.close()
+
+        total_files = sum(sum(1 for _ in t.files()) for t in trees)
+        total_bytes = sum(t.total_size() for t in trees)
+        print(f"  Lazy extraction: wrote {n_files} of {total_files} indexed member(s) "
+              f"({n_bytes / (1024 * 1024):.2f} of {total_bytes / (1024 * 1024):.2f} MB) "
+              f"needed by the output.")
+
     # ==================================================================
     # Stage 4 — result_table parser + sample registry reconciliation
     # ==================================================================
@@ -1040,17 +2125,18 @@ class Aggregator:
         if len(self.classification_dirs) < 2:
             return
 
-        # cls_dir -> (result_table_path, {sample names it covers})
-        dir_info: Dict[str, Tuple[str, set]] = {}
+        rt_paths: Dict[str, str] = {}
         for cls_dir in self.classification_dirs:
             rt_path = self._classification_result_tables.get(cls_dir)
-            if not rt_path or not os.path.isfile(rt_path):
-                continue
+            if rt_path and os.path.isfile(rt_path):
+                rt_paths[cls_dir] = rt_path
+        self._prefetch_result_tables(list(rt_paths.values()))
+
+        # cls_dir -> (result_table_path, {sample names it covers})
+        dir_info: Dict[str, Tuple[str, set]] = {}
+        for cls_dir, rt_path in rt_paths.items():
             try:
-                samples = set(
-                    pd.read_csv(rt_path, sep="\t", usecols=["Sample name"],
-                                dtype=str)["Sample name"].dropna().unique()
-                )
+                samples = self._result_tables.get(rt_path).present_values("Sample name")
             except Exception as e:
                 print(f"  Warning: could not pre-scan {rt_path} for AC "
                       f"reclassification detection: {e}")
@@ -1122,6 +2208,41 @@ class Aggregator:
             self._files_dirs = {d: v for d, v in self._files_dirs.items()
                                  if d not in to_drop}
 
+    def _parse_workers(self, rt_paths: List[str]) -> int:
+        """
+        Worker processes to parse rt_paths with: 0 (parse serially) unless
+        --jobs > 1 and there are several tables adding up to at least
+        PARALLEL_PARSE_BYTES.
+        """
+        def _size(path: str) -> int:
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+
+        if (self.jobs <= 1 or len(rt_paths) <= 1
+                or sum(map(_size, rt_paths)) < self.PARALLEL_PARSE_BYTES):
+            return 0
+        return min(self.jobs, len(rt_paths))
+
+    def _prefetch_result_tables(self, rt_paths: List[str]) -> None:
+        """
+        Parse the generation pre-scan's tables into the result table cache
+        on a process pool, when _parse_workers() says it pays. This is the
+        first read of every table in a cohort with several classification
+        dirs, so the row parse that follows finds them all cached.
+        """
+        pending = [p for p in rt_paths if p not in self._result_tables]
+        n_workers = self._parse_workers(pending)
+        if not n_workers:
+            return
+        print(f"  Parsing {len(pending)} result_table file(s) with "
+              f"{n_workers} worker process(es)...")
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            for table in pool.map(_result_table_job, pending):
+                if table is not None:
+                    self._result_tables.put(table)
+
     def _sniff_ac_version_for_generation(self, rt_path: str) -> Optional[str]:
         """
         AC version for an entire classification generation (not a single
@@ -1141,18 +2262,13 @@ class Aggregator:
 
     def _sniff_ac_version_uncached(self, rt_path: str) -> Optional[str]:
         try:
-            header = pd.read_csv(rt_path, sep="\t", nrows=0).columns
+            table = self._result_tables.get(rt_path)
         except Exception:
-            header = []
-        if "AC version" in header:
-            try:
-                col = pd.read_csv(rt_path, sep="\t", usecols=["AC version"],
-                                   dtype=str, keep_default_na=False)["AC version"]
-                for v in col:
-                    if not not_provided(v):
-                        return v
-            except Exception:
-                pass
+            table = None
+        if table is not None and "AC version" in table.columns:
+            for v in table.column("AC version"):
+                if not not_provided(v):
+                    return v
         return self._scan_classification_log_version(os.path.dirname(rt_path))
 
     @staticmethod
@@ -1199,22 +2315,22 @@ class Aggregator:
         that appear in result_tables but have NO Stage 3 discovery data get a
         stub SampleRecord so later stages can still produce partial output.
 
-        self.feature_rows is set to a flat list of dicts — one per feature row
-        across all result tables — preserving the 'sample_N' grouping key used
-        in run.json.
+        The rows themselves go into self.features, a columnar FeatureStore
+        (asa_feature_store) — or, with --spill_features, an SQLiteFeatureStore
+        at FEATURE_SPILL_DB in the work dir; self.run_json_groups maps each
+        'sample_N' key used in run.json to the slots of that sample's rows.
         """
         print("\n--- Stage 4: Result table parsing ---")
 
         self._resolve_ac_generations()
 
-        # { 'sample_N' -> [ row_dict, ... ] }  preserves run.json index keys
-        self.run_json_groups: Dict[str, List[dict]] = {}
-
-        # Flat ordered list of (sample_key, sname, row_dict) for easy iteration
-        self.all_feature_rows: List[Tuple[str, str, dict]] = []
-
-        sample_counter = 1
-        found_any = False
+        # { 'sample_N' -> slots in self.features }  preserves run.json index keys
+        self.run_json_groups: Dict[str, range] = {}
+        if self.spill_features:
+            print(f"  Spilling feature rows to {self._feature_spill_path}")
+            self.features = SQLiteFeatureStore(self._feature_spill_path)
+        else:
+            self.features = FeatureStore()
 
         # Search classification dirs first, then fall back to a broader walk
         # of the entire extraction tree (handles result tables that landed
@@ -1224,6 +2340,7 @@ class Aggregator:
             search_dirs = [self.extract_dir]
 
         seen_result_tables: List[str] = []
+        seen_set: set = set()
 
         for search_root in search_dirs:
             for root, dirs, files in os.walk(search_root):
@@ -1235,28 +2352,26 @@ class Aggregator:
                     if fname.startswith("."):
                         continue
                     rt_path = os.path.join(root, fname)
-                    if rt_path in seen_result_tables:
+                    if rt_path in seen_set:
                         continue
+                    seen_set.add(rt_path)
                     seen_result_tables.append(rt_path)
-                    self._parse_single_result_table(rt_path, sample_counter)
-                    # Advance counter by however many new sample keys were added
-                    sample_counter = len(self.run_json_groups) + 1
-                    found_any = True
 
-        if not found_any:
+        # sname -> its 'sample_N' key, kept up to date as tables are merged
+        # so a duplicate overwrites the earlier key rather than adding one.
+        self._sample_key_for: Dict[str, str] = {}
+        self._prefetch_run_metadata()
+        for rt_path, chunk, error in self._read_result_table_chunks(seen_result_tables):
+            self._merge_result_table(rt_path, chunk, error)
+
+        if not seen_result_tables:
             self._abort(
                 "No *_result_table.tsv files found. "
                 "Ensure AmpliconClassifier has been run before aggregating."
             )
 
-        # Flatten into self.all_feature_rows for Stage 5 / 6 iteration
-        self.all_feature_rows = []
-        for skey, rows in self.run_json_groups.items():
-            for row in rows:
-                self.all_feature_rows.append((skey, row["Sample name"], row))
-
         # Reconcile: warn about Stage 3 discoveries not in any result table
-        rt_snames = {sname for _, sname, _ in self.all_feature_rows}
+        rt_snames = set(self._sample_key_for)
         for inferred_sname in list(self.sample_registry.keys()):
             if inferred_sname not in rt_snames:
                 # Only warn for records that have substantive data (AA or cnvkit)
@@ -1267,22 +2382,81 @@ class Aggregator:
                           f"it will not be included in the output.")
 
         # Reconcile: create stub records for result_table samples with no Stage 3 data
-        for sname in rt_snames:
+        for sname in self._sample_key_for:
             if sname not in self.sample_registry:
                 print(f"  Warning: sample '{sname}' found in result_table "
                       f"but no AA/cnvkit data was discovered for it.")
-                self.sample_registry[sname] = SampleRecord(name=sname)
+                self.sample_registry[sname] = SampleRecord(name=sname, amplicon_paths=self._amplicon_paths)
 
-        total_features = len(self.all_feature_rows)
+        total_features = sum(len(slots) for slots in self.run_json_groups.values())
         total_samples  = len(rt_snames)
         print(f"  Parsed {total_features} feature row(s) across "
               f"{total_samples} sample(s) from "
-              f"{len(seen_result_tables)} result_table file(s).")
+              f"{len(seen_result_tables)} result_table file(s) "
+              f"({self._result_tables.parses} table parse(s), "
+              f"{self._result_tables.hits} reused).")
+        self._result_tables.clear()
+
+    def _read_result_table_chunks(
+        self, rt_paths: List[str],
+    ) -> Iterator[Tuple[str, Optional[FeatureChunk], Optional[str]]]:
+        """
+        Yield (rt_path, chunk, error) for each table, in rt_paths order:
+        chunk as _group_result_table() returns it, or error (a message) if
+        the table could not be read.
+
+        Tables not already held by the result table cache — the generation
+        pre-scan only runs with several classification dirs — are parsed
+        on a process pool when _parse_workers() says it pays, while the
+        merge still consumes them in traversal order, so sample_N keys and
+        duplicate overwrites come out exactly as with a serial parse.
+        Cached tables are decoded here: shipping them to a worker would
+        cost more than decoding them.
+        """
+        pooled = [p for p in rt_paths if p not in self._result_tables]
+        n_workers = self._parse_workers(pooled)
+        if not n_workers:
+            for rt_path in rt_paths:
+                yield (rt_path, *self._read_result_table_local(rt_path))
+            return
+
+        print(f"  Parsing {len(pooled)} result_table file(s) with "
+              f"{n_workers} worker process(es)...")
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {p: pool.submit(_group_result_table_job, p) for p in pooled}
+            for rt_path in rt_paths:
+                future = futures.pop(rt_path, None)
+                if future is None:
+                    yield (rt_path, *self._read_result_table_local(rt_path))
+                    continue
+                self._result_tables.parses += 1
+                yield (rt_path, *future.result())
+
+    def _read_result_table_local(self, rt_path: str) -> Tuple[Optional[FeatureChunk], Optional[str]]:
+        try:
+            return self._group_result_table(*self._result_tables.take(rt_path)), None
+        except Exception as e:
+            return None, str(e)
+
+    @staticmethod
+    def _group_result_table(columns: List[str], rows: Iterator[List[str]]) -> Optional[FeatureChunk]:
+        """
+        A table's rows as a FeatureChunk, grouped by sample, with each
+        sample's first-row tool versions alongside; None if the table has
+        no "Sample name" column.
+        """
+        if "Sample name" not in columns:
+            return None
+        return FeatureChunk.from_rows(columns, rows,
+                                      extra=("AA version", "AS-p version", "AC version"))
 
-    def _parse_single_result_table(self, rt_path: str, start_counter: int) -> None:
+    def _merge_result_table(self, rt_path: str, chunk: Optional[FeatureChunk],
+                            error: Optional[str]) -> None:
         """
-        Read one *_result_table.tsv, group rows by 'Sample name', and merge
-        them into self.run_json_groups.
+        Merge one *_result_table.tsv's rows, grouped by 'Sample name', into
+        self.features and self.run_json_groups. Rows are streamed straight
+        into columns (asa_feature_store.FeatureChunk), so the table is never
+        held as a DataFrame or as row dicts.
 
         Duplicate sample names (across multiple result tables) are handled by
         keeping the last-seen set of rows and printing a light warning.
@@ -1314,46 +2488,28 @@ class Aggregator:
         the actual run that produced the result_table.tsv being parsed.
         """
         print(f"  Reading: {rt_path}")
-        try:
-            df = pd.read_csv(rt_path, sep="\t", dtype=str, keep_default_na=False)
-        except Exception as e:
-            print(f"  Warning: could not read {rt_path}: {e} — skipping.")
+        if error is not None:
+            print(f"  Warning: could not read {rt_path}: {error} — skipping.")
             return
-
-        if "Sample name" not in df.columns:
+        if chunk is None:
             print(f"  Warning: 'Sample name' column missing in {rt_path} — skipping.")
             return
 
-        # Normalise NaN-like values to our sentinel string
-        df = df.where(df != "", other=NOT_PROVIDED)
-
         cls_dir = os.path.dirname(rt_path)
         log_ac_version: Optional[str] = None  # lazily scanned, at most once per table
 
-        # Find the reverse mapping sname -> existing sample_key so we can
-        # overwrite on duplicate rather than creating a second key.
-        existing_key_for: Dict[str, str] = {}
-        for skey, rows in self.run_json_groups.items():
-            if rows:
-                existing_key_for[rows[0]["Sample name"]] = skey
-
-        counter = start_counter
-        for sname, group in df.groupby("Sample name", sort=False):
-            sname = str(sname)  # guard: ensure key is always a string (e.g. numeric sample names)
-            rows = group.to_dict(orient="records")
-            # Also normalise the Sample name field inside each row
-            for row in rows:
-                row["Sample name"] = str(row["Sample name"])
-            if sname in existing_key_for:
+        for sname, (slots, row0) in self.features.extend(chunk).items():
+            skey = self._sample_key_for.get(sname)
+            if skey is not None:
                 print(f"  Warning: duplicate sample name '{sname}' — "
                       f"overwriting earlier result_table rows.")
-                self.run_json_groups[existing_key_for[sname]] = rows
+                self.run_json_groups[skey] = slots
             else:
-                skey = f"sample_{counter}"
-                self.run_json_groups[skey] = rows
-                counter += 1
+                skey = f"sample_{len(self.run_json_groups) + 1}"
+                self._sample_key_for[sname] = skey
+                self.run_json_groups[skey] = slots
             if len(self.sample_registry) <= self.VERBOSE_THRESHOLD:
-                print(f"    {sname}: {len(rows)} feature row(s)")
+                print(f"    {sname}: {len(slots)} feature row(s)")
 
             # Look up (don't create) — a sample with a result_table row but
             # no Stage 3 discovery data gets a stub record later, in
@@ -1363,7 +2519,6 @@ class Aggregator:
             if rec is not None:
                 if not rec.ac_source_dir:
                     rec.ac_source_dir = cls_dir
-                row0 = rows[0]
                 meta_aa, meta_paa, meta_ac = self._read_run_metadata_versions(rec)
 
                 row_aa = row0.get("AA version")
@@ -1432,17 +2587,48 @@ class Aggregator:
                 continue
             try:
                 with open(fpath, errors="ignore") as fh:
-                    text = fh.read()
+                    _, _, ac_v = scan_tool_versions(fh, want=(False, False, True))
             except OSError:
                 continue
-            _, _, ac_v = extract_tool_versions(text)
             if ac_v:
                 return ac_v
         return None
 
-    @staticmethod
+    def _prefetch_run_metadata(self) -> None:
+        """
+        Load every discovered sample's run_metadata.json on the reader
+        threads, so the merge's per-sample version lookups are dict hits
+        rather than one small read after another — which on network
+        storage is most of Stage 4 for a large cohort.
+        """
+        paths = sorted({rec.run_metadata_json for rec in self.sample_registry.values()
+                        if rec.run_metadata_json
+                        and rec.run_metadata_json not in self._run_metadata_versions})
+        if not paths:
+            return
+        t0 = time.time()
+        results = self._thread_map(self._load_run_metadata_versions, paths)
+        self._run_metadata_versions.update(zip(paths, results))
+        print(f"  Loaded {len(paths)} run_metadata.json file(s) ahead of parsing "
+              f"({time.time() - t0:.1f}s)")
+
     def _read_run_metadata_versions(
-            rec: SampleRecord) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+            self, rec: SampleRecord) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        rec's run_metadata.json versions (_load_run_metadata_versions),
+        memoised by path; None, None, None if it has none.
+        """
+        path = rec.run_metadata_json
+        if not path:
+            return None, None, None
+        versions = self._run_metadata_versions.get(path)
+        if versions is None:
+            versions = self._run_metadata_versions[path] = self._load_run_metadata_versions(path)
+        return versions
+
+    @staticmethod
+    def _load_run_metadata_versions(
+            path: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
         Read AA/AmpliconSuite-pipeline/AC versions directly out of a
         sample's own [sname]_run_metadata.json, written by
@@ -1467,10 +2653,8 @@ class Aggregator:
         or _scan_classification_log_version()) for exactly that reason.
         Returns (aa_version, pipeline_version, ac_version); any may be None.
         """
-        if not rec.run_metadata_json:
-            return None, None, None
         try:
-            with open(rec.run_metadata_json) as fh:
+            with open(path) as fh:
                 meta = json.load(fh)
         except (OSError, ValueError):
             return None, None, None
@@ -1541,19 +2725,47 @@ class Aggregator:
         print("\n--- Stage 5: Building output tree ---")
 
         # Authoritative sample name list comes from result_table parsing
-        rt_snames = sorted({sname for _, sname, _ in self.all_feature_rows})
+        rt_snames = sorted(self._sample_key_for)
         n_total = len(rt_snames)
         verbose = n_total <= self.VERBOSE_THRESHOLD
-
-        for i, sname in enumerate(rt_snames, 1):
-            self._build_sample_dir(sname)
-            if verbose:
-                print(f"  Built sample dir: {sname}")
-            elif i % 10 == 0 or i == n_total:
-                print(f"  Progress: {i}/{n_total} sample dirs built...")
+        for sname in rt_snames:
+            if sname not in self.sample_registry:
+                # Should not happen — Stage 4 always creates a stub
+                self.sample_registry[sname] = SampleRecord(name=sname, amplicon_paths=self._amplicon_paths)
+
+        t0 = time.perf_counter()
+        n_built = n_bytes = 0
+        for i, (sname, built, output, error) in enumerate(
+                self._build_sample_dirs(rt_snames), 1):
+            sys.stdout.write(output)
+            if error is not None:
+                print(f"  Warning: could not build sample dir for '{sname}': {error} "
+                      f"— its files will be Not Provided.")
+            else:
+                rec = self.sample_registry[sname]
+                rec.aa_dir_dest, rec.cnvkit_tarball, rec.cnv_bed_dest, jobs, size = built
+                for job in jobs:
+                    self._compressor.submit(*job)
+                n_built += 1
+                n_bytes += size
+                if verbose:
+                    print(f"  Built sample dir: {sname}")
+            if not verbose and (i % 10 == 0 or i == n_total):
+                elapsed = max(time.perf_counter() - t0, 1e-9)
+                print(f"  Progress: {i}/{n_total} sample dirs built "
+                      f"({i / elapsed:.1f} samples/s, "
+                      f"{n_bytes / elapsed / (1024 * 1024):.1f} MB/s)...")
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+        print(f"  Built {n_built}/{n_total} sample dir(s), {n_bytes / (1024 * 1024):.1f} MB "
+              f"in {elapsed:.1f}s ({n_total / elapsed:.1f} samples/s, "
+              f"{n_bytes / elapsed / (1024 * 1024):.1f} MB/s)")
 
         self._build_consolidated_classification()
         self._copy_aux_dirs()
+        self._run_compression(verbose)
+        # Nothing after Stage 5 queries the extraction tree (the final
+        # archive reads its recorded copies directly).
+        self._fs.clear()
 
         print("  Output tree construction complete.")
 
@@ -1569,30 +2781,84 @@ class Aggregator:
     # Stage 5a — per-sample directory
     # ------------------------------------------------------------------
 
-    def _build_sample_dir(self, sname: str) -> None:
+    def _build_sample_dirs(
+        self, snames: List[str],
+    ) -> Iterator[Tuple[str, Optional[tuple], str, Optional[str]]]:
+        """
+        Yield (sname, built, output, error) for each sample, in snames
+        order: built as _build_sample_dir() returns it plus the bytes
+        written, output its console lines, or error (a message) if the
+        build raised — its partial sample dir is then removed, and the
+        other samples carry on.
+
+        With --jobs > 1, sample dirs are built on that many threads (the
+        work is file copies and zlib, which release the GIL). Each sample's
+        console lines are held back and yielded in order, and SampleRecords
+        are only updated by the caller, so output and records come out
+        exactly as with a serial build. Builds only read the extraction
+        tree, so samples sharing a cnvkit dir can be built side by side.
+        """
+        def _build(sname: str) -> Tuple[Optional[tuple], Optional[str]]:
+            sample_out = os.path.join(self.samples_dir, sname)
+            try:
+                built = self._build_sample_dir(sname)
+            except Exception as e:
+                self._output.rmtree(sample_out)
+                return None, str(e)
+            return (*built, self._output.tree_size(sample_out)), None
+
+        n_threads = min(self.jobs, len(snames))
+        if n_threads <= 1:
+            for sname in snames:
+                built, error = _build(sname)
+                yield sname, built, "", error
+            return
+
+        out = ThreadOutput(sys.stdout)
+
+        def _build_captured(sname: str) -> Tuple[Optional[tuple], str, Optional[str]]:
+            with out.capture() as buf:
+                built, error = _build(sname)
+            return built, buf.getvalue(), error
+
+        print(f"  Building {len(snames)} sample dir(s) with {n_threads} thread(s)...")
+        with contextlib.redirect_stdout(out), ThreadPoolExecutor(max_workers=n_threads) as pool:
+            futures = {sname: pool.submit(_build_captured, sname) for sname in snames}
+            for sname in snames:
+                yield (sname, *futures.pop(sname).result())
+
+    def _build_sample_dir(self, sname: str) -> Tuple[Optional[str], Optional[str],
+                                                      Optional[str], List[tuple]]:
         """
         Create results/samples/[sname]/ and populate it with tarballs,
-        an uncompressed CNV BED copy, and all misc files.
+        an uncompressed CNV BED copy, and all misc files. Returns the
+        record's (aa_dir_dest, cnvkit_tarball, cnv_bed_dest), leaving the
+        record itself untouched, plus the compression jobs that finish the
+        dir — the tarball and compressed logs — as CompressionPool.submit()
+        arguments.
         """
-        rec = self.sample_registry.get(sname)
-        if rec is None:
-            # Should not happen — Stage 4 always creates a stub
-            rec = SampleRecord(name=sname)
-            self.sample_registry[sname] = rec
-
+        rec = self.sample_registry[sname]
         sample_out = os.path.join(self.samples_dir, sname)
         os.makedirs(sample_out, exist_ok=True)
+        jobs: List[tuple] = []
 
         # ---- AA results directory (uncompressed copy) ------------------
-        rec.aa_dir_dest = self._copy_aa_results_dir(sname, rec, sample_out)
-        if rec.aa_dir_dest:
-            compress_reconstruct_logs(rec.aa_dir_dest)
+        aa_dir_dest = self._copy_aa_results_dir(sname, rec, sample_out)
+        if aa_dir_dest:
+            log_bytes = sum(
+                self._output.getsize(os.path.join(aa_dir_dest, fname))
+                for fname in self._output.listdir(aa_dir_dest)
+                if fname.endswith(RECONSTRUCT_LOG_SUFFIX))
+            if log_bytes:
+                jobs.append(((f"reconstruct logs of '{sname}'", None), log_bytes,
+                             compress_reconstruct_logs,
+                             aa_dir_dest, self._output, self.gzip_level))
 
         # ---- cnvkit tarball ---------------------------------------------
-        rec.cnvkit_tarball = self._build_cnvkit_tarball(sname, rec, sample_out)
+        cnvkit_tarball = self._build_cnvkit_tarball(sname, rec, sample_out, jobs)
 
         # ---- Uncompressed CNV BED copy ----------------------------------
-        rec.cnv_bed_dest = self._copy_cnv_bed(sname, rec, sample_out)
+        cnv_bed_dest = self._copy_cnv_bed(sname, rec, sample_out)
 
         # ---- Miscellaneous files ----------------------------------------
         misc_map = [
@@ -1606,8 +2872,9 @@ class Aggregator:
         ]
         for src, dest_name in misc_map:
             if src and os.path.isfile(src):
-                dest = os.path.join(sample_out, dest_name)
-                safe_copy_file(src, dest)
+                self._output.add_file(src, os.path.join(sample_out, dest_name))
+
+        return aa_dir_dest, cnvkit_tarball, cnv_bed_dest, jobs
 
     def _copy_aa_results_dir(self, sname: str, rec: SampleRecord,
                               sample_out: str) -> Optional[str]:
@@ -1632,8 +2899,8 @@ class Aggregator:
         dest_dir = os.path.join(sample_out, f"{sname}_reconstruction_results")
 
         if rec.aa_results_dir and os.path.isdir(rec.aa_results_dir):
-            safe_copytree(rec.aa_results_dir, dest_dir,
-                          inclusions=AA_DIR_INCLUDE_SUFFIXES)
+            self._output.add_tree(rec.aa_results_dir, dest_dir,
+                                  inclusions=AA_DIR_INCLUDE_SUFFIXES)
             self._canonicalize_reconstruction_files(dest_dir, sname)
             return dest_dir
 
@@ -1648,12 +2915,12 @@ class Aggregator:
                     if not ext:
                         continue
                     dest = os.path.join(dest_dir, f"{sname}_amplicon{amp_num}{ext}")
-                    shutil.copy2(src, dest)
+                    self._output.add_file(src, dest)
                     found_any = True
 
         if rec.aa_summary_file and os.path.isfile(rec.aa_summary_file):
-            shutil.copy2(rec.aa_summary_file,
-                        os.path.join(dest_dir, f"{sname}_summary.txt"))
+            self._output.add_file(rec.aa_summary_file,
+                                  os.path.join(dest_dir, f"{sname}_summary.txt"))
             found_any = True
 
         if not found_any:
@@ -1662,7 +2929,7 @@ class Aggregator:
         if found_any:
             return dest_dir
 
-        shutil.rmtree(dest_dir, ignore_errors=True)
+        self._output.rmtree(dest_dir)
         print(f"  Warning: no reconstruction results found for '{sname}' — Reconstruction directory: Not Provided")
         return None
 
@@ -1680,31 +2947,28 @@ class Aggregator:
         run.json even though they were copied successfully.
         """
         try:
-            entries = os.listdir(dest_dir)
+            entries = self._output.listdir(dest_dir)
         except OSError:
             return
         for fname in entries:
             fpath = os.path.join(dest_dir, fname)
-            if not os.path.isfile(fpath):
+            if not self._output.isfile(fpath):
+                continue
+            match = classify_filename(fname)
+            if match is None:
                 continue
-            if fname.endswith("_amplicon_summary.txt") or fname.endswith("_summary.txt"):
+            if match[0] == "summary":
                 canonical = f"{sname}_summary.txt"
-                if fname != canonical and not os.path.exists(os.path.join(dest_dir, canonical)):
-                    os.rename(fpath, os.path.join(dest_dir, canonical))
+                if fname != canonical and not self._output.exists(os.path.join(dest_dir, canonical)):
+                    self._output.rename(fpath, os.path.join(dest_dir, canonical))
                 continue
-            if "_amplicon" not in fname:
+            _, key, stem, num = match
+            ext = AMPLICON_FILE_EXT_MAP.get(key)
+            if match[0] != "amplicon" or stem != sname or not ext:
                 continue
-            for suffix, key in AMPLICON_FILE_DISCOVERY_SUFFIXES:
-                if not fname.endswith(suffix):
-                    continue
-                num = self._parse_amplicon_num(fname, sname)
-                ext = AMPLICON_FILE_EXT_MAP.get(key)
-                if num is None or not ext or fname != f"{sname}_amplicon{num}{suffix}":
-                    break
-                canonical = f"{sname}_amplicon{num}{ext}"
-                if fname != canonical and not os.path.exists(os.path.join(dest_dir, canonical)):
-                    os.rename(fpath, os.path.join(dest_dir, canonical))
-                break
+            canonical = f"{sname}_amplicon{num}{ext}"
+            if fname != canonical and not self._output.exists(os.path.join(dest_dir, canonical)):
+                self._output.rename(fpath, os.path.join(dest_dir, canonical))
 
     def _pull_aa_files_from_files_dirs(self, sname: str, staging: str) -> bool:
         """
@@ -1725,33 +2989,36 @@ class Aggregator:
                         continue
                     src = os.path.join(files_dir, fname)
                     if os.path.isfile(src):
-                        shutil.copy2(src, staging)
+                        self._output.add_file(src, os.path.join(staging, fname))
                         found = True
             except OSError as e:
                 print(f"  Warning: could not read files dir {files_dir}: {e}")
         return found
 
     def _build_cnvkit_tarball(self, sname: str, rec: SampleRecord,
-                               sample_out: str) -> Optional[str]:
+                               sample_out: str, jobs: List[tuple]) -> Optional[str]:
         """
-        Build [sname]_cnvkit_output.tar.gz in sample_out.
+        Plan [sname]_cnvkit_output.tar.gz in sample_out.
 
-        If rec.cnvkit_dir exists, tar it (minus excluded suffixes).
-        Otherwise, return None — cnvkit directory will be Not Provided.
+        If rec.cnvkit_dir exists, queue a job on jobs to tar it (minus
+        excluded suffixes) and return the tarball's path. Otherwise, return
+        None — cnvkit directory will be Not Provided.
         """
         tar_name = f"{sname}_cnvkit_output.tar.gz"
         tar_dest = os.path.join(sample_out, tar_name)
 
         if rec.cnvkit_dir and os.path.isdir(rec.cnvkit_dir):
-            # Compress .cns files in place before tarring, consistent with
-            # the old aggregator behaviour. Note this also gzips .call.cns,
-            # which EXCLUSION_SUFFIXES then drops from the tarball entirely.
-            gzip_files_in_dir(rec.cnvkit_dir, ".cns")
+            # .cns files are stored as .cns.gz, consistent with the old
+            # aggregator behaviour (which gzipped them in place first) —
+            # compressed into the tarball as it is written, leaving the
+            # extraction tree as it was. A .call.cns would be stored as
+            # .call.cns.gz, which EXCLUSION_SUFFIXES drops, so it is skipped.
             # Always root the archive at the canonical [sname]_cnvkit_output/,
             # never at the source basename — CoRAL's is bare 'cnvkit_output/',
             # which is what made this tarball non-idempotent before 8.0.0.
-            make_tarball(rec.cnvkit_dir, tar_dest,
-                         root_name=f"{sname}_cnvkit_output")
+            jobs.append(((tar_name, tar_dest), tree_size(rec.cnvkit_dir),
+                         make_tarball, rec.cnvkit_dir, tar_dest, EXCLUSION_SUFFIXES,
+                         f"{sname}_cnvkit_output", ".cns", self.gzip_level))
             return tar_dest
 
         print(f"  Warning: no cnvkit dir found for '{sname}' — cnvkit directory: Not Provided")
@@ -1768,7 +3035,7 @@ class Aggregator:
             return None
 
         dest = os.path.join(sample_out, f"{sname}_CNV_CALLS.bed")
-        safe_copy_file(rec.cnv_calls_bed, dest)
+        self._output.add_file(rec.cnv_calls_bed, dest)
         return dest
 
     # ------------------------------------------------------------------
@@ -1910,8 +3177,7 @@ class Aggregator:
                     src_file = os.path.join(src_dir, fname)
                     if not os.path.isfile(src_file):
                         continue
-                    dest_file = self._unique_dest(out_dir, fname)
-                    shutil.copy2(src_file, dest_file)
+                    self._output.add_file(src_file, self._output.unique_dest(out_dir, fname))
                     files_copied += 1
             except OSError as e:
                 print(f"  Warning: could not read subdir {src_dir}: {e}")
@@ -1926,16 +3192,17 @@ class Aggregator:
         than a loose subdirectory. Used for AC's bfbarchitect_outputs/, which
         can be large.
 
-        Merging happens in a temporary directory named after suffix (so the
-        archive extracts to that dir name), which is tarred and removed.
-        Nothing is emitted if no source subdirs are found.
+        The archive is written straight from the source files, as members
+        of a top-level suffix/ dir (so it extracts to that dir name) named
+        with _unique_dest's collision rule — there is no merged copy on
+        disk. Nothing is emitted if no source subdirs are found.
 
         On reaggregation the previously emitted archive is auto-expanded by
         Stage 2's nested-archive pass (and its redundant stem wrapper
         collapsed by _unwrap_redundant_dir) back into a plain suffix/ dir
         before discovery, so this merges + recompresses uniformly whether the
         input arrived raw or already compressed (mirrors how per-sample
-        cnvkit dirs round-trip). The copy below walks recursively and
+        cnvkit dirs round-trip). The merge below walks recursively and
         flattens every file regardless of depth — depth-agnostic as a
         safety net, so the emitted member list stays identical even if a
         source dir ever carries extra nesting (bfbarchitect_outputs is a flat
@@ -1945,28 +3212,35 @@ class Aggregator:
         if not sources:
             return
 
-        tmp_dir = os.path.join(self.classif_dir, suffix)
-        os.makedirs(tmp_dir, exist_ok=True)
-        files_copied = 0
+        members: List[Tuple[str, str]] = []
+        names: set = set()
         for src_dir in sources:
             try:
                 for root, _, fnames in os.walk(src_dir):
                     for fname in fnames:
                         if fname.startswith("."):
                             continue
-                        src_file = os.path.join(root, fname)
-                        dest_file = self._unique_dest(tmp_dir, fname)
-                        shutil.copy2(src_file, dest_file)
-                        files_copied += 1
+                        name, counter = fname, 2
+                        while name in names:
+                            name, counter = f"{fname}_{counter}", counter + 1
+                        members.append((os.path.join(root, fname), f"{suffix}/{name}"))
+                        names.add(name)
             except OSError as e:
                 print(f"  Warning: could not read subdir {src_dir}: {e}")
 
         archive_path = os.path.join(self.classif_dir, archive_name)
-        make_tarball(tmp_dir, archive_path, exclusions=())
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-
+        size = sum(tree_size(src_dir) for src_dir in sources)
+        self._compressor.submit((archive_name, archive_path), size,
+                                self._write_merged_archive, archive_path, members)
         print(f"  Merged {len(sources)} dir(s) -> {archive_name} "
-              f"({files_copied} file(s), compressed)")
+              f"({len(members)} file(s), compressed)")
+
+    def _write_merged_archive(self, archive_path: str,
+                              members: List[Tuple[str, str]]) -> None:
+        """Compression job: tar (source path, arcname) members into archive_path."""
+        with tarfile.open(archive_path, "w:gz", compresslevel=self.gzip_level) as tar:
+            for src_file, arcname in members:
+                add_file_member(tar, src_file, arcname)
 
     def _rescue_amplicon_files(self, file_suffix: str, out_dir: str) -> None:
         """
@@ -1979,23 +3253,23 @@ class Aggregator:
             list(self.classification_dirs)
             + list(self._files_dirs.values())
             + [rec.aa_results_dir for rec in self.sample_registry.values()
-               if rec.aa_results_dir and os.path.isdir(rec.aa_results_dir)]
+               if rec.aa_results_dir and self._fs.isdir(rec.aa_results_dir)]
         )
 
         found = 0
         seen: set = set()
         for search_dir in search_dirs:
             try:
-                for fname in os.listdir(search_dir):
+                for fname in self._fs.listdir(search_dir):
                     if fname.startswith("."):
                         continue
                     if "_amplicon" not in fname or not fname.endswith(file_suffix):
                         continue
                     src = os.path.join(search_dir, fname)
-                    if not os.path.isfile(src) or src in seen:
+                    if not self._fs.isfile(src) or src in seen:
                         continue
                     seen.add(src)
-                    shutil.copy2(src, self._unique_dest(out_dir, fname))
+                    self._output.add_file(src, self._output.unique_dest(out_dir, fname))
                     found += 1
             except OSError:
                 continue
@@ -2016,10 +3290,10 @@ class Aggregator:
         seen = set()
         for cls_dir in self.classification_dirs:
             try:
-                for fname in os.listdir(cls_dir):
+                for fname in self._fs.listdir(cls_dir):
                     if fname.endswith(suffix) and not fname.startswith("."):
                         fpath = os.path.join(cls_dir, fname)
-                        if os.path.isfile(fpath) and fpath not in seen:
+                        if self._fs.isfile(fpath) and fpath not in seen:
                             found.append(fpath)
                             seen.add(fpath)
             except OSError:
@@ -2035,10 +3309,10 @@ class Aggregator:
         seen = set()
         for cls_dir in self.classification_dirs:
             try:
-                for dname in os.listdir(cls_dir):
+                for dname in self._fs.listdir(cls_dir):
                     if dname.endswith(suffix) and not dname.startswith("."):
                         dpath = os.path.join(cls_dir, dname)
-                        if os.path.isdir(dpath) and dpath not in seen:
+                        if self._fs.isdir(dpath) and dpath not in seen:
                             found.append(dpath)
                             seen.add(dpath)
             except OSError:
@@ -2053,9 +3327,42 @@ class Aggregator:
         """Copy each AUX_DIR-marked directory wholesale into other_files/."""
         for aux_dir in self.aux_dirs:
             dname = os.path.basename(aux_dir)
-            dest  = self._unique_dest(self.other_dir, dname)
+            dest  = self._output.unique_dest(self.other_dir, dname)
             print(f"  Copying AUX dir: {aux_dir} -> {dest}")
-            safe_copytree(aux_dir, dest)
+            self._output.add_tree(aux_dir, dest)
+
+    # ------------------------------------------------------------------
+    # Stage 5d — queued compression
+    # ------------------------------------------------------------------
+
+    def _run_compression(self, verbose: bool) -> None:
+        """
+        Run the gzip/tar jobs Stage 5 queued on self._compressor, largest
+        first. Each job's key is (what, dest): a job that fails has its
+        partial dest removed — so e.g. a cnvkit dir whose tarball could
+        not be written resolves to Not Provided — and the rest carry on.
+        """
+        n_jobs = len(self._compressor)
+        if not n_jobs:
+            return
+        n_bytes = self._compressor.queued_bytes
+        n_threads = min(self.compress_jobs, n_jobs)
+        print(f"  Compressing {n_jobs} output file(s), {n_bytes / (1024 * 1024):.1f} MB, "
+              f"with {n_threads} thread(s)" + (", largest first..." if n_threads > 1 else "..."))
+        t0 = time.perf_counter()
+        n_failed = 0
+        for i, ((what, dest), _, output, error) in enumerate(self._compressor.run(), 1):
+            sys.stdout.write(output)
+            if error is not None:
+                print(f"  Warning: could not write {what}: {error}")
+                if dest and os.path.lexists(dest):
+                    os.remove(dest)
+                n_failed += 1
+            if not verbose and (i % 10 == 0 or i == n_jobs):
+                print(f"  Progress: {i}/{n_jobs} compressed...")
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+        print(f"  Compressed {n_jobs - n_failed}/{n_jobs} output file(s) in {elapsed:.1f}s "
+              f"({n_bytes / elapsed / (1024 * 1024):.1f} MB/s)")
 
     # ==================================================================
     # Stage stubs — implemented in subsequent segments
@@ -2094,31 +3401,32 @@ class Aggregator:
         inside the reconstruction results subdirectory.  Updates the
         SampleRecord paths.
         """
+        output = self._output
         old_dir = os.path.join(self.samples_dir, old_sname)
         new_dir = os.path.join(self.samples_dir, new_sname)
-        if not os.path.isdir(old_dir):
+        if not output.isdir(old_dir):
             print(f"  Warning: sample dir not found for '{old_sname}', skipping rename.")
             return
 
-        os.rename(old_dir, new_dir)
+        output.rename(old_dir, new_dir)
         print(f"  Renamed sample dir: {old_sname} -> {new_sname}")
 
         # Rename entries directly inside the sample dir
-        for entry in os.listdir(new_dir):
+        for entry in output.listdir(new_dir):
             if not entry.startswith(old_sname):
                 continue
             new_entry = new_sname + entry[len(old_sname):]
-            os.rename(os.path.join(new_dir, entry),
-                      os.path.join(new_dir, new_entry))
+            output.rename(os.path.join(new_dir, entry),
+                          os.path.join(new_dir, new_entry))
             # If this is the reconstruction results dir, rename files inside it too
             if new_entry == f"{new_sname}_reconstruction_results":
                 aa_dir = os.path.join(new_dir, new_entry)
-                if os.path.isdir(aa_dir):
-                    for aa_file in os.listdir(aa_dir):
+                if output.isdir(aa_dir):
+                    for aa_file in output.listdir(aa_dir):
                         if aa_file.startswith(old_sname):
-                            os.rename(os.path.join(aa_dir, aa_file),
-                                      os.path.join(aa_dir,
-                                                   new_sname + aa_file[len(old_sname):]))
+                            output.rename(os.path.join(aa_dir, aa_file),
+                                          os.path.join(aa_dir,
+                                                       new_sname + aa_file[len(old_sname):]))
 
         # Update SampleRecord destination paths
         rec = self.sample_registry.get(old_sname)
@@ -2143,12 +3451,12 @@ class Aggregator:
         ]
         for subdir_name in classif_subdirs:
             subdir = os.path.join(self.classif_dir, subdir_name)
-            if not os.path.isdir(subdir):
+            if not self._output.isdir(subdir):
                 continue
-            for fname in os.listdir(subdir):
+            for fname in self._output.listdir(subdir):
                 if fname.startswith(old_sname):
-                    os.rename(os.path.join(subdir, fname),
-                              os.path.join(subdir, new_sname + fname[len(old_sname):]))
+                    self._output.rename(os.path.join(subdir, fname),
+                                        os.path.join(subdir, new_sname + fname[len(old_sname):]))
 
     def _patch_classif_tsvs(self) -> None:
         """
@@ -2235,39 +3543,30 @@ class Aggregator:
         """
         Build results/run.json and results/aggregated_results.csv.
 
-        For each feature row in self.run_json_groups:
-          - Parse list-valued fields (Location, Oncogenes, All genes)
-          - Re-resolve all stale file paths to new locations in results/
+        For each feature row in self.features (self.run_json_groups order):
+          - Re-resolve all stale file paths to new locations in results/,
+            stored back into the row's slot
           - Apply sample name remapping if configured
-          - Write the structured run.json
-          - Write a flat aggregated_results.csv alongside
+        then write the structured run.json and a flat aggregated_results.csv
+        alongside, a batch of row dicts at a time — the CSV's in the order
+        the store sorts them into (on disk, with --spill_features). List-valued fields
+        (Location, Oncogenes, All genes) and the amplicon number / numeric
+        coercions were already applied as the rows were stored.
         """
         print("\n--- Stage 6: Building run.json ---")
 
         ref_genomes: set = set()
         processed = 0
+        store = self.features
 
-        for skey, rows in self.run_json_groups.items():
-            # enumerate (rather than looking the row back up by value) because
-            # two feature rows in one sample can compare equal: list.index()
-            # would then return the first match every time, rewriting that one
-            # twice and leaving its twin without canonical column ordering.
-            # It is also O(n) per row, i.e. O(n^2) per sample.
-            for row_idx, row in enumerate(rows):
+        for skey, slots in self.run_json_groups.items():
+            for slot, (sname, ref, amp, bed, feature_id) in zip(slots, store.columns(
+                    slots, ("Sample name", "Reference version", "AA amplicon number",
+                            "Feature BED file", "Feature ID"))):
                 processed += 1
-                sname = str(row["Sample name"])  # guard against numeric sample names
-                row["Sample name"] = sname
                 rec = self.sample_registry.get(sname)
 
-                # ── Parse list-valued fields ──────────────────────────────
-                for col in LIST_COLUMNS:
-                    if col in row:
-                        row[col] = parse_list_field(row[col])
-                    else:
-                        row[col] = []
-
                 # ── Reference genome consistency check ───────────────────
-                ref = row.get("Reference version", NOT_PROVIDED)
                 if not not_provided(ref):
                     ref_genomes.add(ref)
                     if len(ref_genomes) > 1:
@@ -2276,61 +3575,53 @@ class Aggregator:
                             "AmpliconRepository only supports single-reference projects."
                         )
 
-                # ── Amplicon number (integer coercion) ────────────────────
-                try:
-                    row["AA amplicon number"] = int(row["AA amplicon number"])
-                except (ValueError, TypeError, KeyError):
-                    pass
-
-                # ── Numeric field coercions ───────────────────────────────
-                for num_col in ("Complexity score", "Captured interval length",
-                                "Feature median copy number",
-                                "Feature maximum copy number"):
-                    try:
-                        row[num_col] = float(row[num_col])
-                    except (ValueError, TypeError, KeyError):
-                        pass
-
                 # ── Path re-resolution ────────────────────────────────────
+                row = {"Sample name": sname, "AA amplicon number": amp,
+                       "Feature BED file": bed}
                 self._resolve_paths(row, rec)
+                del row["Sample name"], row["AA amplicon number"]
+                store.assign(slot, row)
 
                 # ── Sample name remapping ─────────────────────────────────
-                if sname in self.name_map:
-                    row["Sample name"] = self.name_map[sname]
-                elif self.name_map:
+                if sname not in self.name_map and self.name_map:
                     print(f"  Warning: sample '{sname}' not found in name_map.")
 
-                # ── Ensure canonical column order ─────────────────────────
-                ordered = {}
-                for col in RUN_JSON_COLUMNS:
-                    ordered[col] = row.get(col, NOT_PROVIDED)
-                rows[row_idx] = ordered  # `rows` is self.run_json_groups[skey]
+                # aggregated_results.csv order: Sample name, AA amplicon
+                # number, Feature ID, then the order processed here.
+                store.set_sort_key(slot, (str(self.name_map.get(sname, sname)),
+                                          int(amp) if str(amp).isdigit() else 0,
+                                          str(feature_id), processed))
 
                 if processed % 100 == 0:
                     print(f"  Processed {processed} feature rows...")
 
         # ── Write run.json ────────────────────────────────────────────────
+        # Streamed a sample at a time, byte-identical to a json.dump(...,
+        # indent=2, sort_keys=True) of the whole {"runs": {...}} dict:
+        # each sample's rows dumped alone, re-indented two levels deeper.
         run_json_path = os.path.join(self.results_dir, "run.json")
         with open(run_json_path, "w") as fh:
-            json.dump({"runs": self.run_json_groups}, fh, indent=2, sort_keys=True)
+            fh.write('{\n  "runs": {')
+            skeys = sorted(self.run_json_groups)
+            all_rows = store.rows([slot for skey in skeys for slot in self.run_json_groups[skey]])
+            for i, skey in enumerate(skeys):
+                rows = [self._remap_sample_name(next(all_rows))
+                        for _ in self.run_json_groups[skey]]
+                body = json.dumps(rows, indent=2, sort_keys=True).replace("\n", "\n    ")
+                fh.write(f'{"," if i else ""}\n    {json.dumps(skey)}: {body}')
+            fh.write("\n  }\n}" if self.run_json_groups else "}\n}")
         print(f"  Wrote run.json  ({processed} feature rows, "
               f"{len(self.run_json_groups)} sample key(s))")
 
         # ── Write aggregated_results.csv ──────────────────────────────────
         # List fields rendered as Python repr strings e.g. ['EGFR', 'MYC'].
         # Columns are AGG_CSV_COLUMNS subset in spec order (no AA/cnvkit dir).
-        # Rows sorted by: Sample name, AA amplicon number, Feature ID.
-        all_flat_rows = [row for rows in self.run_json_groups.values() for row in rows]
-        all_flat_rows.sort(key=lambda r: (
-            str(r.get("Sample name", "")),
-            int(r.get("AA amplicon number", 0)) if str(r.get("AA amplicon number", "")).isdigit() else 0,
-            str(r.get("Feature ID", "")),
-        ))
         csv_path = os.path.join(self.results_dir, "aggregated_results.csv")
         with open(csv_path, "w", newline="") as fh:
             writer = csv.writer(fh)
             writer.writerow(AGG_CSV_COLUMNS)
-            for row in all_flat_rows:
+            for row in store.sorted_rows():
+                row = self._remap_sample_name(row)
                 cells = []
                 for col in AGG_CSV_COLUMNS:
                     v = row.get(col, NOT_PROVIDED)
@@ -2339,6 +3630,12 @@ class Aggregator:
                 writer.writerow(cells)
         print(f"  Wrote aggregated_results.csv")
 
+    def _remap_sample_name(self, row: dict) -> dict:
+        """row, with its sample name remapped."""
+        sname = row["Sample name"]
+        row["Sample name"] = self.name_map.get(sname, sname)
+        return row
+
     # ------------------------------------------------------------------
     # Stage 6 helpers
     # ------------------------------------------------------------------
@@ -2376,7 +3673,7 @@ class Aggregator:
 
         # ── CNV BED file ─────────────────────────────────────────────────
         # Always use the uncompressed copy placed by Stage 5.
-        if rec and rec.cnv_bed_dest and os.path.isfile(rec.cnv_bed_dest):
+        if rec and rec.cnv_bed_dest and self._output.isfile(rec.cnv_bed_dest):
             row["CNV BED file"] = relative_to_results(
                 rec.cnv_bed_dest, self.results_dir)
         else:
@@ -2427,14 +3724,14 @@ class Aggregator:
             rec.ac_version if rec and rec.ac_version else NOT_PROVIDED)
 
         # ── Reconstruction directory ─────────────────────────────────────
-        if rec and rec.aa_dir_dest and os.path.isdir(rec.aa_dir_dest):
+        if rec and rec.aa_dir_dest and self._output.isdir(rec.aa_dir_dest):
             row["Reconstruction directory"] = relative_to_results(
                 rec.aa_dir_dest, self.results_dir)
         else:
             row["Reconstruction directory"] = NOT_PROVIDED
 
         # ── cnvkit directory ─────────────────────────────────────────────
-        if rec and rec.cnvkit_tarball and os.path.isfile(rec.cnvkit_tarball):
+        if rec and rec.cnvkit_tarball and self._output.isfile(rec.cnvkit_tarball):
             row["cnvkit directory"] = relative_to_results(
                 rec.cnvkit_tarball, self.results_dir)
         else:
@@ -2448,7 +3745,7 @@ class Aggregator:
         if not basename or not_provided(basename):
             return NOT_PROVIDED
         candidate = os.path.join(search_dir, basename)
-        if os.path.isfile(candidate):
+        if self._output.isfile(candidate):
             return relative_to_results(candidate, self.results_dir)
         return NOT_PROVIDED
 
@@ -2468,7 +3765,7 @@ class Aggregator:
         if not ext:
             return NOT_PROVIDED
         path = os.path.join(rec.aa_dir_dest, f"{sname}_amplicon{amp_num}{ext}")
-        if os.path.isfile(path):
+        if self._output.isfile(path):
             return relative_to_results(path, self.results_dir)
         return NOT_PROVIDED
 
@@ -2490,7 +3787,7 @@ class Aggregator:
             # the sample dir (placed by Stage 5 misc copy loop).
             sample_dir = os.path.join(self.samples_dir, sname)
             dest = os.path.join(sample_dir, f"{sname}{suffix}")
-            if os.path.isfile(dest):
+            if self._output.isfile(dest):
                 return relative_to_results(dest, self.results_dir)
             # Fall back to the extraction tree path (unusual but safe)
             return relative_to_results(src, self.results_dir)
@@ -2503,14 +3800,18 @@ class Aggregator:
 
     def _finalise(self) -> None:
         """
-        Tar the entire results/ tree into [project_name].tar.gz and
-        remove working directories (unless --no_cleanup).
+        Tar the entire results/ tree into [project_name].tar.gz — in one
+        pass, with Stage 5's recorded copies read straight from the
+        extraction tree — and remove working directories (unless
+        --no_cleanup).
         """
         print("\n--- Finalise: Creating output archive ---")
         output_archive = os.path.join(self.work_dir,
                                       f"{self.project_name}.tar.gz")
         print(f"  Writing: {output_archive}")
-        make_tarball(self.results_dir, output_archive)
+        n_members, n_recorded = self._output.write_tarball(output_archive,
+                                                           pool=self._compressor)
+        print(f"  Archived {n_members} file(s), {n_recorded} streamed from the extraction tree")
         output_bytes = os.path.getsize(output_archive)
         output_mb = output_bytes / (1024 * 1024)
         input_bytes = getattr(self, "_input_size_bytes", 0)
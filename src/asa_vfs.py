@@ -0,0 +1,452 @@
+"""
+asa_vfs.py
+Filesystem layer used by Stage 3 (Discovery): a one-listing-per-directory
+index of the extraction tree, and the virtual view --lazy_extraction needs.
+
+Discovery only ever needs directory listings, a handful of small content
+sniffs (summary headers, cycles/graph files, logs) and, for the few files it
+converts, their full content. An ArchiveTree serves all of that straight from
+an archive's member index, rooted at the directory the archive *would* have
+been extracted into; DiscoveryFS overlays every mounted ArchiveTree on the
+real extraction tree and answers os-style queries (listdir/isdir/walk/open)
+against the union. Once discovery has decided what the output needs, only
+those members are written to disk (DiscoveryFS.materialize), at exactly the
+paths a full extraction would have produced — so Stages 4-6 never know the
+difference.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import posixpath
+import shutil
+import tarfile
+import threading
+import zipfile
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Guards ArchiveTree's lazily opened ZipFile; discovery reads from threads.
+_ZIP_OPEN_LOCK = threading.Lock()
+
+
+def normalize_member_name(name: str) -> str:
+    """Archive member name -> normalised relative posix path ('' for the root)."""
+    rel = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    return "" if rel == "." else rel
+
+
+class ArchiveTree:
+    """
+    Member index of one .tar/.tar.gz/.zip archive, presented as a directory
+    tree rooted at `root` (the archive's reserved extraction dir).
+
+    Paths handed to the query methods are relative to root, '/'-separated,
+    with '' meaning root itself. Member filtering (unsafe / ignored names)
+    is the caller's job — only members passed to add_member() exist here.
+    """
+
+    def __init__(self, archive_path: str, root: str):
+        self.archive_path = archive_path
+        self.root = root
+        # rel dir -> child names, in archive order
+        self._children: Dict[str, List[str]] = {"": []}
+        # rel file -> size in bytes
+        self._files: Dict[str, int] = {}
+        # rel path -> original member name (for materialisation)
+        self._members: Dict[str, str] = {}
+        # set by strip_wrapper(): every lookup is made relative to this dir
+        self._prefix = ""
+        self._zip: Optional[zipfile.ZipFile] = None
+
+    def __getstate__(self) -> dict:
+        # Shipped to --jobs worker processes; an open ZipFile can't be.
+        state = self.__dict__.copy()
+        state["_zip"] = None
+        return state
+
+    @property
+    def is_zip(self) -> bool:
+        return self.archive_path.endswith(".zip")
+
+    # -- building --------------------------------------------------------
+
+    def _add_dir(self, rel: str) -> None:
+        if rel in self._children:
+            return
+        parent = posixpath.dirname(rel)
+        self._add_dir(parent)
+        self._children[rel] = []
+        self._children[parent].append(posixpath.basename(rel))
+
+    def add_member(self, member_name: str, size: int, is_dir: bool) -> Optional[str]:
+        """Index one member; returns its relative path (None for the root)."""
+        rel = normalize_member_name(member_name)
+        if not rel:
+            return None
+        if is_dir:
+            self._add_dir(rel)
+        else:
+            parent = posixpath.dirname(rel)
+            self._add_dir(parent)
+            if rel not in self._files:
+                self._children[parent].append(posixpath.basename(rel))
+            self._files[rel] = size
+        self._members[rel] = member_name
+        return rel
+
+    def discard(self, rel: str) -> None:
+        """Forget a file (e.g. a nested archive that has been expanded)."""
+        key = self._key(rel)
+        if self._files.pop(key, None) is None:
+            return
+        self._members.pop(key, None)
+        self._children[posixpath.dirname(key)].remove(posixpath.basename(key))
+
+    def strip_wrapper(self, stem: str) -> bool:
+        """
+        The virtual counterpart of Aggregator._unwrap_redundant_dir: when the
+        archive's sole top-level entry is a directory named stem, present
+        that directory as the root. Returns True if it did.
+        """
+        if self._children.get("") != [stem] or stem not in self._children:
+            return False
+        self._prefix = stem
+        return True
+
+    # -- queries ---------------------------------------------------------
+
+    def _key(self, rel: str) -> str:
+        rel = "" if rel in ("", ".") else rel
+        if not self._prefix:
+            return rel
+        return posixpath.join(self._prefix, rel) if rel else self._prefix
+
+    def listdir(self, rel: str) -> List[str]:
+        children = self._children.get(self._key(rel))
+        if children is None:
+            raise FileNotFoundError(os.path.join(self.root, rel))
+        return list(children)
+
+    def isdir(self, rel: str) -> bool:
+        return self._key(rel) in self._children
+
+    def isfile(self, rel: str) -> bool:
+        return self._key(rel) in self._files
+
+    def getsize(self, rel: str) -> int:
+        return self._files[self._key(rel)]
+
+    def files(self) -> Iterator[str]:
+        """Every indexed file, as a path relative to root."""
+        strip = len(self._prefix) + 1 if self._prefix else 0
+        for key in self._files:
+            if not self._prefix or key.startswith(self._prefix + "/"):
+                yield key[strip:]
+
+    def dirs(self) -> Iterator[str]:
+        """Every indexed directory below root, as a path relative to root."""
+        strip = len(self._prefix) + 1 if self._prefix else 0
+        for key in self._children:
+            if key and (not self._prefix or key.startswith(self._prefix + "/")):
+                yield key[strip:]
+
+    def total_size(self) -> int:
+        return sum(self._files.values())
+
+    def rel_for_member(self, member_name: str) -> Optional[str]:
+        """Member name -> path relative to root, or None if not under root."""
+        rel = normalize_member_name(member_name)
+        if not self._prefix:
+            return rel or None
+        if rel.startswith(self._prefix + "/"):
+            return rel[len(self._prefix) + 1:]
+        return None
+
+    def open_binary(self, rel: str) -> IO[bytes]:
+        """
+        Read one member without extracting it. Random access is cheap for
+        zip; for tar it means a seek through the (possibly compressed)
+        stream, which is why Aggregator._index_archive writes the members
+        discovery sniffs to disk during its one pass over a tar.
+        """
+        member_name = self._members.get(self._key(rel))
+        if member_name is None or self._key(rel) not in self._files:
+            raise FileNotFoundError(os.path.join(self.root, rel))
+        if self.is_zip:
+            with _ZIP_OPEN_LOCK:
+                if self._zip is None:
+                    self._zip = zipfile.ZipFile(self.archive_path, "r")
+            return self._zip.open(member_name)
+        with tarfile.open(self.archive_path, "r:*") as tf:
+            fh = tf.extractfile(member_name)
+            data = fh.read() if fh is not None else b""
+        return io.BytesIO(data)
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+
+class DiscoveryFS:
+    """
+    os-style view of the extraction tree with every mounted ArchiveTree
+    overlaid on it. A path that exists on disk is always served from disk
+    (nested archives and any member already materialised live there); the
+    mounted trees fill in everything that hasn't been written.
+
+    Every directory is listed at most once: the first query against it
+    runs one os.scandir, and the names and entry types it returns (plus
+    the mounted tree's, if any) are kept in an index that listdir, isdir,
+    isfile and walk all answer from. On NFS/Lustre that turns the four or
+    five listings discovery used to make of each dir into one round trip.
+    Code that adds or removes files under an indexed dir after it was
+    listed reports it via note_file()/invalidate(). The index (and the
+    head() cache) may be filled from several threads at once.
+    """
+
+    def __init__(self) -> None:
+        self._trees: Dict[str, ArchiveTree] = {}
+        # dir path -> {name: (is_dir, is_file, is_symlink)} in listing
+        # order, or None if the path is not a directory
+        self._index: Dict[str, Optional[Dict[str, Tuple[bool, bool, bool]]]] = {}
+        # file path -> leading lines, see head()
+        self._heads: Dict[str, List[str]] = {}
+
+    def mount(self, tree: ArchiveTree) -> None:
+        self._trees[tree.root] = tree
+        self.invalidate(tree.root)
+
+    @property
+    def trees(self) -> List[ArchiveTree]:
+        return list(self._trees.values())
+
+    def _locate(self, path: str) -> Tuple[Optional[ArchiveTree], str]:
+        if not self._trees:
+            return None, ""
+        p = path
+        while True:
+            tree = self._trees.get(p)
+            if tree is not None:
+                rel = os.path.relpath(path, p)
+                return tree, "" if rel == "." else rel.replace(os.sep, "/")
+            parent = os.path.dirname(p)
+            if parent == p:
+                return None, ""
+            p = parent
+
+    def discard(self, path: str) -> None:
+        tree, rel = self._locate(path)
+        if tree is not None:
+            tree.discard(rel)
+        self.invalidate(path)
+
+    # -- listing index ---------------------------------------------------
+
+    def _entries(self, path: str) -> Optional[Dict[str, Tuple[bool, bool, bool]]]:
+        try:
+            return self._index[path]
+        except KeyError:
+            pass
+        entries: Optional[Dict[str, Tuple[bool, bool, bool]]] = None
+        try:
+            with os.scandir(path) as it:
+                entries = {}
+                for entry in it:
+                    try:
+                        is_dir, is_file = entry.is_dir(), entry.is_file()
+                    except OSError:
+                        is_dir = is_file = False
+                    entries[entry.name] = (is_dir, is_file, entry.is_symlink())
+        except OSError:
+            pass
+        tree, rel = self._locate(path)
+        if tree is not None and tree.isdir(rel):
+            if entries is None:
+                entries = {}
+            for name in tree.listdir(rel):
+                if name not in entries:
+                    sub = posixpath.join(rel, name) if rel else name
+                    is_dir = tree.isdir(sub)
+                    entries[name] = (is_dir, not is_dir, False)
+        self._index[path] = entries
+        return entries
+
+    def _entry(self, path: str) -> Optional[Tuple[bool, bool, bool]]:
+        entries = self._entries(os.path.dirname(path))
+        return None if entries is None else entries.get(os.path.basename(path))
+
+    def invalidate(self, path: str) -> None:
+        """Forget the cached listings of path and its parent dir."""
+        self._index.pop(path, None)
+        self._index.pop(os.path.dirname(path), None)
+        self._heads.pop(path, None)
+
+    def note_file(self, path: str) -> None:
+        """Record a file written at path after its dir was indexed."""
+        entries = self._index.get(os.path.dirname(path))
+        if entries is not None:
+            entries[os.path.basename(path)] = (False, True, False)
+
+    def clear(self) -> None:
+        """Drop the listing index (the mounted trees stay)."""
+        self._index.clear()
+        self._heads.clear()
+
+    # -- os-style queries ------------------------------------------------
+
+    def listdir(self, path: str) -> List[str]:
+        entries = self._entries(path)
+        if entries is None:
+            raise FileNotFoundError(path)
+        return list(entries)
+
+    def isdir(self, path: str) -> bool:
+        if self._index.get(path) is not None:
+            return True
+        entry = self._entry(path)
+        return entry is not None and entry[0]
+
+    def isfile(self, path: str) -> bool:
+        entry = self._entry(path)
+        return entry is not None and entry[1]
+
+    def exists(self, path: str) -> bool:
+        return self.isfile(path) or self.isdir(path)
+
+    def getsize(self, path: str) -> int:
+        if os.path.exists(path):
+            return os.path.getsize(path)
+        tree, rel = self._locate(path)
+        if tree is None or not tree.isfile(rel):
+            raise FileNotFoundError(path)
+        return tree.getsize(rel)
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Top-down os.walk over the union, in the same order and with the
+        same symlink handling; callers may prune dirs in place.
+        """
+        entries = self._entries(top)
+        if entries is None:
+            return
+        dirs: List[str] = []
+        files: List[str] = []
+        for name, (is_dir, _, _) in entries.items():
+            (dirs if is_dir else files).append(name)
+        yield top, dirs, files
+        for name in dirs:
+            entry = entries.get(name)
+            if entry is None or not entry[2]:
+                yield from self.walk(os.path.join(top, name))
+
+    def open(self, path: str, errors: Optional[str] = None) -> IO[str]:
+        """Open a file for reading as text, like the builtin open(path)."""
+        if os.path.exists(path):
+            return open(path, errors=errors)
+        tree, rel = self._locate(path)
+        if tree is None:
+            return open(path, errors=errors)
+        return io.TextIOWrapper(tree.open_binary(rel), errors=errors)
+
+    def open_binary(self, path: str) -> IO[bytes]:
+        """Open a file for reading as bytes, like the builtin open(path, "rb")."""
+        if os.path.exists(path):
+            return open(path, "rb")
+        tree, rel = self._locate(path)
+        if tree is None:
+            return open(path, "rb")
+        return tree.open_binary(rel)
+
+    def head(self, path: str, n: int = 5) -> List[str]:
+        """
+        The first n lines of a text file, as n readline() calls would
+        return them ('' past EOF). Memoised: discovery reads the same
+        summary headers more than once.
+        """
+        lines = self._heads.get(path)
+        if lines is None or len(lines) < n:
+            with self.open(path) as fh:
+                lines = [fh.readline() for _ in range(n)]
+            self._heads[path] = lines
+        return lines[:n]
+
+    # -- materialisation -------------------------------------------------
+
+    def fetch(self, path: str) -> str:
+        """Make sure a single file exists on disk; returns path."""
+        if not os.path.exists(path):
+            self.materialize([path])
+        return path
+
+    def pending(self, paths: Iterable[str]) -> Dict[ArchiveTree, Set[str]]:
+        """Group the not-yet-on-disk paths among paths by owning tree."""
+        by_tree: Dict[ArchiveTree, Set[str]] = {}
+        for path in paths:
+            if os.path.lexists(path):
+                continue
+            tree, rel = self._locate(path)
+            if tree is not None and (tree.isfile(rel) or tree.isdir(rel)):
+                by_tree.setdefault(tree, set()).add(rel)
+        return by_tree
+
+    def materialize(self, paths: Iterable[str]) -> Tuple[int, int]:
+        """
+        Write the given virtual files/dirs to disk in place. Returns
+        (files written, bytes written).
+        """
+        n_files = n_bytes = 0
+        for tree, rels in self.pending(paths).items():
+            f, b = materialize_tree(tree, rels)
+            n_files += f
+            n_bytes += b
+        return n_files, n_bytes
+
+
+def materialize_tree(tree: ArchiveTree, rels: Set[str]) -> Tuple[int, int]:
+    """
+    Extract the members at rels (paths relative to tree.root) into place.
+    Zip members are copied out directly; a tar is streamed once and only
+    the selected members written. Returns (files written, bytes written).
+    """
+    for rel in rels:
+        if tree.isdir(rel):
+            os.makedirs(os.path.join(tree.root, rel), exist_ok=True)
+    wanted = {rel for rel in rels if tree.isfile(rel)}
+    if not wanted:
+        return 0, 0
+
+    n_files = n_bytes = 0
+    if tree.is_zip:
+        with zipfile.ZipFile(tree.archive_path, "r") as zf:
+            for rel in sorted(wanted):
+                target = os.path.join(tree.root, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zf.open(tree._members[tree._key(rel)]) as src, \
+                        open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                n_files += 1
+                n_bytes += tree.getsize(rel)
+        return n_files, n_bytes
+
+    with tarfile.open(tree.archive_path, "r|*") as tf:
+        for member in tf:
+            rel = tree.rel_for_member(member.name)
+            if rel is None or rel not in wanted:
+                continue
+            member.name = rel
+            if member.islnk():
+                member.linkname = tree.rel_for_member(member.linkname) or member.linkname
+            try:
+                tf.extract(member, tree.root)
+            except (tarfile.TarError, KeyError, OSError) as e:
+                print(f"  Warning: could not materialise {rel} from "
+                      f"{tree.archive_path}: {e}")
+                continue
+            n_files += 1
+            n_bytes += member.size
+            wanted.discard(rel)
+            if not wanted:
+                break
+    return n_files, n_bytes